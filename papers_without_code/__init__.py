@@ -1,12 +1,14 @@
 """Top-level package for papers_without_code."""
 
 import logging
+import os
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from importlib.metadata import PackageNotFoundError, version
 from pathlib import Path
+from typing import Any
 
-from sentence_transformers import SentenceTransformer
-
-from . import custom_types, processing, search
+from . import custom_types, models, processing, search
 
 try:
     __version__ = version("papers-without-code")
@@ -29,35 +31,49 @@ log = logging.getLogger(__name__)
 ###############################################################################
 
 
-def _get_paper_from_file(
-    pdf_path: custom_types.PathLike, teardown: bool = False
-) -> custom_types.MinimalPaperDetails:
+def _setup_grobid(teardown: bool) -> Any:
     from . import grobid
 
-    # Create GROBID server and client for parsing PDF
-    client, container = grobid.setup_or_connect_to_server()
-    if client is None:
+    # Create GROBID servers and client for parsing PDFs
+    pool = grobid.setup_grobid_pool()
+    if not any(instance.healthy for instance in pool.instances):
         if teardown:
             log.error(
                 "Something went wrong during GROBID server setup, "
                 "stopping and removing container."
             )
-            grobid.teardown_server(container)
+            pool.teardown()
             raise OSError()
         else:
             log.error("Something went wrong during GROBID server setup.")
             raise OSError()
 
+    return pool
+
+
+def _warn_grobid_alive() -> None:
+    log.warning(
+        "GROBID PDF parsing server is still alive to "
+        "save time during next `pwoc` usage. "
+        "You can tear it down later with `pwoc-server --shutdown`."
+    )
+
+
+def _get_paper_from_file(
+    pdf_path: custom_types.PathLike, teardown: bool = False
+) -> custom_types.MinimalPaperDetails:
+    pool = _setup_grobid(teardown)
+
     # Process the PDF
     try:
-        grobid_data = grobid.process_pdf(client, pdf_path=pdf_path)
+        grobid_data = pool.process_pdf(pdf_path)
     except Exception as e:
         if teardown:
             log.error(
                 f"Something went wrong during GROBID PDF parsing (Error: '{e}'), "
                 f"stopping and removing container."
             )
-            grobid.teardown_server(container)
+            pool.teardown()
             raise e
         else:
             log.error(f"Something went wrong during GROBID PDF parsing (Error: '{e}').")
@@ -66,24 +82,101 @@ def _get_paper_from_file(
     # Shut down server
     # We don't need it anymore
     if teardown:
-        grobid.teardown_server(container)
+        pool.teardown()
 
     # Parse GROBID data
     parse_results = processing.parse_grobid_data(grobid_data)
 
     # Warn user that server is still live
     if not teardown:
-        log.warning(
-            "GROBID PDF parsing server is still alive to "
-            "save time during next `pwoc` usage. "
-            "You can tear it down later with `pwoc-server --shutdown`."
-        )
+        _warn_grobid_alive()
 
     return parse_results
 
 
+def get_papers_from_pdfs(
+    path_or_glob: custom_types.PathLike,
+    teardown: bool = False,
+    max_concurrency: int | None = None,
+) -> Iterator[tuple[Path, custom_types.MinimalPaperDetails | Exception]]:
+    """
+    Parse many PDF files with a single GROBID server.
+
+    PDFs are sent to GROBID concurrently and each paper is yielded
+    as soon as it is parsed. A PDF which fails to parse is yielded
+    with its error instead of stopping the others.
+
+    Parameters
+    ----------
+    path_or_glob: PathLike
+        A PDF file, a directory to search (recursively) for PDF files,
+        or a glob pattern (for example "papers/**/*.pdf").
+    teardown: bool
+        Should the GROBID server be torn down after all PDFs are parsed.
+        Default: False (do not tear down server)
+    max_concurrency: Optional[int]
+        The maximum number of PDFs to parse at once.
+        Default: None (check environment variables for GROBID_CONCURRENCY
+        or else use 10, GROBID's default thread count, per GROBID server)
+
+    Yields
+    ------
+    Path
+        The path of the PDF file.
+    Union[MinimalPaperDetails, Exception]
+        The parsed paper details or the error if the PDF could not be parsed.
+
+    Raises
+    ------
+    FileNotFoundError
+        No PDF files were found.
+    """
+    from . import grobid
+
+    pdf_paths = grobid.find_pdfs(path_or_glob)
+    if len(pdf_paths) == 0:
+        raise FileNotFoundError(f"No PDF files found at: '{path_or_glob}'")
+
+    def _parse_pdf(pdf_path: Path) -> custom_types.MinimalPaperDetails:
+        grobid_data = pool.process_pdf(pdf_path)
+        return processing.parse_grobid_data(grobid_data)
+
+    # Setup the servers once for all PDFs
+    pool = _setup_grobid(teardown)
+
+    # Handle vars
+    if max_concurrency is None:
+        if "GROBID_CONCURRENCY" in os.environ:
+            log.debug("Using GROBID_CONCURRENCY from environment vars.")
+            max_concurrency = int(os.environ["GROBID_CONCURRENCY"])
+        else:
+            max_concurrency = grobid.DEFAULT_GROBID_CONCURRENCY * len(pool.instances)
+
+    log.info(f"Parsing {len(pdf_paths)} PDFs.")
+    exe = ThreadPoolExecutor(max_workers=max_concurrency)
+    try:
+        futures = {exe.submit(_parse_pdf, pdf_path): pdf_path for pdf_path in pdf_paths}
+        for future in as_completed(futures):
+            pdf_path = futures[future]
+            try:
+                result: custom_types.MinimalPaperDetails | Exception = future.result()
+            except Exception as e:
+                log.error(f"Failed to parse PDF: '{pdf_path}' (Error: '{e}').")
+                result = e
+
+            yield pdf_path, result
+
+    finally:
+        # Don't parse the rest if the caller stopped early
+        exe.shutdown(wait=True, cancel_futures=True)
+        if teardown:
+            pool.teardown()
+        else:
+            _warn_grobid_alive()
+
+
 def search_for_repos(
-    query_or_path: str, teardown: bool = False
+    query_or_path: str, teardown: bool = False, top_k: int | None = None
 ) -> list[search.RepoDetails]:
     """
     Query for a paper then find similar GitHub repositories to that paper.
@@ -102,6 +195,9 @@ def search_for_repos(
     teardown: bool
         Should the GROBID server be torn down after search is complete.
         Default: False (do not tear down server)
+    top_k: Optional[int]
+        Only return the top k most similar repositories.
+        Default: None (return all repositories)
 
     Returns
     -------
@@ -123,6 +219,9 @@ def search_for_repos(
         The function used to find and rank GitHub repositories by their similarity
         to the paper.
     """
+    # Start loading the model while paper details are fetched
+    models.preload_model_async()
+
     # Check if path and get paper details from GROBID
     if Path(query_or_path).resolve().exists():
         paper = _get_paper_from_file(query_or_path, teardown)
@@ -130,14 +229,7 @@ def search_for_repos(
     else:
         paper = search.get_paper(query_or_path)
 
-    # Preload models
-    potential_cache_dir = Path(search.DEFAULT_LOCAL_CACHE_MODEL).resolve()
-    if potential_cache_dir.exists():
-        loaded_sent_transformer = SentenceTransformer(str(potential_cache_dir))
-    else:
-        loaded_sent_transformer = SentenceTransformer(search.DEFAULT_TRANSFORMER_MODEL)
-
     return search.get_repos(
         paper,
-        loaded_sent_transformer=loaded_sent_transformer,
+        top_k=top_k,
     )
@@ -1,12 +1,15 @@
 #!/usr/bin/env python
 
 import argparse
+import glob
 import logging
 import sys
 import traceback
+from pathlib import Path
 from pprint import pprint
 
-from papers_without_code import search_for_repos
+from papers_without_code import get_papers_from_pdfs, search, search_for_repos
+from papers_without_code.search import RepoDetails
 
 ###############################################################################
 
@@ -40,7 +43,22 @@ class Args(argparse.Namespace):
                 "acm.org, or biorxiv.org. DOIs can be provided as is. "
                 "All other IDs should be given with their type, for example: "
                 "doi:10.1002/pra2.601 or corpusid:248266768 or "
-                "url:https://arxiv.org/abs/2204.09110."
+                "url:https://arxiv.org/abs/2204.09110. "
+                "When providing a directory or glob pattern such as "
+                "'papers/**/*.pdf', every PDF found is parsed concurrently "
+                "and repositories are found for each."
+            ),
+        )
+        p.add_argument(
+            "-c",
+            "--concurrency",
+            type=int,
+            default=None,
+            dest="concurrency",
+            help=(
+                "The maximum number of PDFs to parse at once when providing "
+                "a directory or glob pattern. "
+                "Defaults to the GROBID_CONCURRENCY environment variable or 10."
             ),
         )
         p.add_argument(
@@ -62,6 +80,60 @@ class Args(argparse.Namespace):
         p.parse_args(namespace=self)
 
 
+def _is_pdf_batch(query_or_pdf_path: str) -> bool:
+    # Directories and glob patterns matching files (queries can contain "?")
+    return Path(query_or_pdf_path).is_dir() or (
+        glob.escape(query_or_pdf_path) != query_or_pdf_path
+        and len(glob.glob(query_or_pdf_path, recursive=True)) > 0
+    )
+
+
+def _print_repos(repos: list[RepoDetails]) -> None:
+    # Handle nothing found
+    if len(repos) == 0:
+        print("No repositories found which were similar.")
+
+    # At least one
+    else:
+        print("Most Similar Repository")
+        print("-----------------------")
+        pprint(repos[0])
+
+    # More
+    if len(repos) > 1:
+        print()
+        print()
+        print("Other Similar Repositories")
+        print("--------------------------")
+        pprint(repos[1:])
+
+
+def _search_for_repos_from_pdfs(args: Args) -> int:
+    # Report each paper as it is parsed and keep going on failures
+    n_failed = 0
+    for pdf_path, paper in get_papers_from_pdfs(
+        args.query_or_pdf_path,
+        teardown=args.teardown,
+        max_concurrency=args.concurrency,
+    ):
+        print()
+        print()
+        print(pdf_path)
+        print("=" * len(str(pdf_path)))
+        if isinstance(paper, Exception):
+            print(f"Failed to parse PDF: {paper}")
+            n_failed += 1
+            continue
+
+        try:
+            _print_repos(search.get_repos(paper))
+        except Exception as e:
+            log.error(f"Failed to find repositories for: '{pdf_path}' (Error: '{e}').")
+            n_failed += 1
+
+    return n_failed
+
+
 def main() -> None:
     # Get args
     args = Args()
@@ -80,30 +152,19 @@ def main() -> None:
 
     # Process
     try:
+        if _is_pdf_batch(args.query_or_pdf_path):
+            n_failed = _search_for_repos_from_pdfs(args)
+            if n_failed > 0:
+                sys.exit(1)
+            return
+
         repos = search_for_repos(
             query_or_path=args.query_or_pdf_path,
             teardown=args.teardown,
         )
         print()
         print()
-
-        # Handle nothing found
-        if len(repos) == 0:
-            print("No repositories found which were similar.")
-
-        # At least one
-        else:
-            print("Most Similar Repository")
-            print("-----------------------")
-            pprint(repos[0])
-
-        # More
-        if len(repos) > 1:
-            print()
-            print()
-            print("Other Similar Repositories")
-            print("--------------------------")
-            pprint(repos[1:])
+        _print_repos(repos)
 
     except Exception as e:
         log.error("=============================================")
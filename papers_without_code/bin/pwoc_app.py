@@ -9,6 +9,7 @@ import traceback
 from flask import Flask
 
 from papers_without_code.app import STATIC_DIR, views
+from papers_without_code.models import preload_model_async
 
 ###############################################################################
 
@@ -53,6 +54,11 @@ def _pwoc_app() -> None:
     runner_has_gh_token = "GITHUB_TOKEN" in os.environ
     log.info(f"App has access to GitHub Token: {runner_has_gh_token}")
 
+    # Load the model while the server starts rather than during the first request
+    # Only in the process which serves requests, not the reloader's watcher process
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        preload_model_async()
+
     # Run (debug allows live reloading)
     app.run(debug=True, host="0.0.0.0", port=int(os.environ.get("PORT", 8080)))
 
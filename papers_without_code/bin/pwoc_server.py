@@ -5,11 +5,10 @@ import logging
 import sys
 import traceback
 
-import docker
-
 from papers_without_code.grobid import (
-    DEFAULT_GROBID_IMAGE,
-    setup_or_connect_to_server,
+    clear_connection_record,
+    find_grobid_containers,
+    setup_grobid_pool,
     teardown_server,
 )
 
@@ -48,6 +47,18 @@ class Args(argparse.Namespace):
             action="store_true",
             help="Shutdown and remove all GROBID servers.",
         )
+        p.add_argument(
+            "-n",
+            "--instances",
+            type=int,
+            default=None,
+            dest="instances",
+            help=(
+                "The number of GROBID servers to start on consecutive ports "
+                "(starting at GROBID_PORT or 8070). PDFs are balanced between "
+                "them. Defaults to the GROBID_INSTANCES environment variable or 1."
+            ),
+        )
         p.add_argument(
             "--debug",
             dest="debug",
@@ -57,7 +68,12 @@ class Args(argparse.Namespace):
         p.parse_args(namespace=self)
 
 
-def _pwoc_server(start: bool, stop: bool, shutdown: bool) -> None:
+def _pwoc_server(
+    start: bool,
+    stop: bool,
+    shutdown: bool,
+    instances: int | None = None,
+) -> None:
     # They can't both be true
     if start and shutdown:
         raise ValueError(
@@ -66,24 +82,22 @@ def _pwoc_server(start: bool, stop: bool, shutdown: bool) -> None:
 
     # Start
     if start:
-        setup_or_connect_to_server()
+        setup_grobid_pool(n_instances=instances)
         return
 
     # Just stop
     if stop:
-        docker_client = docker.from_env()
-        for container in docker_client.containers.list(all=True):
-            if container.image.tags[0] == DEFAULT_GROBID_IMAGE:
-                container.stop()
-                log.info(f"Stopped Docker container: '{container.short_id}'.")
+        clear_connection_record()
+        for container in find_grobid_containers():
+            container.stop()
+            log.info(f"Stopped Docker container: '{container.short_id}'.")
         return
 
     # Teardown all
     if shutdown:
-        docker_client = docker.from_env()
-        for container in docker_client.containers.list(all=True):
-            if container.image.tags[0] == DEFAULT_GROBID_IMAGE:
-                teardown_server(container)
+        clear_connection_record()
+        for container in find_grobid_containers():
+            teardown_server(container)
         return
 
 
@@ -105,7 +119,7 @@ def main() -> None:
 
     # Manage servers
     try:
-        _pwoc_server(args.start, args.stop, args.shutdown)
+        _pwoc_server(args.start, args.stop, args.shutdown, args.instances)
     except Exception as e:
         log.error("=============================================")
         log.error("\n\n" + traceback.format_exc())
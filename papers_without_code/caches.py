@@ -0,0 +1,1195 @@
+#!/usr/bin/env python
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, TypeVar
+
+import numpy as np
+
+from .custom_types import PathLike
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+DEFAULT_CACHE_DIR = Path("~/.cache/papers-without-code").expanduser()
+DEFAULT_EMBEDDING_CACHE_MAX_ENTRIES = 50_000
+
+DEFAULT_SEARCH_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+DEFAULT_README_CACHE_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_README_CACHE_MEMORY_ENTRIES = 1024
+
+DEFAULT_PAPER_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# Stale entries are kept this long for revalidation before being dropped
+STALE_ENTRY_MAX_AGE_SECONDS = 30 * 24 * 60 * 60
+
+# Only update the last access time of an entry this often
+LRU_TOUCH_INTERVAL_SECONDS = 60
+
+# Reserved slots not published in this time are assumed to be from a dead writer
+ABANDONED_RESERVATION_SECONDS = 300
+
+# SQLite limits the number of variables in a single statement
+_SQLITE_MAX_VARIABLES = 900
+
+# Embedding cache slot states
+_SLOT_FREE = 0
+_SLOT_RESERVED = 1
+_SLOT_READY = 2
+
+###############################################################################
+
+
+def get_cache_dir() -> Path:
+    """
+    Get the directory all persistent caches are stored in.
+
+    Returns
+    -------
+    Path
+        The cache directory. Uses the PWOC_CACHE_DIR environment variable
+        if set, otherwise `~/.cache/papers-without-code`.
+    """
+    if "PWOC_CACHE_DIR" in os.environ:
+        return Path(os.environ["PWOC_CACHE_DIR"]).expanduser().resolve()
+
+    return DEFAULT_CACHE_DIR
+
+
+def caching_enabled() -> bool:
+    """
+    Check if persistent caching has been disabled with the environment.
+
+    Returns
+    -------
+    bool
+        False if the PWOC_DISABLE_CACHE environment variable is set to a
+        truthy value, True otherwise.
+    """
+    return os.environ.get("PWOC_DISABLE_CACHE", "").lower() not in (
+        "1",
+        "true",
+        "yes",
+    )
+
+
+def _normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+def _hash_text(text: str, namespace: str = "") -> str:
+    return hashlib.sha256(f"{namespace}\n{_normalize_text(text)}".encode()).hexdigest()
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]", "_", name)
+
+
+def _connect(db_path: PathLike) -> sqlite3.Connection:
+    # Autocommit mode so that transactions are managed explicitly
+    # The timeout lets other processes wait on each others locks
+    conn = sqlite3.connect(
+        str(db_path),
+        timeout=30,
+        isolation_level=None,
+        check_same_thread=False,
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _chunks(items: list, size: int = _SQLITE_MAX_VARIABLES) -> list[list]:
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+def _get_ttl_seconds(env_var: str, default: float) -> float:
+    if env_var in os.environ:
+        log.debug(f"Using {env_var} from environment vars.")
+        return float(os.environ[env_var])
+
+    return default
+
+
+###############################################################################
+
+
+class EmbeddingCache:
+    """
+    A persistent, content-addressed cache of text embeddings.
+
+    Embeddings are stored in a memory-mapped float32 array with an SQLite
+    index mapping the hash of the model name and normalized text to a row
+    (slot) of the array. When the cache is full the least recently used slots
+    are reused.
+
+    Writers reserve slots in one transaction, write and flush the vectors,
+    then publish the key to slot mapping in a second transaction, so a key is
+    never visible while its slot holds another embedding. Readers never take
+    the SQLite write lock which lets many worker processes share the cache.
+
+    Parameters
+    ----------
+    model_name: str
+        The name of the model that produced the embeddings.
+    cache_dir: Optional[PathLike]
+        The directory to store the cache in.
+        Default: None (use `get_cache_dir()`)
+    max_entries: int
+        The maximum number of embeddings to store. Only used when the cache
+        is first created.
+        Default: 50000
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        cache_dir: PathLike | None = None,
+        max_entries: int = DEFAULT_EMBEDDING_CACHE_MAX_ENTRIES,
+    ) -> None:
+        if cache_dir is None:
+            cache_dir = get_cache_dir()
+
+        self.model_name = model_name
+        self.cache_dir = Path(cache_dir) / "embeddings" / _safe_name(model_name)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._vectors_path = self.cache_dir / "vectors.f32"
+        self._vectors: np.memmap | None = None
+        self._lock = threading.Lock()
+
+        # Create the index
+        self._conn = _connect(self.cache_dir / "index.sqlite")
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS slots ("
+                "slot INTEGER PRIMARY KEY, "
+                "key TEXT UNIQUE, "
+                "state INTEGER NOT NULL, "
+                "generation INTEGER NOT NULL, "
+                "last_access REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS slots_state_last_access "
+                "ON slots (state, last_access)"
+            )
+            self._conn.execute(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES ('max_entries', ?)",
+                (max_entries,),
+            )
+            stored_max_entries = self._get_meta("max_entries")
+            if stored_max_entries is None:
+                raise ValueError(
+                    f"Embedding cache index at '{self.cache_dir}' is missing "
+                    f"its 'max_entries' value."
+                )
+            self.max_entries: int = stored_max_entries
+
+    def _get_meta(self, key: str) -> int | None:
+        row = self._conn.execute(
+            "SELECT value FROM meta WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0]
+
+    def _key(self, text: str) -> str:
+        return _hash_text(text, namespace=self.model_name)
+
+    def _open_vectors(self) -> np.memmap | None:
+        # Open the array if any process has created it
+        if self._vectors is None:
+            stored_dim = self._get_meta("dim")
+            if stored_dim is not None:
+                self._vectors = np.memmap(
+                    self._vectors_path,
+                    dtype=np.float32,
+                    mode="r+",
+                    shape=(self.max_entries, stored_dim),
+                )
+
+        return self._vectors
+
+    def _create_vectors(self, dim: int) -> np.memmap:
+        # Must be called inside a write transaction
+        vectors = self._open_vectors()
+        if vectors is not None:
+            return vectors
+
+        # First writer creates the array
+        self._vectors = np.memmap(
+            self._vectors_path,
+            dtype=np.float32,
+            mode="w+",
+            shape=(self.max_entries, dim),
+        )
+        self._conn.execute("INSERT INTO meta (key, value) VALUES ('dim', ?)", (dim,))
+        return self._vectors
+
+    def _touch(self, slots: list[int]) -> None:
+        # Best effort, a busy database only costs LRU precision
+        now = time.time()
+        try:
+            for slots_chunk in _chunks(slots):
+                placeholders = ",".join("?" * len(slots_chunk))
+                self._conn.execute(
+                    f"UPDATE slots SET last_access = ? "
+                    f"WHERE slot IN ({placeholders})",
+                    [now, *slots_chunk],
+                )
+        except sqlite3.OperationalError as e:
+            log.debug(f"Skipped embedding cache LRU update, error: '{e}'.")
+
+    def get(self, texts: list[str]) -> list[np.ndarray | None]:
+        """
+        Get the cached embeddings for each text.
+
+        Parameters
+        ----------
+        texts: list[str]
+            The texts to get embeddings for.
+
+        Returns
+        -------
+        list[Optional[np.ndarray]]
+            The cached embedding for each text, None for texts not in the cache.
+        """
+        keys = [self._key(text) for text in texts]
+        unique_keys = list(set(keys))
+        found: dict[str, np.ndarray] = {}
+        with self._lock:
+            vectors = self._open_vectors()
+            if vectors is None:
+                return [None for _ in keys]
+
+            stale_slots = []
+            touch_before = time.time() - LRU_TOUCH_INTERVAL_SECONDS
+            for keys_chunk in _chunks(unique_keys):
+                placeholders = ",".join("?" * len(keys_chunk))
+                query = (
+                    f"SELECT key, slot, generation, last_access FROM slots "
+                    f"WHERE state = {_SLOT_READY} AND key IN ({placeholders})"
+                )
+                rows = self._conn.execute(query, keys_chunk).fetchall()
+                copied = {key: np.array(vectors[slot]) for key, slot, _, _ in rows}
+
+                # Only keep copies whose slot was not reassigned while copying
+                # Writers unpublish a slot before overwriting it
+                still_published = {
+                    (key, slot, generation)
+                    for key, slot, generation, _ in self._conn.execute(
+                        query, keys_chunk
+                    ).fetchall()
+                }
+                for key, slot, generation, last_access in rows:
+                    if (key, slot, generation) in still_published:
+                        found[key] = copied[key]
+                        if last_access < touch_before:
+                            stale_slots.append(slot)
+
+            # Mark as recently used
+            if len(stale_slots) > 0:
+                self._touch(stale_slots)
+
+        log.debug(
+            f"Embedding cache ('{self.model_name}') hits: {len(found)} "
+            f"of {len(unique_keys)} unique texts."
+        )
+        return [found.get(key) for key in keys]
+
+    def _reserve_slots(self, n_slots: int) -> list[tuple[int, int]]:
+        # Must be called inside a write transaction
+        # Returns (slot, generation) pairs that no reader can see
+        now = time.time()
+        reserved = []
+
+        # Reuse free slots and reservations abandoned by crashed writers
+        rows = self._conn.execute(
+            f"SELECT slot, generation FROM slots "
+            f"WHERE state = {_SLOT_FREE} "
+            f"OR (state = {_SLOT_RESERVED} AND last_access < ?) "
+            f"LIMIT ?",
+            (now - ABANDONED_RESERVATION_SECONDS, n_slots),
+        ).fetchall()
+        reserved.extend(rows)
+
+        # Fill never used slots
+        (n_slots_used,) = self._conn.execute("SELECT COUNT(*) FROM slots").fetchone()
+        for slot in range(
+            n_slots_used,
+            min(self.max_entries, n_slots_used + n_slots - len(reserved)),
+        ):
+            self._conn.execute(
+                f"INSERT INTO slots (slot, key, state, generation, last_access) "
+                f"VALUES (?, NULL, {_SLOT_FREE}, 0, ?)",
+                (slot, now),
+            )
+            reserved.append((slot, 0))
+
+        # Evict the least recently used
+        if len(reserved) < n_slots:
+            reserved.extend(
+                self._conn.execute(
+                    f"SELECT slot, generation FROM slots "
+                    f"WHERE state = {_SLOT_READY} "
+                    f"ORDER BY last_access ASC LIMIT ?",
+                    (n_slots - len(reserved),),
+                ).fetchall()
+            )
+
+        # Unpublish and bump generation so readers ignore in-flight copies
+        reserved = [(slot, generation + 1) for slot, generation in reserved]
+        self._conn.executemany(
+            f"UPDATE slots SET key = NULL, state = {_SLOT_RESERVED}, "
+            f"generation = ?, last_access = ? WHERE slot = ?",
+            [(generation, now, slot) for slot, generation in reserved],
+        )
+        return reserved
+
+    def _release_slots(self, reserved: list[tuple[int, int]]) -> None:
+        # Free any of our reservations which were not published
+        self._conn.executemany(
+            f"UPDATE slots SET key = NULL, state = {_SLOT_FREE} "
+            f"WHERE slot = ? AND generation = ? AND state = {_SLOT_RESERVED}",
+            reserved,
+        )
+
+    def _reserve_new(
+        self,
+        texts: list[str],
+        embeddings: np.ndarray,
+    ) -> tuple[np.memmap, list[tuple[str, np.ndarray]], list[tuple[int, int]]]:
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            vectors = self._create_vectors(dim=embeddings.shape[1])
+            if vectors.shape[1] != embeddings.shape[1]:
+                raise ValueError(
+                    f"Embedding dimension ({embeddings.shape[1]}) does not "
+                    f"match cached embedding dimension ({vectors.shape[1]}) "
+                    f"for model '{self.model_name}'."
+                )
+
+            # Find what is new
+            new_embeddings: dict[str, np.ndarray] = {}
+            for text, embedding in zip(texts, embeddings, strict=True):
+                new_embeddings[self._key(text)] = embedding
+            for keys_chunk in _chunks(list(new_embeddings)):
+                placeholders = ",".join("?" * len(keys_chunk))
+                for (key,) in self._conn.execute(
+                    f"SELECT key FROM slots WHERE key IN ({placeholders})",
+                    keys_chunk,
+                ).fetchall():
+                    del new_embeddings[key]
+
+            # Never evict more than the whole cache
+            new_items = list(new_embeddings.items())[-self.max_entries :]
+            reserved = self._reserve_slots(len(new_items))
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            # The array may have been created in the rolled back transaction
+            self._vectors = None
+            raise
+
+        return vectors, new_items, reserved
+
+    def _publish(
+        self,
+        new_items: list[tuple[str, np.ndarray]],
+        reserved: list[tuple[int, int]],
+    ) -> None:
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another writer may have published the same key in the meantime
+            now = time.time()
+            self._conn.executemany(
+                f"UPDATE OR IGNORE slots SET key = ?, state = {_SLOT_READY}, "
+                f"last_access = ? "
+                f"WHERE slot = ? AND generation = ? AND state = {_SLOT_RESERVED}",
+                [
+                    (key, now, slot, generation)
+                    for (key, _), (slot, generation) in zip(
+                        new_items, reserved, strict=True
+                    )
+                ],
+            )
+            self._release_slots(reserved)
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def put(self, texts: list[str], embeddings: np.ndarray) -> None:
+        """
+        Store embeddings for each text, evicting least recently used entries.
+
+        Parameters
+        ----------
+        texts: list[str]
+            The texts that were embedded.
+        embeddings: np.ndarray
+            The embeddings for each text with shape (len(texts), dim).
+
+        Raises
+        ------
+        ValueError
+            The embeddings dimension does not match the dimension of
+            embeddings already in the cache.
+        """
+        if len(texts) == 0:
+            return
+
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        with self._lock:
+            vectors, new_items, reserved = self._reserve_new(texts, embeddings)
+            if len(reserved) == 0:
+                return
+
+            # Write the vectors while no reader can see the slots
+            # then publish the keys
+            try:
+                for (_, embedding), (slot, _) in zip(new_items, reserved, strict=True):
+                    vectors[slot] = embedding
+                vectors.flush()
+                self._publish(new_items, reserved)
+            except BaseException:
+                # Hand the slots back, otherwise they are only reclaimed
+                # once considered abandoned
+                try:
+                    self._release_slots(reserved)
+                except sqlite3.Error as e:
+                    log.debug(f"Failed to release embedding cache slots: '{e}'.")
+                raise
+
+    def __len__(self) -> int:
+        """Get the number of embeddings stored in the cache."""
+        with self._lock:
+            (n_entries,) = self._conn.execute(
+                f"SELECT COUNT(*) FROM slots WHERE state = {_SLOT_READY}"
+            ).fetchone()
+        return n_entries
+
+
+###############################################################################
+
+_DEFAULT_EMBEDDING_CACHES: dict[str, EmbeddingCache] = {}
+_DEFAULT_EMBEDDING_CACHES_LOCK = threading.Lock()
+
+
+def get_default_embedding_cache(model_name: str) -> EmbeddingCache | None:
+    """
+    Get the process-wide embedding cache for a model.
+
+    Parameters
+    ----------
+    model_name: str
+        The name of the model that produces the embeddings.
+
+    Returns
+    -------
+    Optional[EmbeddingCache]
+        The shared embedding cache. None if caching is disabled with the
+        PWOC_DISABLE_CACHE environment variable or the cache could not be opened.
+    """
+    if not caching_enabled():
+        return None
+
+    with _DEFAULT_EMBEDDING_CACHES_LOCK:
+        if model_name not in _DEFAULT_EMBEDDING_CACHES:
+            try:
+                _DEFAULT_EMBEDDING_CACHES[model_name] = EmbeddingCache(model_name)
+            except (OSError, sqlite3.Error) as e:
+                log.warning(f"Could not open embedding cache, error: '{e}'.")
+                return None
+
+        return _DEFAULT_EMBEDDING_CACHES[model_name]
+
+
+###############################################################################
+
+
+@dataclass
+class CachedSearchResponse:
+    results: list[dict[str, Any]]
+    etag: str | None
+    fetched_at: float
+    fresh: bool
+
+
+class SearchResponseCache:
+    """
+    A persistent cache of GitHub repository search results.
+
+    Entries are keyed by the normalized (whitespace collapsed and lowercased)
+    query string, whether the query was strict, the page size, and page. Entries
+    older than the TTL are stale but keep their ETag so they can be revalidated
+    with a conditional request instead of downloading the results again.
+
+    Parameters
+    ----------
+    cache_dir: Optional[PathLike]
+        The directory to store the cache in.
+        Default: None (use `get_cache_dir()`)
+    ttl_seconds: Optional[float]
+        How long results are used without revalidation.
+        Default: None (check environment variables
+        for PWOC_SEARCH_CACHE_TTL_SECONDS or else use one day)
+    """
+
+    def __init__(
+        self,
+        cache_dir: PathLike | None = None,
+        ttl_seconds: float | None = None,
+    ) -> None:
+        if cache_dir is None:
+            cache_dir = get_cache_dir()
+        if ttl_seconds is None:
+            ttl_seconds = _get_ttl_seconds(
+                "PWOC_SEARCH_CACHE_TTL_SECONDS",
+                DEFAULT_SEARCH_CACHE_TTL_SECONDS,
+            )
+
+        self.ttl_seconds = ttl_seconds
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = _connect(self.cache_dir / "search-responses.sqlite")
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, "
+                "results TEXT NOT NULL, "
+                "etag TEXT, "
+                "fetched_at REAL NOT NULL)"
+            )
+
+            # Drop entries too old to be worth revalidating
+            self._conn.execute(
+                "DELETE FROM responses WHERE fetched_at < ?",
+                (time.time() - STALE_ENTRY_MAX_AGE_SECONDS,),
+            )
+
+    @staticmethod
+    def _key(query_str: str, strict: bool, per_page: int, page: int) -> str:
+        namespace = f"strict={strict}&per_page={per_page}"
+        if page > 1:
+            namespace = f"{namespace}&page={page}"
+        return _hash_text(_normalize_text(query_str).lower(), namespace=namespace)
+
+    def get(
+        self,
+        query_str: str,
+        strict: bool,
+        per_page: int,
+        page: int = 1,
+    ) -> CachedSearchResponse | None:
+        """
+        Get the stored results of a search.
+
+        Parameters
+        ----------
+        query_str: str
+            The search query.
+        strict: bool
+            Whether the query was searched as an exact phrase.
+        per_page: int
+            The number of results requested.
+        page: int
+            The page of results.
+            Default: 1
+
+        Returns
+        -------
+        Optional[CachedSearchResponse]
+            The stored results, their ETag, when they were fetched,
+            and whether they are still within the TTL.
+            None if the search was never stored.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT results, etag, fetched_at FROM responses WHERE key = ?",
+                (self._key(query_str, strict, per_page, page),),
+            ).fetchone()
+        if row is None:
+            return None
+
+        results, etag, fetched_at = row
+        return CachedSearchResponse(
+            results=json.loads(results),
+            etag=etag,
+            fetched_at=fetched_at,
+            fresh=time.time() - fetched_at < self.ttl_seconds,
+        )
+
+    def put(
+        self,
+        query_str: str,
+        strict: bool,
+        per_page: int,
+        results: list[dict[str, Any]],
+        etag: str | None = None,
+        page: int = 1,
+    ) -> None:
+        """
+        Store the results of a search.
+
+        Parameters
+        ----------
+        query_str: str
+            The search query.
+        strict: bool
+            Whether the query was searched as an exact phrase.
+        per_page: int
+            The number of results requested.
+        results: list[dict[str, Any]]
+            The JSON serializable results.
+        etag: Optional[str]
+            The ETag of the response the results came from.
+            Default: None (the entry can't be revalidated)
+        page: int
+            The page of results.
+            Default: 1
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, results, etag, fetched_at) "
+                "VALUES (?, ?, ?, ?)",
+                (
+                    self._key(query_str, strict, per_page, page),
+                    json.dumps(results),
+                    etag,
+                    time.time(),
+                ),
+            )
+
+    def refresh(
+        self, query_str: str, strict: bool, per_page: int, page: int = 1
+    ) -> None:
+        """
+        Mark stored results as fresh after a successful revalidation.
+
+        Parameters
+        ----------
+        query_str: str
+            The search query.
+        strict: bool
+            Whether the query was searched as an exact phrase.
+        per_page: int
+            The number of results requested.
+        page: int
+            The page of results.
+            Default: 1
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE responses SET fetched_at = ? WHERE key = ?",
+                (time.time(), self._key(query_str, strict, per_page, page)),
+            )
+
+
+###############################################################################
+
+
+@dataclass
+class CachedReadme:
+    text: str | None
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float
+    fresh: bool
+
+
+class ReadmeCache:
+    """
+    A two tier cache of repository README text.
+
+    The most recently used READMEs are kept in memory in front of an SQLite
+    store shared by every process. Entries are keyed by the (case-insensitive)
+    repository full name and keep the ETag and Last-Modified validators of the
+    response they came from so expired entries can be revalidated with a
+    conditional request. A None text records that the repository has no README.
+
+    Parameters
+    ----------
+    cache_dir: Optional[PathLike]
+        The directory to store the cache in.
+        Default: None (use `get_cache_dir()`)
+    ttl_seconds: Optional[float]
+        How long READMEs are used without revalidation.
+        Default: None (check environment variables
+        for PWOC_README_CACHE_TTL_SECONDS or else use one day)
+    memory_entries: int
+        The number of READMEs to keep in memory.
+        Default: 1024
+    """
+
+    def __init__(
+        self,
+        cache_dir: PathLike | None = None,
+        ttl_seconds: float | None = None,
+        memory_entries: int = DEFAULT_README_CACHE_MEMORY_ENTRIES,
+    ) -> None:
+        if cache_dir is None:
+            cache_dir = get_cache_dir()
+        if ttl_seconds is None:
+            ttl_seconds = _get_ttl_seconds(
+                "PWOC_README_CACHE_TTL_SECONDS",
+                DEFAULT_README_CACHE_TTL_SECONDS,
+            )
+
+        self.ttl_seconds = ttl_seconds
+        self.memory_entries = memory_entries
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._memory: OrderedDict[str, tuple] = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = _connect(self.cache_dir / "readmes.sqlite")
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS readmes ("
+                "repo_name TEXT PRIMARY KEY, "
+                "text TEXT, "
+                "etag TEXT, "
+                "last_modified TEXT, "
+                "fetched_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "DELETE FROM readmes WHERE fetched_at < ?",
+                (time.time() - STALE_ENTRY_MAX_AGE_SECONDS,),
+            )
+
+    def _remember(self, repo_name: str, entry: tuple) -> None:
+        # Must be called with the lock held
+        self._memory[repo_name] = entry
+        self._memory.move_to_end(repo_name)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, repo_name: str) -> CachedReadme | None:
+        """
+        Get a stored README.
+
+        Parameters
+        ----------
+        repo_name: str
+            The full name ("owner/name") of the repository.
+
+        Returns
+        -------
+        Optional[CachedReadme]
+            The README text (None if the repository has no README),
+            its validators, when it was fetched, and whether it is still
+            within the TTL. None if the README was never stored.
+        """
+        repo_name = repo_name.lower()
+        with self._lock:
+            entry = self._memory.get(repo_name)
+            if entry is not None:
+                self._memory.move_to_end(repo_name)
+            else:
+                entry = self._conn.execute(
+                    "SELECT text, etag, last_modified, fetched_at "
+                    "FROM readmes WHERE repo_name = ?",
+                    (repo_name,),
+                ).fetchone()
+                if entry is None:
+                    return None
+                self._remember(repo_name, entry)
+
+        text, etag, last_modified, fetched_at = entry
+        return CachedReadme(
+            text=text,
+            etag=etag,
+            last_modified=last_modified,
+            fetched_at=fetched_at,
+            fresh=time.time() - fetched_at < self.ttl_seconds,
+        )
+
+    def put(
+        self,
+        repo_name: str,
+        text: str | None,
+        etag: str | None = None,
+        last_modified: str | None = None,
+    ) -> None:
+        """
+        Store a README.
+
+        Parameters
+        ----------
+        repo_name: str
+            The full name ("owner/name") of the repository.
+        text: Optional[str]
+            The README text or None if the repository has no README.
+        etag: Optional[str]
+            The ETag of the response the README came from.
+            Default: None
+        last_modified: Optional[str]
+            The Last-Modified header of the response the README came from.
+            Default: None
+        """
+        repo_name = repo_name.lower()
+        entry = (text, etag, last_modified, time.time())
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO readmes "
+                "(repo_name, text, etag, last_modified, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (repo_name, *entry),
+            )
+            self._remember(repo_name, entry)
+
+
+###############################################################################
+
+
+class KeywordCache:
+    """
+    A persistent cache of keywords generated for paper text.
+
+    Entries are keyed by the model name, a hash of the prompt template, and a
+    hash of the (whitespace normalized) input text so that changing the model
+    or prompt never serves keywords generated by the old one. Keyword
+    generation is deterministic so entries do not expire.
+
+    Parameters
+    ----------
+    cache_dir: Optional[PathLike]
+        The directory to store the cache in.
+        Default: None (use `get_cache_dir()`)
+    """
+
+    def __init__(self, cache_dir: PathLike | None = None) -> None:
+        if cache_dir is None:
+            cache_dir = get_cache_dir()
+
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = _connect(self.cache_dir / "keywords.sqlite")
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS keywords ("
+                "key TEXT PRIMARY KEY, "
+                "keywords TEXT NOT NULL, "
+                "created_at REAL NOT NULL)"
+            )
+
+    @staticmethod
+    def _key(model_name: str, prompt_template: str, text: str) -> str:
+        prompt_hash = hashlib.sha256(prompt_template.encode()).hexdigest()
+        return _hash_text(text, namespace=f"model={model_name}&prompt={prompt_hash}")
+
+    def get(
+        self,
+        model_name: str,
+        prompt_template: str,
+        text: str,
+    ) -> list[str] | None:
+        """
+        Get the stored keywords for a text.
+
+        Parameters
+        ----------
+        model_name: str
+            The name of the model the keywords were generated with.
+        prompt_template: str
+            The prompt template the keywords were generated with.
+        text: str
+            The text the keywords were generated for.
+
+        Returns
+        -------
+        Optional[list[str]]
+            The stored keywords. None if they were never stored.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT keywords FROM keywords WHERE key = ?",
+                (self._key(model_name, prompt_template, text),),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+
+        return json.loads(row[0])
+
+    def put(
+        self,
+        model_name: str,
+        prompt_template: str,
+        text: str,
+        keywords: list[str],
+    ) -> None:
+        """
+        Store the keywords generated for a text.
+
+        Parameters
+        ----------
+        model_name: str
+            The name of the model the keywords were generated with.
+        prompt_template: str
+            The prompt template the keywords were generated with.
+        text: str
+            The text the keywords were generated for.
+        keywords: list[str]
+            The generated keywords.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO keywords (key, keywords, created_at) "
+                "VALUES (?, ?, ?)",
+                (
+                    self._key(model_name, prompt_template, text),
+                    json.dumps(keywords),
+                    time.time(),
+                ),
+            )
+
+
+class PaperCache:
+    """
+    A persistent cache of paper metadata.
+
+    Each paper is stored once under its Semantic Scholar paper ID and can be
+    looked up by any of its aliases (for example the normalized DOI, arXiv ID,
+    CorpusID, or the query it was first found with). Entries older than the
+    TTL are treated as missing.
+
+    Parameters
+    ----------
+    cache_dir: Optional[PathLike]
+        The directory to store the cache in.
+        Default: None (use `get_cache_dir()`)
+    ttl_seconds: Optional[float]
+        How long paper metadata is used before being fetched again.
+        Default: None (check environment variables
+        for PWOC_PAPER_CACHE_TTL_SECONDS or else use one week)
+    """
+
+    def __init__(
+        self,
+        cache_dir: PathLike | None = None,
+        ttl_seconds: float | None = None,
+    ) -> None:
+        if cache_dir is None:
+            cache_dir = get_cache_dir()
+        if ttl_seconds is None:
+            ttl_seconds = _get_ttl_seconds(
+                "PWOC_PAPER_CACHE_TTL_SECONDS",
+                DEFAULT_PAPER_CACHE_TTL_SECONDS,
+            )
+
+        self.ttl_seconds = ttl_seconds
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = _connect(self.cache_dir / "papers.sqlite")
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS papers ("
+                "paper_id TEXT PRIMARY KEY, "
+                "data TEXT NOT NULL, "
+                "fetched_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS aliases ("
+                "alias TEXT PRIMARY KEY, "
+                "paper_id TEXT NOT NULL)"
+            )
+
+            # Drop expired papers and their aliases
+            self._conn.execute(
+                "DELETE FROM papers WHERE fetched_at < ?",
+                (time.time() - self.ttl_seconds,),
+            )
+            self._conn.execute(
+                "DELETE FROM aliases "
+                "WHERE paper_id NOT IN (SELECT paper_id FROM papers)"
+            )
+
+    def get(self, alias: str) -> dict[str, Any] | None:
+        """
+        Get the stored metadata of a paper.
+
+        Parameters
+        ----------
+        alias: str
+            Any normalized identifier the paper was stored with.
+
+        Returns
+        -------
+        Optional[dict[str, Any]]
+            The stored metadata. None if the paper was never stored
+            under this alias or has expired.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT papers.data, papers.fetched_at FROM aliases "
+                "JOIN papers ON papers.paper_id = aliases.paper_id "
+                "WHERE aliases.alias = ?",
+                (alias,),
+            ).fetchone()
+        if row is None:
+            return None
+
+        data, fetched_at = row
+        if time.time() - fetched_at >= self.ttl_seconds:
+            return None
+
+        return json.loads(data)
+
+    def put(self, paper_id: str, data: dict[str, Any], aliases: list[str]) -> None:
+        """
+        Store the metadata of a paper.
+
+        Parameters
+        ----------
+        paper_id: str
+            The unique ID of the paper.
+        data: dict[str, Any]
+            The JSON serializable metadata.
+        aliases: list[str]
+            Every normalized identifier the paper can be looked up with.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO papers (paper_id, data, fetched_at) "
+                    "VALUES (?, ?, ?)",
+                    (paper_id, json.dumps(data), time.time()),
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO aliases (alias, paper_id) VALUES (?, ?)",
+                    [(alias, paper_id) for alias in {paper_id, *aliases}],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+
+###############################################################################
+
+_T = TypeVar("_T")
+_CacheT = TypeVar("_CacheT")
+_DEFAULT_CACHES: dict[str, Any] = {}
+_DEFAULT_CACHES_LOCK = threading.Lock()
+
+
+def try_cache(
+    action: str, func: Callable[..., _T], *args: Any, **kwargs: Any
+) -> _T | None:
+    """
+    Call a cache method, logging and ignoring any cache failure.
+
+    Parameters
+    ----------
+    action: str
+        What is being done for the log message (e.g. "read from search").
+    func: Callable[..., T]
+        The cache method to call.
+    *args: Any
+        Positional arguments for the method.
+    **kwargs: Any
+        Keyword arguments for the method.
+
+    Returns
+    -------
+    Optional[T]
+        The result of the method. None if the cache failed.
+    """
+    # The cache is only an optimization, on any failure carry on without it
+    try:
+        return func(*args, **kwargs)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        log.warning(f"Failed to {action} cache, error: '{e}'.")
+        return None
+
+
+def _get_default_cache(name: str, factory: Callable[[], _CacheT]) -> _CacheT | None:
+    if not caching_enabled():
+        return None
+
+    with _DEFAULT_CACHES_LOCK:
+        if name not in _DEFAULT_CACHES:
+            try:
+                _DEFAULT_CACHES[name] = factory()
+            except (OSError, sqlite3.Error) as e:
+                log.warning(f"Could not open {name} cache, error: '{e}'.")
+                return None
+
+        return _DEFAULT_CACHES[name]
+
+
+def get_default_search_cache() -> SearchResponseCache | None:
+    """
+    Get the process-wide GitHub search response cache.
+
+    Returns
+    -------
+    Optional[SearchResponseCache]
+        The shared cache. None if caching is disabled with the
+        PWOC_DISABLE_CACHE environment variable or the cache could not be opened.
+    """
+    return _get_default_cache("search", SearchResponseCache)
+
+
+def get_default_readme_cache() -> ReadmeCache | None:
+    """
+    Get the process-wide README cache.
+
+    Returns
+    -------
+    Optional[ReadmeCache]
+        The shared cache. None if caching is disabled with the
+        PWOC_DISABLE_CACHE environment variable or the cache could not be opened.
+    """
+    return _get_default_cache("readme", ReadmeCache)
+
+
+def get_default_keyword_cache() -> KeywordCache | None:
+    """
+    Get the process-wide keyword cache.
+
+    Returns
+    -------
+    Optional[KeywordCache]
+        The shared cache. None if caching is disabled with the
+        PWOC_DISABLE_CACHE environment variable or the cache could not be opened.
+    """
+    return _get_default_cache("keyword", KeywordCache)
+
+
+def get_default_paper_cache() -> PaperCache | None:
+    """
+    Get the process-wide paper metadata cache.
+
+    Returns
+    -------
+    Optional[PaperCache]
+        The shared cache. None if caching is disabled with the
+        PWOC_DISABLE_CACHE environment variable or the cache could not be opened.
+    """
+    return _get_default_cache("paper", PaperCache)
@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+
+import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Protocol
+
+import numpy as np
+
+from .custom_types import PathLike
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+SENTENCE_TRANSFORMERS_BACKEND = "sentence-transformers"
+ONNX_BACKEND = "onnx"
+ONNX_INT8_BACKEND = "onnx-int8"
+ENCODER_BACKENDS = (SENTENCE_TRANSFORMERS_BACKEND, ONNX_BACKEND, ONNX_INT8_BACKEND)
+DEFAULT_ENCODER_BACKEND = SENTENCE_TRANSFORMERS_BACKEND
+
+ONNX_MODEL_FILENAME = "model.onnx"
+ONNX_INT8_MODEL_FILENAME = "model-int8.onnx"
+DEFAULT_ONNX_MAX_SEQ_LENGTH = 512
+
+###############################################################################
+
+
+class Encoder(Protocol):
+    """
+    The interface shared by every encoder backend.
+
+    `SentenceTransformer` already provides it, other backends mirror the
+    subset of the `SentenceTransformer` API used by this package.
+    """
+
+    tokenizer: Any
+    max_seq_length: int
+
+    def encode(
+        self,
+        sentences: str | list[str],
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+    ) -> np.ndarray:
+        """Encode one or many texts into embeddings."""
+        ...
+
+
+def resolve_backend(backend: str | None = None) -> str:
+    """
+    Resolve which encoder backend to use.
+
+    Parameters
+    ----------
+    backend: Optional[str]
+        The backend name. One of "sentence-transformers", "onnx", or "onnx-int8".
+        Default: None (check environment variables
+        for PWOC_ENCODER_BACKEND or else use "sentence-transformers")
+
+    Returns
+    -------
+    str
+        The backend name.
+
+    Raises
+    ------
+    ValueError
+        Unknown backend.
+    """
+    if backend is None:
+        if "PWOC_ENCODER_BACKEND" in os.environ:
+            log.debug("Using PWOC_ENCODER_BACKEND from environment vars.")
+            backend = os.environ["PWOC_ENCODER_BACKEND"]
+        else:
+            backend = DEFAULT_ENCODER_BACKEND
+
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(
+            f"Unknown encoder backend: '{backend}'. "
+            f"Choose one of: {ENCODER_BACKENDS}."
+        )
+
+    return backend
+
+
+def get_default_onnx_model_dir(model_name: str) -> Path:
+    """
+    Get the directory an exported ONNX model is stored in.
+
+    Parameters
+    ----------
+    model_name: str
+        The name of the sentence transformer model that was exported.
+
+    Returns
+    -------
+    Path
+        The PWOC_ONNX_MODEL_DIR environment variable if set,
+        otherwise `./onnx_{model_name}`.
+    """
+    if "PWOC_ONNX_MODEL_DIR" in os.environ:
+        return Path(os.environ["PWOC_ONNX_MODEL_DIR"]).expanduser().resolve()
+
+    return Path(f"./onnx_{model_name}").resolve()
+
+
+###############################################################################
+
+
+class ONNXEncoder:
+    """
+    Encode text with an exported sentence transformer using ONNX Runtime.
+
+    Matches the mean pooling used by `thenlper/gte-small` and other
+    mean pooled sentence transformers.
+    Create the model directory with `scripts/export-onnx-model.py`.
+
+    Parameters
+    ----------
+    model_dir: PathLike
+        The directory containing the exported model and tokenizer.
+    quantized: bool
+        Use the dynamically int8 quantized model rather than the float32 model.
+        Default: False
+    max_seq_length: int
+        The maximum number of tokens per text, longer texts are truncated.
+        Default: 512
+    """
+
+    def __init__(
+        self,
+        model_dir: PathLike,
+        quantized: bool = False,
+        max_seq_length: int = DEFAULT_ONNX_MAX_SEQ_LENGTH,
+    ) -> None:
+        try:
+            import onnxruntime
+            from transformers import AutoTokenizer
+        except ImportError as e:
+            raise ImportError(
+                "The ONNX encoder backend requires extra dependencies. "
+                "Install them with: `pip install papers-without-code[onnx]`."
+            ) from e
+
+        self.model_dir = Path(model_dir)
+        self.model_path = self.model_dir / (
+            ONNX_INT8_MODEL_FILENAME if quantized else ONNX_MODEL_FILENAME
+        )
+        if not self.model_path.exists():
+            raise FileNotFoundError(
+                f"No exported ONNX model found at: '{self.model_path}'. "
+                f"Create one with `python scripts/export-onnx-model.py`."
+            )
+
+        self.max_seq_length = max_seq_length
+        self.tokenizer = AutoTokenizer.from_pretrained(str(self.model_dir))
+        self._session = onnxruntime.InferenceSession(
+            str(self.model_path),
+            providers=["CPUExecutionProvider"],
+        )
+        self._input_names = {
+            session_input.name for session_input in self._session.get_inputs()
+        }
+
+    def _encode_batch(self, texts: list[str]) -> np.ndarray:
+        tokens = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_seq_length,
+            return_tensors="np",
+        )
+        inputs = {
+            name: value.astype(np.int64)
+            for name, value in tokens.items()
+            if name in self._input_names
+        }
+        (token_embeddings,) = self._session.run(["last_hidden_state"], inputs)
+
+        # Mean pooling over the non-padding tokens
+        mask = tokens["attention_mask"][..., np.newaxis].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        return summed / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def encode(
+        self,
+        sentences: str | list[str],
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+    ) -> np.ndarray:
+        """
+        Encode one or many texts into embeddings.
+
+        Parameters
+        ----------
+        sentences: Union[str, list[str]]
+            The text or texts to encode.
+        batch_size: int
+            The number of texts to encode in each call to the ONNX session.
+            Default: 32
+        normalize_embeddings: bool
+            Should the embeddings be L2 normalized.
+            Default: False
+
+        Returns
+        -------
+        np.ndarray
+            A single embedding if a single text was provided,
+            otherwise an array of embeddings in the same order as the texts.
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if isinstance(sentences, str) else sentences
+        if len(texts) == 0:
+            return np.empty((0, 0), dtype=np.float32)
+
+        # Batch similar lengths together to reduce padding
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            batches.append(
+                self._encode_batch(
+                    [texts[i] for i in order[start : start + batch_size]]
+                )
+            )
+        sorted_embeddings = np.concatenate(batches)
+        embeddings = np.empty_like(sorted_embeddings)
+        embeddings[order] = sorted_embeddings
+
+        if normalize_embeddings:
+            embeddings /= np.clip(
+                np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None
+            )
+
+        if single:
+            return embeddings[0]
+        return embeddings
+
+    def memory_usage(self) -> int:
+        """Get the size in bytes of the loaded model weights."""
+        return self.model_path.stat().st_size
+
+
+###############################################################################
+
+
+@dataclass
+class RankingParityResults:
+    max_score_difference: float
+    same_ranking: bool
+    passed: bool
+
+
+def check_ranking_parity(
+    reference: Encoder,
+    candidate: Encoder,
+    query: str,
+    documents: list[str],
+    tolerance: float = 0.02,
+) -> RankingParityResults:
+    """
+    Check that a candidate encoder ranks documents like a reference encoder.
+
+    Parameters
+    ----------
+    reference: Encoder
+        The encoder to compare against (normally the sentence-transformers backend).
+    candidate: Encoder
+        The encoder to check.
+    query: str
+        The text documents are ranked by similarity to (for example an abstract).
+    documents: list[str]
+        The texts to rank (for example READMEs).
+    tolerance: float
+        The largest allowed difference in cosine similarity. Documents whose
+        reference scores are within this tolerance may swap places.
+        Default: 0.02
+
+    Returns
+    -------
+    RankingParityResults
+        The largest score difference, whether the rankings matched,
+        and whether the candidate passed.
+    """
+
+    def _scores(encoder: Encoder) -> np.ndarray:
+        query_embedding = encoder.encode(query, normalize_embeddings=True)
+        document_embeddings = encoder.encode(documents, normalize_embeddings=True)
+        return document_embeddings @ query_embedding
+
+    reference_scores = _scores(reference)
+    candidate_scores = _scores(candidate)
+    max_score_difference = float(np.abs(reference_scores - candidate_scores).max())
+
+    # Compare orderings, ignoring swaps between near-ties in the reference
+    reference_order = np.argsort(-reference_scores, kind="stable")
+    candidate_order = np.argsort(-candidate_scores, kind="stable")
+    same_ranking = bool(
+        np.all(
+            np.abs(
+                reference_scores[reference_order] - reference_scores[candidate_order]
+            )
+            <= tolerance
+        )
+    )
+
+    return RankingParityResults(
+        max_score_difference=max_score_difference,
+        same_ranking=same_ranking,
+        passed=same_ranking and max_score_difference <= tolerance,
+    )
@@ -1,8 +1,12 @@
 #!/usr/bin/env python
 
+import glob
+import json
 import logging
 import os
+import threading
 import time
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
@@ -11,7 +15,9 @@ import requests
 import xmltodict
 from grobid_client.grobid_client import GrobidClient
 
+from .caches import get_cache_dir, try_cache
 from .custom_types import PathLike
+from .network import get_session
 
 ###############################################################################
 
@@ -23,26 +29,389 @@ DEFAULT_GROBID_IMAGE = "lfoppiano/grobid:0.7.2"
 DEFAULT_GROBID_PORT = 8070
 DEFAULT_GROBID_CLIENT_KWS = {"timeout": 120}
 
+# Header mode only parses the first page (title, authors, abstract)
+GROBID_MODE_HEADER = "header"
+GROBID_MODE_FULLTEXT = "fulltext"
+GROBID_MODE_SERVICES = {
+    GROBID_MODE_HEADER: "processHeaderDocument",
+    GROBID_MODE_FULLTEXT: "processFulltextDocument",
+}
+DEFAULT_GROBID_MODE = GROBID_MODE_HEADER
+
+# Matches the number of PDFs GROBID processes at once in its default config
+DEFAULT_GROBID_CONCURRENCY = 10
+
+# How long an unhealthy server is left before checking it again
+GROBID_HEALTH_RECHECK_SECONDS = 30
+
+# Starting servers are polled until alive, the JVM can take a while on slow machines
+DEFAULT_GROBID_READY_TIMEOUT_SECONDS = 120
+GROBID_READY_INITIAL_DELAY_SECONDS = 0.1
+GROBID_READY_MAX_DELAY_SECONDS = 2
+
+# The last servers set up, stored in the cache dir
+GROBID_CONNECTION_RECORD_FILE = "grobid-connection.json"
+
+# Failures worth retrying on another server (timed out or a server error)
+_RETRY_STATUS_CODES = (408, 500, 502, 503, 504)
+
 ###############################################################################
 
 
-def setup_or_connect_to_server(  # noqa: C901
+class GrobidProcessingError(ValueError):
+    """Raised when GROBID fails to process a PDF."""
+
+    def __init__(self, message: str, status_code: int | None = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass
+class GrobidInstance:
+    url: str
+    client: GrobidClient
+    container_id: str
+    container: docker.models.containers.Container | None = None
+    in_flight: int = 0
+    healthy: bool = True
+    checked_at: float = 0.0
+
+    def get_container(self) -> docker.models.containers.Container:
+        """
+        Get the Docker container of the server.
+
+        Servers connected to from the connection record only look up
+        their container when it is needed (for example for teardown).
+
+        Returns
+        -------
+        docker.models.containers.Container
+            The Docker container object for management.
+        """
+        if self.container is None:
+            self.container = docker.from_env().containers.get(self.container_id)
+        return self.container
+
+
+def _get_image(image: str | None) -> str:
+    if image is None:
+        if "GROBID_IMAGE" in os.environ:
+            log.debug("Using GROBID_IMAGE from environment vars.")
+            return os.environ["GROBID_IMAGE"]
+        return DEFAULT_GROBID_IMAGE
+    return image
+
+
+def _get_host_port(container: docker.models.containers.Container) -> int | None:
+    # Read from the config so stopped containers are found too
+    bindings = container.attrs.get("HostConfig", {}).get("PortBindings") or {}
+    for binding in bindings.get("8070/tcp") or []:
+        if binding.get("HostPort"):
+            return int(binding["HostPort"])
+
+    return None
+
+
+def find_grobid_containers(
+    image: str | None = None,
+    docker_client: docker.DockerClient | None = None,
+) -> list[docker.models.containers.Container]:
+    """
+    Find every GROBID container (running or stopped).
+
+    Parameters
+    ----------
+    image: Optional[str]
+        The Docker image the containers were created from.
+        Default: None (check environment variables
+        for GROBID_IMAGE or else use default image)
+    docker_client: Optional[docker.DockerClient]
+        The Docker client to use.
+        Default: None (connect with `docker.from_env()`)
+
+    Returns
+    -------
+    list[docker.models.containers.Container]
+        The containers created from the image.
+    """
+    image = _get_image(image)
+    if docker_client is None:
+        docker_client = docker.from_env()
+
+    return [
+        container
+        for container in docker_client.containers.list(all=True)
+        if image in container.image.tags
+    ]
+
+
+def _start_container(
+    docker_client: docker.DockerClient,
+    image: str,
+    port: int,
+    containers: list[docker.models.containers.Container],
+) -> docker.models.containers.Container:
+    # Reuse the container already bound to this port
+    for container in containers:
+        if _get_host_port(container) == port:
+            if container.status != "running":
+                log.debug(
+                    f"Found stopped GROBID container "
+                    f"('{container.short_id}') -- Starting."
+                )
+                container.start()
+            return container
+
+    # Start new container
+    log.info(f"Setting up PDF parsing server on port {port}.")
+    log.debug(f"Using GROBID image: '{image}'.")
+    container = docker_client.containers.run(
+        image,
+        ports={"8070/tcp": port},
+        detach=True,
+    )
+    log.debug(f"Started GROBID container: '{container.short_id}'.")
+    return container
+
+
+def _is_alive(url: str) -> bool:
+    try:
+        response = get_session().get(f"{url}/api/isalive", timeout=5)
+        response.raise_for_status()
+        return True
+    except Exception as e:
+        log.debug(f"GROBID server at '{url}' is not alive, error: '{e}'.")
+        return False
+
+
+def wait_until_alive(url: str, timeout_seconds: float | None = None) -> bool:
+    """
+    Wait for a GROBID server to be ready.
+
+    The server is polled with an exponential backoff so a server which is
+    already alive (or comes alive quickly) is used right away while one with
+    a slow starting JVM is given until the deadline.
+
+    Parameters
+    ----------
+    url: str
+        The URL of the GROBID server.
+    timeout_seconds: Optional[float]
+        The longest to wait for the server.
+        Default: None (check environment variables
+        for GROBID_READY_TIMEOUT_SECONDS or else use 120 seconds)
+
+    Returns
+    -------
+    bool
+        Whether the server is alive.
+    """
+    if timeout_seconds is None:
+        if "GROBID_READY_TIMEOUT_SECONDS" in os.environ:
+            log.debug("Using GROBID_READY_TIMEOUT_SECONDS from environment vars.")
+            timeout_seconds = float(os.environ["GROBID_READY_TIMEOUT_SECONDS"])
+        else:
+            timeout_seconds = DEFAULT_GROBID_READY_TIMEOUT_SECONDS
+
+    deadline = time.monotonic() + timeout_seconds
+    delay = GROBID_READY_INITIAL_DELAY_SECONDS
+    while not _is_alive(url):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, GROBID_READY_MAX_DELAY_SECONDS)
+
+    return True
+
+
+def _get_connection_record_path() -> Path:
+    return get_cache_dir() / GROBID_CONNECTION_RECORD_FILE
+
+
+def _read_connection_record(image: str, ports: list[int]) -> list[str] | None:
+    # Container IDs of the servers if the record matches the requested setup
+    record_path = _get_connection_record_path()
+    if not record_path.exists():
+        return None
+    with record_path.open() as open_f:
+        record = json.load(open_f)
+    if record.get("image") != image or record.get("ports") != ports:
+        return None
+
+    return record.get("container_ids")
+
+
+def _write_connection_record(image: str, ports: list[int], pool: "GrobidPool") -> None:
+    record_path = _get_connection_record_path()
+    record_path.parent.mkdir(parents=True, exist_ok=True)
+    with record_path.open("w") as open_f:
+        json.dump(
+            {
+                "image": image,
+                "ports": ports,
+                "container_ids": [instance.container_id for instance in pool.instances],
+            },
+            open_f,
+        )
+
+
+def clear_connection_record() -> None:
+    """Forget the GROBID servers so the next setup checks Docker again."""
+    _get_connection_record_path().unlink(missing_ok=True)
+
+
+class GrobidPool:
+    """
+    Send PDFs to the least loaded of many GROBID servers.
+
+    A server which fails a request is marked unhealthy, the request is retried
+    on another server, and the unhealthy server is checked again later.
+
+    Parameters
+    ----------
+    instances: list[GrobidInstance]
+        The GROBID servers.
+    """
+
+    def __init__(self, instances: list[GrobidInstance]) -> None:
+        self.instances = instances
+        self._lock = threading.Lock()
+
+    @property
+    def containers(self) -> list[docker.models.containers.Container]:
+        """The Docker containers of every server."""
+        return [instance.get_container() for instance in self.instances]
+
+    def _acquire(self, exclude: list[GrobidInstance]) -> GrobidInstance:
+        with self._lock:
+            # Check unhealthy servers again after a while
+            now = time.monotonic()
+            for instance in self.instances:
+                if (
+                    not instance.healthy
+                    and now - instance.checked_at >= GROBID_HEALTH_RECHECK_SECONDS
+                ):
+                    instance.checked_at = now
+                    instance.healthy = _is_alive(instance.url)
+
+            candidates = [
+                instance
+                for instance in self.instances
+                if instance.healthy and instance not in exclude
+            ]
+            if len(candidates) == 0:
+                raise ConnectionError("No healthy GROBID server available.")
+
+            instance = min(candidates, key=lambda instance: instance.in_flight)
+            instance.in_flight += 1
+            return instance
+
+    def _release(self, instance: GrobidInstance, healthy: bool) -> None:
+        with self._lock:
+            instance.in_flight -= 1
+            if not healthy:
+                log.warning(f"Marking GROBID server at '{instance.url}' unhealthy.")
+                instance.healthy = False
+                instance.checked_at = time.monotonic()
+
+    def process_pdf(
+        self,
+        pdf_path: PathLike,
+        mode: str | None = None,
+        consolidate_header: bool | None = None,
+    ) -> dict[str, Any]:
+        """
+        Process a PDF file on the least loaded healthy server.
+
+        Parameters
+        ----------
+        pdf_path: PathLike
+            The path to the local PDF file to process.
+        mode: Optional[str]
+            What to parse (see `process_pdf`).
+            Default: None (check environment variables
+            for GROBID_MODE or else use "header")
+        consolidate_header: Optional[bool]
+            Should GROBID complete the parsed header with metadata from CrossRef.
+            Default: None (check environment variables
+            for GROBID_CONSOLIDATE_HEADER or else consolidate)
+
+        Returns
+        -------
+        Dict[str, Any]
+            Paper data.
+
+        Raises
+        ------
+        ConnectionError
+            No healthy server is available.
+        ValueError
+            Something went wrong during processing.
+        """
+        tried: list[GrobidInstance] = []
+        while True:
+            instance = self._acquire(exclude=tried)
+            tried.append(instance)
+            try:
+                result = process_pdf(
+                    instance.client,
+                    pdf_path,
+                    mode=mode,
+                    consolidate_header=consolidate_header,
+                )
+            # Server problems are retried elsewhere, bad PDFs are not
+            except (requests.ConnectionError, GrobidProcessingError) as e:
+                retry = not isinstance(e, GrobidProcessingError) or (
+                    e.status_code in _RETRY_STATUS_CODES
+                )
+                self._release(instance, healthy=not retry)
+                if not retry or len(tried) == len(self.instances):
+                    raise
+                log.debug(f"Retrying '{pdf_path}' on another GROBID server.")
+                continue
+            except BaseException:
+                self._release(instance, healthy=True)
+                raise
+
+            self._release(instance, healthy=True)
+            return result
+
+    def teardown(self) -> None:
+        """Stop and remove the Docker container of every server."""
+        try_cache("clear GROBID connection", clear_connection_record)
+        for container in self.containers:
+            teardown_server(container)
+
+
+def setup_grobid_pool(
+    n_instances: int | None = None,
     image: str | None = None,
     port: int | None = None,
     grobid_client_kws: dict[str, Any] | None = None,
-) -> tuple[GrobidClient | None, docker.models.containers.Container]:
+) -> GrobidPool:
     """
-    Set up or create a connection to a GROBID server.
+    Set up or connect to a pool of GROBID servers on consecutive ports.
+
+    The servers set up are recorded in the cache dir. When the same servers
+    are requested again and are all alive they are used without going
+    through Docker. Otherwise containers are started (or reused) and polled
+    until alive (see `wait_until_alive`).
 
     Parameters
     ----------
+    n_instances: Optional[int]
+        The number of GROBID servers (each a Docker container) to run.
+        Each server uses its own JVM so throughput scales with the cores given.
+        Default: None (check environment variables
+        for GROBID_INSTANCES or else use 1)
     image: Optional[str]
         The Docker image name to use for pulling (if needed)
-        and creating the container.
+        and creating the containers.
         Default: None (check environment variables
         for GROBID_IMAGE or else use default image)
     port: Optional[int]
-        The port to make available on the GROBID server and Docker container.
+        The port of the first server, the others use the following ports.
         Default: None (check environment variables
         for GROBID_PORT or else use default default port)
     grobid_client_kws: Dict[str, Any]
@@ -51,19 +420,19 @@ def setup_or_connect_to_server(  # noqa: C901
 
     Returns
     -------
-    Optional[GrobidClient]
-        If all setup and/or connection was successful, the GROBID client connection.
-        None if something went wrong.
-    docker.models.containers.Container
-        The Docker container object for future management.
+    GrobidPool
+        The servers. Servers which could not be connected to are marked
+        unhealthy and checked again later.
     """
     # Handle vars
-    if image is None:
-        if "GROBID_IMAGE" in os.environ:
-            log.debug("Using GROBID_IMAGE from environment vars.")
-            image = os.environ["GROBID_IMAGE"]
+    if n_instances is None:
+        if "GROBID_INSTANCES" in os.environ:
+            log.debug("Using GROBID_INSTANCES from environment vars.")
+            n_instances = int(os.environ["GROBID_INSTANCES"])
         else:
-            image = DEFAULT_GROBID_IMAGE
+            n_instances = 1
+    n_instances = max(n_instances, 1)
+    image = _get_image(image)
     if port is None:
         if "GROBID_PORT" in os.environ:
             log.debug("Using GROBID_PORT from environment vars.")
@@ -75,6 +444,64 @@ def setup_or_connect_to_server(  # noqa: C901
     if not grobid_client_kws:
         grobid_client_kws = DEFAULT_GROBID_CLIENT_KWS
 
+    # Skip Docker when the last servers set up are still alive
+    ports = list(range(port, port + n_instances))
+    container_ids = try_cache(
+        "read from GROBID connection", _read_connection_record, image, ports
+    )
+    if container_ids is not None:
+        pool = GrobidPool(
+            [
+                _make_instance(instance_port, container_id, grobid_client_kws)
+                for instance_port, container_id in zip(
+                    ports, container_ids, strict=True
+                )
+            ]
+        )
+        if all(instance.healthy for instance in pool.instances):
+            log.debug("Connected to GROBID servers from the connection record.")
+            return pool
+
+    pool = _start_pool(image, ports, grobid_client_kws)
+    if all(instance.healthy for instance in pool.instances):
+        try_cache(
+            "write to GROBID connection", _write_connection_record, image, ports, pool
+        )
+
+    return pool
+
+
+def _make_instance(
+    port: int,
+    container_id: str,
+    grobid_client_kws: dict[str, Any],
+    container: docker.models.containers.Container | None = None,
+    timeout_seconds: float | None = 0,
+) -> GrobidInstance:
+    server_url = f"http://127.0.0.1:{port}"
+    healthy = wait_until_alive(server_url, timeout_seconds=timeout_seconds)
+    if healthy:
+        log.debug(f"GROBID API available at: '{server_url}'.")
+
+    return GrobidInstance(
+        url=server_url,
+        client=GrobidClient(
+            grobid_server=server_url,
+            check_server=False,
+            **grobid_client_kws,
+        ),
+        container_id=container_id,
+        container=container,
+        healthy=healthy,
+        checked_at=time.monotonic(),
+    )
+
+
+def _start_pool(
+    image: str,
+    ports: list[int],
+    grobid_client_kws: dict[str, Any],
+) -> GrobidPool:
     # Connect to Docker client
     docker_client = docker.from_env()
 
@@ -88,56 +515,74 @@ def setup_or_connect_to_server(  # noqa: C901
         )
         docker_client.images.pull(image)
 
-    # Check for already running image
-    # Connect or start again
-    found_running_grobid_image = False
-    for container in docker_client.containers.list():
-        if container.image.tags[0] == DEFAULT_GROBID_IMAGE:
-            if container.status == "running":
-                found_running_grobid_image = True
-                break
-            else:
-                log.debug(
-                    f"Found stopped GROBID container "
-                    f"('{container.short_id}') -- Starting."
-                )
-                container.start()
-                time.sleep(5)
-                found_running_grobid_image = True
-                break
-
-    # Start new container
-    if not found_running_grobid_image:
-        log.info("Setting up PDF parsing server.")
-        log.debug(f"Using GROBID image: '{image}'.")
-        container = docker_client.containers.run(
-            image,
-            ports={"8070/tcp": port},
-            detach=True,
+    # Start every container before waiting so the servers start together
+    containers = find_grobid_containers(image, docker_client=docker_client)
+    started = [
+        _start_container(docker_client, image, port, containers) for port in ports
+    ]
+
+    instances = []
+    for port, container in zip(ports, started, strict=True):
+        instance = _make_instance(
+            port,
+            container.id,
+            grobid_client_kws,
+            container=container,
+            timeout_seconds=None,
         )
-        log.debug(f"Started GROBID container: '{container.short_id}'.")
-        time.sleep(5)
+        if not instance.healthy:
+            log.error(f"Failed to connect to GROBID server at: '{instance.url}'.")
+        instances.append(instance)
 
-    # Attempt to connect with client
-    try:
-        # Make request to check the server is alive
-        server_url = f"http://127.0.0.1:{port}"
-        response = requests.get(f"{server_url}/api/isalive")
-        response.raise_for_status()
-        log.debug(f"GROBID API available at: '{server_url}'.")
+    return GrobidPool(instances)
 
-        # Create a GROBID Client
-        grobid_client = GrobidClient(
-            grobid_server=f"http://localhost:{port}",
-            check_server=False,
-            **grobid_client_kws,
-        )
 
-        return grobid_client, container
+def setup_or_connect_to_server(
+    image: str | None = None,
+    port: int | None = None,
+    grobid_client_kws: dict[str, Any] | None = None,
+) -> tuple[GrobidClient | None, docker.models.containers.Container]:
+    """
+    Set up or create a connection to a GROBID server.
 
-    except Exception as e:
-        log.error(f"Failed to connect to GROBID server, error: '{e}'.")
-        return None, container
+    Parameters
+    ----------
+    image: Optional[str]
+        The Docker image name to use for pulling (if needed)
+        and creating the container.
+        Default: None (check environment variables
+        for GROBID_IMAGE or else use default image)
+    port: Optional[int]
+        The port to make available on the GROBID server and Docker container.
+        Default: None (check environment variables
+        for GROBID_PORT or else use default default port)
+    grobid_client_kws: Dict[str, Any]
+        Any extra GROBID client keyword arguments to pass to client initialization.
+        Default: {"timeout": 120}
+
+    Returns
+    -------
+    Optional[GrobidClient]
+        If all setup and/or connection was successful, the GROBID client connection.
+        None if something went wrong.
+    docker.models.containers.Container
+        The Docker container object for future management.
+
+    See Also
+    --------
+    setup_grobid_pool
+        Set up many servers and balance PDFs between them.
+    """
+    (instance,) = setup_grobid_pool(
+        n_instances=1,
+        image=image,
+        port=port,
+        grobid_client_kws=grobid_client_kws,
+    ).instances
+    if not instance.healthy:
+        return None, instance.get_container()
+
+    return instance.client, instance.get_container()
 
 
 def teardown_server(
@@ -157,9 +602,43 @@ def teardown_server(
     log.info(f"Stopped and removed Docker container: '{container.short_id}'.")
 
 
+def find_pdfs(path_or_glob: PathLike) -> list[Path]:
+    """
+    Find the PDF files to process.
+
+    Parameters
+    ----------
+    path_or_glob: PathLike
+        A PDF file, a directory to search (recursively) for PDF files,
+        or a glob pattern (for example "papers/**/*.pdf").
+
+    Returns
+    -------
+    list[Path]
+        The sorted, resolved paths of the PDF files found.
+    """
+    path = Path(path_or_glob).expanduser()
+    if path.is_dir():
+        return sorted(
+            pdf_path.resolve()
+            for pdf_path in path.rglob("*")
+            if pdf_path.suffix.lower() == ".pdf" and pdf_path.is_file()
+        )
+    if path.exists():
+        return [path.resolve()]
+
+    return sorted(
+        Path(match).resolve()
+        for match in glob.glob(str(path), recursive=True)
+        if Path(match).is_file()
+    )
+
+
 def process_pdf(
     client: GrobidClient,
     pdf_path: PathLike,
+    mode: str | None = None,
+    consolidate_header: bool | None = None,
 ) -> dict[str, Any]:
     """
     Process a PDF file using a GROBID client.
@@ -170,6 +649,17 @@ def process_pdf(
         A GROBID client to use for processing.
     pdf_path: PathLike
         The path to the local PDF file to process.
+    mode: Optional[str]
+        What to parse. Either "header" (only the title, authors, and abstract,
+        which is all the search pipeline uses) or "fulltext" (also the body
+        text and references, much slower).
+        Default: None (check environment variables
+        for GROBID_MODE or else use "header")
+    consolidate_header: Optional[bool]
+        Should GROBID complete the parsed header with metadata from CrossRef.
+        This adds a remote request per PDF.
+        Default: None (check environment variables
+        for GROBID_CONSOLIDATE_HEADER or else consolidate)
 
     Returns
     -------
@@ -179,8 +669,28 @@ def process_pdf(
     Raises
     ------
     ValueError
-        Something went wrong during processing.
+        Unknown mode or something went wrong during processing.
     """
+    # Handle vars
+    if mode is None:
+        if "GROBID_MODE" in os.environ:
+            log.debug("Using GROBID_MODE from environment vars.")
+            mode = os.environ["GROBID_MODE"]
+        else:
+            mode = DEFAULT_GROBID_MODE
+    if mode not in GROBID_MODE_SERVICES:
+        raise ValueError(
+            f"Unknown GROBID mode: '{mode}'. "
+            f"Available modes: {tuple(GROBID_MODE_SERVICES)}"
+        )
+    if consolidate_header is None:
+        if "GROBID_CONSOLIDATE_HEADER" in os.environ:
+            log.debug("Using GROBID_CONSOLIDATE_HEADER from environment vars.")
+            consolidate_env = os.environ["GROBID_CONSOLIDATE_HEADER"]
+            consolidate_header = consolidate_env.lower() in ("1", "true", "yes")
+        else:
+            consolidate_header = True
+
     # Convert to Path
     pdf_path = Path(pdf_path)
     pdf_path = pdf_path.resolve()
@@ -192,12 +702,15 @@ def process_pdf(
             f"Provided path is a directory: '{pdf_path}'"
         )
 
-    log.info("Parsing PDF, this can sometimes take up to one minute.")
+    if mode == GROBID_MODE_FULLTEXT:
+        log.info("Parsing PDF, this can sometimes take up to one minute.")
+    else:
+        log.info("Parsing PDF header.")
     _, status_code, result_text = client.process_pdf(
-        service="processFulltextDocument",
+        service=GROBID_MODE_SERVICES[mode],
         pdf_file=str(pdf_path),
         generateIDs=False,
-        consolidate_header=True,
+        consolidate_header=consolidate_header,
         consolidate_citations=False,
         include_raw_citations=False,
         include_raw_affiliations=False,
@@ -207,10 +720,11 @@ def process_pdf(
 
     # Handle error
     if status_code != 200 or result_text is None:
-        raise ValueError(
+        raise GrobidProcessingError(
             f"Processing failed with error: {status_code}. Error text: '{result_text}'"
             f"\nIf this issue cannot be fixed, please open a GitHub issue at: "
-            f"https://github.com/evamaxfield/papers-without-code/issues/new/choose"
+            f"https://github.com/evamaxfield/papers-without-code/issues/new/choose",
+            status_code=status_code,
         )
 
     # Read XML
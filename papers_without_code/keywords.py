@@ -0,0 +1,778 @@
+#!/usr/bin/env python
+
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+from collections import Counter
+from collections.abc import Iterable
+from functools import partial
+
+import backoff
+import numpy as np
+from langchain import PromptTemplate
+from langchain.chat_models import ChatOpenAI
+from langchain.output_parsers import PydanticOutputParser
+from langchain.schema import HumanMessage, OutputParserException
+from pydantic import BaseModel, Field
+
+from .caches import KeywordCache, get_default_keyword_cache, try_cache
+from .custom_types import MinimalPaperDetails
+from .encoders import Encoder
+from .models import DEFAULT_TRANSFORMER_MODEL, get_model
+from .network import get_executor, get_max_workers
+from .rate_limits import LLMRateLimiter, get_llm_rate_limiter
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+KEYWORD_BACKEND_LLM = "llm"
+KEYWORD_BACKEND_LOCAL = "local"
+KEYWORD_BACKENDS = (KEYWORD_BACKEND_LLM, KEYWORD_BACKEND_LOCAL)
+DEFAULT_KEYWORD_BACKEND = KEYWORD_BACKEND_LLM
+
+DEFAULT_N_KEYWORDS = 5
+
+# Local keywords are one to four words like the LLM prompt asks for
+LOCAL_KEYWORD_MAX_WORDS = 4
+LOCAL_KEYWORD_DIVERSITY = 0.5
+
+# Only the most frequent candidates are encoded
+LOCAL_KEYWORD_MAX_CANDIDATES = 256
+
+_WORD = re.compile(r"[A-Za-z0-9][A-Za-z0-9+'-]*")
+_PHRASE_BREAK = re.compile(r"[.,;:!?()\[\]{}\"]+|\s[-\u2013\u2014]\s")
+
+# Phrases don't start or end with these
+_STOPWORDS = frozenset(
+    "a an and are as at be by can for from has have in into is it its of on or "
+    "our over such than that the their these this to under using via was we "
+    "were which while with within without".split()
+)
+
+###############################################################################
+
+
+class LLMKeywordResults(BaseModel):
+    keywords: list[str] = Field(
+        description=("Extracted keyword sequences found in the text.")
+    )
+
+
+LLM_KEYWORD_MODEL = "gpt-3.5-turbo"
+
+# Give up on slow responses (and fall back to local keywords)
+LLM_KEYWORD_TIMEOUT_SECONDS = 30
+LLM_KEYWORD_MAX_TOKENS = 1000
+
+LLM_KEYWORD_RESULTS_PARSER = PydanticOutputParser(pydantic_object=LLMKeywordResults)
+
+LLM_KEYWORD_PROMPT_STRING = (
+    "Task: Create a list of five keywords from the following text. "
+    "Keywords can range from one to four words in length. "
+    "Only extracted text should be included in the list of keywords. "
+    "Keywords can include acronyms and abbreviations.\n\n"
+    "{{ format_instructions }}"
+    "\n\n---\n\n"
+    "Example Input Text:\n\n"
+    "SciBERT: A Pretrained Language Model for Scientific Text "
+    "Obtaining large-scale annotated data for NLP tasks in the "
+    "scientific domain is challenging and expensive. We release SciBERT, "
+    "a pretrained language model based on BERT (Devlin et. al., 2018) "
+    "to address the lack of high-quality, large-scale labeled scientific data. "
+    "SciBERT leverages unsupervised pretraining on a large multi-domain corpus of "
+    "scientific publications to improve performance on downstream scientific "
+    "NLP tasks. We evaluate on a suite of tasks including sequence tagging, "
+    "sentence classification and dependency parsing, with datasets from a "
+    "variety of scientific domains. We demonstrate statistically significant "
+    "improvements over BERT and achieve new state-of-the-art results on several "
+    "of these tasks. The code and pretrained models are available at "
+    "https://github.com/allenai/scibert/."
+    "\n\n---\n\n"
+    "Example Output Text:\n\n"
+    '{"keywords": ['
+    '"SciBERT", '
+    '"Language Model for Scientific Text", '
+    '"large-scale labeled scientific data", '
+    '"Scientific Text", '
+    '"SciBERT leverages unsupervised pretraining"'
+    "]}"
+    "\n\n---\n\n"
+    "Input Text:\n\n{{ text }}"
+    "\n\n---\n\n"
+)
+
+LLM_KEYWORD_PROMPT_TEMPLATE = PromptTemplate.from_template(
+    LLM_KEYWORD_PROMPT_STRING,
+    template_format="jinja2",
+)
+
+
+class LLMPaperKeywords(BaseModel):
+    index: int = Field(description="The number of the input text.")
+    keywords: list[str] = Field(
+        description=("Extracted keyword sequences found in the text.")
+    )
+
+
+class LLMBatchKeywordResults(BaseModel):
+    papers: list[LLMPaperKeywords] = Field(
+        description="The keywords for each of the input texts."
+    )
+
+
+LLM_BATCH_KEYWORD_RESULTS_PARSER = PydanticOutputParser(  # type: ignore[type-var]
+    pydantic_object=LLMBatchKeywordResults
+)
+
+LLM_BATCH_KEYWORD_PROMPT_STRING = (
+    "Task: For each of the following numbered texts, create a list of five "
+    "keywords from that text. "
+    "Keywords can range from one to four words in length. "
+    "Only extracted text should be included in the list of keywords. "
+    "Keywords can include acronyms and abbreviations.\n\n"
+    "{{ format_instructions }}"
+    "\n\n---\n\n"
+    "{% for text in texts %}"
+    "Input Text {{ loop.index0 }}:\n\n{{ text }}"
+    "\n\n---\n\n"
+    "{% endfor %}"
+)
+
+LLM_BATCH_KEYWORD_PROMPT_TEMPLATE = PromptTemplate.from_template(
+    LLM_BATCH_KEYWORD_PROMPT_STRING,
+    template_format="jinja2",
+)
+
+# Only papers this short are packed together into one prompt
+LLM_PACKABLE_TEXT_CHARS = 2000
+MAX_PAPERS_PER_PROMPT = 8
+
+# Rough conversion for estimating prompt tokens for rate limiting
+LLM_CHARS_PER_TOKEN = 4
+
+_LLM: ChatOpenAI | None = None
+_LLM_LOCK = threading.Lock()
+
+
+def _get_llm() -> ChatOpenAI:
+    # One client (and connection pool) for every keyword request
+    global _LLM
+    with _LLM_LOCK:
+        if _LLM is None:
+            _LLM = ChatOpenAI(
+                model=LLM_KEYWORD_MODEL,
+                temperature=0,
+                max_tokens=LLM_KEYWORD_MAX_TOKENS,
+                request_timeout=LLM_KEYWORD_TIMEOUT_SECONDS,
+            )
+
+        return _LLM
+
+
+def _estimate_tokens(prompt: str) -> int:
+    # Completion tokens count against the quota up to max_tokens
+    return len(prompt) // LLM_CHARS_PER_TOKEN + LLM_KEYWORD_MAX_TOKENS
+
+
+def _format_keyword_prompt(text: str) -> str:
+    return LLM_KEYWORD_PROMPT_TEMPLATE.format_prompt(
+        text=text,
+        format_instructions=LLM_KEYWORD_RESULTS_PARSER.get_format_instructions(),
+    ).text
+
+
+def _format_batch_keyword_prompt(texts: list[str]) -> str:
+    return LLM_BATCH_KEYWORD_PROMPT_TEMPLATE.format_prompt(
+        texts=texts,
+        format_instructions=(
+            LLM_BATCH_KEYWORD_RESULTS_PARSER.get_format_instructions()
+        ),
+    ).text
+
+
+@backoff.on_exception(
+    backoff.expo,
+    (json.JSONDecodeError, OutputParserException),
+    max_time=10,
+)
+def _run_keyword_get_from_llm(text: str, llm: ChatOpenAI) -> LLMKeywordResults:
+    # Fill prompt to get input
+    input_ = _format_keyword_prompt(text)
+
+    # Generate keywords
+    output = llm([HumanMessage(content=input_)]).content.strip()
+
+    # Parse output
+    parsed_output = LLM_KEYWORD_RESULTS_PARSER.parse(output)
+
+    return parsed_output
+
+
+@backoff.on_exception(
+    backoff.expo,
+    (json.JSONDecodeError, OutputParserException),
+    max_time=10,
+)
+def _run_batch_keyword_get_from_llm(
+    texts: list[str], llm: ChatOpenAI
+) -> dict[int, list[str]]:
+    # Generate keywords for every text at once
+    input_ = _format_batch_keyword_prompt(texts)
+    output = llm([HumanMessage(content=input_)]).content.strip()
+    parsed_output = LLM_BATCH_KEYWORD_RESULTS_PARSER.parse(output)
+
+    return {
+        paper.index: paper.keywords
+        for paper in parsed_output.papers
+        if 0 <= paper.index < len(texts)
+    }
+
+
+def _generate_keywords(
+    text: str,
+    keyword_cache: KeywordCache | None = None,
+) -> list[str]:
+    # Get keywords
+    parsed_output = _run_keyword_get_from_llm(text, _get_llm())
+
+    # Store for next time
+    if keyword_cache is not None:
+        try_cache(
+            "write to keyword",
+            keyword_cache.put,
+            LLM_KEYWORD_MODEL,
+            LLM_KEYWORD_PROMPT_STRING,
+            text,
+            parsed_output.keywords,
+        )
+
+    return parsed_output.keywords
+
+
+def _get_keywords(text: str, keyword_cache: KeywordCache | None = None) -> list[str]:
+    # Use the keywords from an earlier run on the same text
+    if keyword_cache is not None:
+        cached = try_cache(
+            "read from keyword",
+            keyword_cache.get,
+            LLM_KEYWORD_MODEL,
+            LLM_KEYWORD_PROMPT_STRING,
+            text,
+        )
+        if cached is not None:
+            return cached
+
+    return _generate_keywords(text, keyword_cache=keyword_cache)
+
+
+def _store_keywords(
+    keyword_cache: KeywordCache | None,
+    prompt_template: str,
+    text: str,
+    keywords: list[str],
+) -> None:
+    if keyword_cache is not None:
+        try_cache(
+            "write to keyword",
+            keyword_cache.put,
+            LLM_KEYWORD_MODEL,
+            prompt_template,
+            text,
+            keywords,
+        )
+
+
+def _plan_keyword_prompts(texts: list[str], papers_per_prompt: int) -> list[list[str]]:
+    # Pack short texts together, long texts are sent alone
+    papers_per_prompt = min(max(papers_per_prompt, 1), MAX_PAPERS_PER_PROMPT)
+    packable = [text for text in texts if len(text) <= LLM_PACKABLE_TEXT_CHARS]
+    prompts = [[text] for text in texts if len(text) > LLM_PACKABLE_TEXT_CHARS]
+    if papers_per_prompt == 1:
+        return [[text] for text in packable] + prompts
+
+    return [
+        packable[i : i + papers_per_prompt]
+        for i in range(0, len(packable), papers_per_prompt)
+    ] + prompts
+
+
+def _get_prompt_template(text: str, papers_per_prompt: int) -> str:
+    # The prompt the keywords for this text are generated (and cached) with
+    if papers_per_prompt > 1 and len(text) <= LLM_PACKABLE_TEXT_CHARS:
+        return LLM_BATCH_KEYWORD_PROMPT_STRING
+    return LLM_KEYWORD_PROMPT_STRING
+
+
+class _KeywordBatchRunner:
+    # Runs keyword prompts concurrently within the rate limits
+
+    def __init__(
+        self,
+        keyword_cache: KeywordCache | None,
+        max_concurrency: int,
+        rate_limiter: LLMRateLimiter,
+    ) -> None:
+        self.keyword_cache = keyword_cache
+        self.rate_limiter = rate_limiter
+        self.llm = _get_llm()
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.results: dict[str, list[str] | Exception] = {}
+
+    async def _run_single(self, text: str) -> None:
+        await self.rate_limiter.acquire(_estimate_tokens(_format_keyword_prompt(text)))
+        parsed_output = await asyncio.get_running_loop().run_in_executor(
+            get_executor(), _run_keyword_get_from_llm, text, self.llm
+        )
+        self.results[text] = parsed_output.keywords
+        _store_keywords(
+            self.keyword_cache,
+            LLM_KEYWORD_PROMPT_STRING,
+            text,
+            parsed_output.keywords,
+        )
+
+    async def _run_packed(self, texts: list[str]) -> None:
+        await self.rate_limiter.acquire(
+            _estimate_tokens(_format_batch_keyword_prompt(texts))
+        )
+        found = await asyncio.get_running_loop().run_in_executor(
+            get_executor(), _run_batch_keyword_get_from_llm, texts, self.llm
+        )
+        for index, text in enumerate(texts):
+            if index in found:
+                self.results[text] = found[index]
+                _store_keywords(
+                    self.keyword_cache,
+                    LLM_BATCH_KEYWORD_PROMPT_STRING,
+                    text,
+                    found[index],
+                )
+
+    async def _run_prompt(self, texts: list[str]) -> None:
+        async with self.semaphore:
+            try:
+                if len(texts) == 1:
+                    await self._run_single(texts[0])
+                else:
+                    await self._run_packed(texts)
+            except Exception as e:
+                log.warning(f"Failed to generate keywords, error: '{e}'.")
+                for text in texts:
+                    self.results[text] = e
+
+    async def run(self, texts: list[str]) -> None:
+        await self._run_prompt(texts)
+
+        # Papers left out of a packed response are retried alone
+        for text in texts:
+            if text not in self.results:
+                await self._run_prompt([text])
+
+
+async def _generate_keywords_batch_async(
+    texts: list[str],
+    keyword_cache: KeywordCache | None,
+    max_concurrency: int,
+    papers_per_prompt: int,
+    rate_limiter: LLMRateLimiter,
+) -> dict[str, list[str] | Exception]:
+    runner = _KeywordBatchRunner(keyword_cache, max_concurrency, rate_limiter)
+    await asyncio.gather(
+        *[
+            runner.run(prompt_texts)
+            for prompt_texts in _plan_keyword_prompts(texts, papers_per_prompt)
+        ]
+    )
+    return runner.results
+
+
+async def get_keywords_batch_async(
+    texts: list[str],
+    keyword_cache: KeywordCache | None = None,
+    max_concurrency: int | None = None,
+    papers_per_prompt: int = 1,
+    rate_limiter: LLMRateLimiter | None = None,
+) -> list[list[str] | Exception]:
+    """
+    Generate keywords for many texts with the LLM concurrently.
+
+    Requests share one client and are limited both in how many are in flight
+    and by the requests and tokens per minute quota of the rate limiter.
+    Responses which can't be parsed are retried.
+
+    Parameters
+    ----------
+    texts: list[str]
+        The texts (usually the title and abstract of each paper)
+        to generate keywords for.
+    keyword_cache: Optional[KeywordCache]
+        A cache of generated keywords.
+        Default: None (don't cache)
+    max_concurrency: Optional[int]
+        The most requests to have in flight at once.
+        Default: None (use `network.get_max_workers()`)
+    papers_per_prompt: int
+        Pack this many short texts into each prompt to make fewer requests
+        (up to 8). Texts the LLM leaves out of a packed response are retried
+        one by one.
+        Default: 1 (one text per prompt)
+    rate_limiter: Optional[LLMRateLimiter]
+        The requests and tokens per minute limits to stay within.
+        Default: None (use `rate_limits.get_llm_rate_limiter()`)
+
+    Returns
+    -------
+    list[list[str] | Exception]
+        The keywords for each text in the same order as the texts,
+        or the error if keywords could not be generated for that text.
+    """
+    if max_concurrency is None:
+        max_concurrency = get_max_workers()
+    if rate_limiter is None:
+        rate_limiter = get_llm_rate_limiter()
+
+    # Use stored keywords and only generate each distinct text once
+    found: dict[str, list[str] | Exception] = {}
+    for text in texts:
+        if text in found or keyword_cache is None:
+            continue
+        cached = try_cache(
+            "read from keyword",
+            keyword_cache.get,
+            LLM_KEYWORD_MODEL,
+            _get_prompt_template(text, papers_per_prompt),
+            text,
+        )
+        if cached is not None:
+            found[text] = cached
+
+    found.update(
+        await _generate_keywords_batch_async(
+            list(dict.fromkeys(text for text in texts if text not in found)),
+            keyword_cache=keyword_cache,
+            max_concurrency=max_concurrency,
+            papers_per_prompt=papers_per_prompt,
+            rate_limiter=rate_limiter,
+        )
+    )
+    return [found[text] for text in texts]
+
+
+def get_keywords_batch(
+    texts: list[str],
+    keyword_cache: KeywordCache | None = None,
+    max_concurrency: int | None = None,
+    papers_per_prompt: int = 1,
+    rate_limiter: LLMRateLimiter | None = None,
+) -> list[list[str] | Exception]:
+    """
+    Generate keywords for many texts with the LLM concurrently.
+
+    Runs `get_keywords_batch_async` to completion. From async code
+    await `get_keywords_batch_async` directly instead.
+
+    Parameters
+    ----------
+    texts: list[str]
+        The texts (usually the title and abstract of each paper)
+        to generate keywords for.
+    keyword_cache: Optional[KeywordCache]
+        A cache of generated keywords.
+        Default: None (don't cache)
+    max_concurrency: Optional[int]
+        The most requests to have in flight at once.
+        Default: None (use `network.get_max_workers()`)
+    papers_per_prompt: int
+        Pack this many short texts into each prompt to make fewer requests
+        (up to 8).
+        Default: 1 (one text per prompt)
+    rate_limiter: Optional[LLMRateLimiter]
+        The requests and tokens per minute limits to stay within.
+        Default: None (use `rate_limits.get_llm_rate_limiter()`)
+
+    Returns
+    -------
+    list[list[str] | Exception]
+        The keywords for each text in the same order as the texts,
+        or the error if keywords could not be generated for that text.
+    """
+    return asyncio.run(
+        get_keywords_batch_async(
+            texts,
+            keyword_cache=keyword_cache,
+            max_concurrency=max_concurrency,
+            papers_per_prompt=papers_per_prompt,
+            rate_limiter=rate_limiter,
+        )
+    )
+
+
+def _get_paper_text(paper: MinimalPaperDetails) -> str:
+    # Keywords are generated from the title and abstract
+    if paper.title and paper.abstract:
+        return f"{paper.title}\n\n{paper.abstract}"
+    if paper.title:
+        return paper.title
+    return paper.abstract or ""
+
+
+def prewarm_keyword_cache(
+    papers: Iterable[MinimalPaperDetails],
+    keyword_cache: KeywordCache | None = None,
+) -> int:
+    """
+    Generate and store keywords for papers ahead of searching for them.
+
+    Papers which already have keywords or whose keywords are
+    already stored are skipped.
+
+    Parameters
+    ----------
+    papers: Iterable[MinimalPaperDetails]
+        The papers to generate keywords for.
+    keyword_cache: Optional[KeywordCache]
+        The cache to store keywords in.
+        Default: None (use `caches.get_default_keyword_cache()`)
+
+    Returns
+    -------
+    int
+        The number of papers keywords were generated for
+        (failures are logged and skipped).
+
+    Raises
+    ------
+    ValueError
+        Caching is disabled or the cache could not be opened.
+    """
+    if keyword_cache is None:
+        keyword_cache = get_default_keyword_cache()
+    if keyword_cache is None:
+        raise ValueError("Can't prewarm the keyword cache, caching is disabled.")
+
+    # Only generate what isn't already stored
+    texts: dict[str, None] = {}
+    for paper in papers:
+        text = _get_paper_text(paper)
+        if (
+            not paper.keywords
+            and text not in texts
+            and keyword_cache.get(LLM_KEYWORD_MODEL, LLM_KEYWORD_PROMPT_STRING, text)
+            is None
+        ):
+            texts[text] = None
+
+    # Generate concurrently within the rate limits
+    log.info(f"Prewarming keyword cache with {len(texts)} papers.")
+    results = asyncio.run(
+        _generate_keywords_batch_async(
+            list(texts),
+            keyword_cache=keyword_cache,
+            max_concurrency=get_max_workers(),
+            papers_per_prompt=1,
+            rate_limiter=get_llm_rate_limiter(),
+        )
+    )
+    return sum(not isinstance(result, Exception) for result in results.values())
+
+
+###############################################################################
+
+
+def _get_candidate_phrases(text: str, max_words: int) -> list[str]:
+    # Runs of words not broken by punctuation,
+    # not starting or ending with a stopword
+    counts: Counter[str] = Counter()
+    forms: dict[str, str] = {}
+    for chunk in _PHRASE_BREAK.split(text):
+        words = _WORD.findall(chunk)
+        for n_words in range(1, max_words + 1):
+            for i in range(len(words) - n_words + 1):
+                phrase_words = words[i : i + n_words]
+                if (
+                    phrase_words[0].lower() in _STOPWORDS
+                    or phrase_words[-1].lower() in _STOPWORDS
+                    or (n_words == 1 and len(phrase_words[0]) < 3)
+                ):
+                    continue
+
+                phrase = " ".join(phrase_words)
+                counts[phrase.lower()] += 1
+                forms.setdefault(phrase.lower(), phrase)
+
+    # Most frequent first (ties in order of appearance)
+    return [forms[key] for key, _ in counts.most_common(LOCAL_KEYWORD_MAX_CANDIDATES)]
+
+
+def _max_marginal_relevance(
+    doc_vector: np.ndarray,
+    candidate_vectors: np.ndarray,
+    n_keywords: int,
+    diversity: float,
+) -> list[int]:
+    # Pick candidates similar to the document but unlike those already picked
+    doc_sims = candidate_vectors @ doc_vector
+    candidate_sims = candidate_vectors @ candidate_vectors.T
+    selected = [int(np.argmax(doc_sims))]
+    while len(selected) < min(n_keywords, len(doc_sims)):
+        redundancy = candidate_sims[:, selected].max(axis=1)
+        scores = (1 - diversity) * doc_sims - diversity * redundancy
+        scores[selected] = -np.inf
+        selected.append(int(np.argmax(scores)))
+
+    return selected
+
+
+def extract_keywords_local(
+    text: str,
+    model: Encoder | None = None,
+    n_keywords: int = DEFAULT_N_KEYWORDS,
+    diversity: float = LOCAL_KEYWORD_DIVERSITY,
+    model_name: str = DEFAULT_TRANSFORMER_MODEL,
+    backend: str | None = None,
+) -> list[str]:
+    """
+    Extract keywords from text without an LLM.
+
+    Candidate phrases of one to four words are taken from the text
+    and encoded together with the text in a single batch. Keywords are
+    then picked by maximal marginal relevance: each is the candidate
+    most similar to the text while least similar to those already picked.
+
+    Parameters
+    ----------
+    text: str
+        The text (usually the title and abstract) to extract keywords from.
+    model: Optional[Encoder]
+        The encoder to use.
+        Default: None (use `models.get_model(model_name, backend)`)
+    n_keywords: int
+        The number of keywords to extract.
+        Default: 5
+    diversity: float
+        How much to penalize keywords similar to those already picked,
+        from 0 (only relevance) to 1 (only diversity).
+        Default: 0.5
+    model_name: str
+        The name of the model to use when no model is provided.
+        Default: "thenlper/gte-small"
+    backend: Optional[str]
+        The encoder backend to use when no model is provided.
+        Default: None (check environment variables
+        for PWOC_ENCODER_BACKEND or else use "sentence-transformers")
+
+    Returns
+    -------
+    list[str]
+        The keywords in order of selection.
+    """
+    candidates = _get_candidate_phrases(text, LOCAL_KEYWORD_MAX_WORDS)
+    if len(candidates) == 0 or n_keywords <= 0:
+        return []
+
+    # Encode the text and every candidate at once
+    if model is None:
+        model = get_model(model_name, backend=backend)
+    embeddings = model.encode([text, *candidates], normalize_embeddings=True)
+
+    return [
+        candidates[index]
+        for index in _max_marginal_relevance(
+            embeddings[0],
+            embeddings[1:],
+            n_keywords=n_keywords,
+            diversity=diversity,
+        )
+    ]
+
+
+def get_keywords(
+    text: str,
+    keyword_backend: str | None = None,
+    keyword_cache: KeywordCache | None = None,
+    model: Encoder | None = None,
+    model_name: str = DEFAULT_TRANSFORMER_MODEL,
+    backend: str | None = None,
+    fallback: bool = True,
+) -> list[str]:
+    """
+    Get search keywords for text.
+
+    Parameters
+    ----------
+    text: str
+        The text (usually the title and abstract) to get keywords for.
+    keyword_backend: Optional[str]
+        How to generate keywords. Either "llm" (ask an OpenAI model)
+        or "local" (`extract_keywords_local` with the embedding model).
+        Default: None (check environment variables
+        for PWOC_KEYWORD_BACKEND or else use "llm")
+    keyword_cache: Optional[KeywordCache]
+        A cache of LLM generated keywords.
+        Default: None (don't cache)
+    model: Optional[Encoder]
+        The encoder for local keyword extraction.
+        Default: None (use `models.get_model(model_name, backend)`)
+    model_name: str
+        The name of the model for local keyword extraction
+        when no model is provided.
+        Default: "thenlper/gte-small"
+    backend: Optional[str]
+        The encoder backend for local keyword extraction
+        when no model is provided.
+        Default: None (check environment variables
+        for PWOC_ENCODER_BACKEND or else use "sentence-transformers")
+    fallback: bool
+        Extract keywords locally if the LLM fails (for example when it
+        times out, is rate limited, or no API key is set).
+        Default: True
+
+    Returns
+    -------
+    list[str]
+        The keywords.
+
+    Raises
+    ------
+    ValueError
+        Unknown keyword backend.
+    """
+    # Handle backend
+    if keyword_backend is None:
+        if "PWOC_KEYWORD_BACKEND" in os.environ:
+            log.debug("Using PWOC_KEYWORD_BACKEND from environment vars.")
+            keyword_backend = os.environ["PWOC_KEYWORD_BACKEND"]
+        else:
+            keyword_backend = DEFAULT_KEYWORD_BACKEND
+    if keyword_backend not in KEYWORD_BACKENDS:
+        raise ValueError(
+            f"Unknown keyword backend: '{keyword_backend}'. "
+            f"Available backends: {KEYWORD_BACKENDS}"
+        )
+
+    extract_local = partial(
+        extract_keywords_local,
+        text,
+        model=model,
+        model_name=model_name,
+        backend=backend,
+    )
+    if keyword_backend == KEYWORD_BACKEND_LOCAL:
+        return extract_local()
+
+    try:
+        return _get_keywords(text, keyword_cache=keyword_cache)
+    except Exception as e:
+        if not fallback:
+            raise
+        log.warning(
+            f"Failed to generate keywords with the LLM, "
+            f"extracting locally instead, error: '{e}'."
+        )
+        return extract_local()
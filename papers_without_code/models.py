@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+
+import gc
+import logging
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import TYPE_CHECKING, cast
+
+from .encoders import (
+    SENTENCE_TRANSFORMERS_BACKEND,
+    Encoder,
+    ONNXEncoder,
+    get_default_onnx_model_dir,
+    resolve_backend,
+)
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+DEFAULT_TRANSFORMER_MODEL = "thenlper/gte-small"
+DEFAULT_LOCAL_CACHE_MODEL = f"./sentence-transformers_{DEFAULT_TRANSFORMER_MODEL}"
+
+###############################################################################
+
+_MODEL_FUTURES: dict[tuple[str, str], "Future[Encoder]"] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+###############################################################################
+
+
+def _resolve_model_path(model_name: str) -> str:
+    # Prefer the pre-cached copy of the default model (created during Docker build)
+    if model_name == DEFAULT_TRANSFORMER_MODEL:
+        potential_cache_dir = Path(DEFAULT_LOCAL_CACHE_MODEL).resolve()
+        if potential_cache_dir.exists():
+            return str(potential_cache_dir)
+
+    return model_name
+
+
+def get_model_cache_name(model_name: str, backend: str | None = None) -> str:
+    """
+    Get the name used to identify a model and backend in caches.
+
+    Embeddings from different backends (for example int8 quantized) differ
+    slightly so they must not share cached embeddings.
+
+    Parameters
+    ----------
+    model_name: str
+        The name of the sentence transformer model.
+    backend: Optional[str]
+        The encoder backend.
+        Default: None (check environment variables
+        for PWOC_ENCODER_BACKEND or else use "sentence-transformers")
+
+    Returns
+    -------
+    str
+        The model name for the default backend, otherwise "{model_name}@{backend}".
+    """
+    backend = resolve_backend(backend)
+    if backend == SENTENCE_TRANSFORMERS_BACKEND:
+        return model_name
+
+    return f"{model_name}@{backend}"
+
+
+def _claim_model_load(
+    model_key: tuple[str, str],
+) -> tuple["Future[Encoder]", bool]:
+    # Returns the future for the model and whether or not the caller must load it
+    with _REGISTRY_LOCK:
+        future = _MODEL_FUTURES.get(model_key)
+        if future is not None:
+            return future, False
+
+        future = Future()
+        _MODEL_FUTURES[model_key] = future
+        return future, True
+
+
+def _load_encoder(model_name: str, backend: str) -> Encoder:
+    if backend == SENTENCE_TRANSFORMERS_BACKEND:
+        # Importing sentence_transformers imports torch which is slow on its own
+        # so it is done here rather than at module import
+        from sentence_transformers import SentenceTransformer
+
+        model_path = _resolve_model_path(model_name)
+        log.info(f"Loading sentence transformer model from: '{model_path}'.")
+        return SentenceTransformer(model_path)
+
+    model_dir = get_default_onnx_model_dir(model_name)
+    log.info(f"Loading '{backend}' model from: '{model_dir}'.")
+    return ONNXEncoder(model_dir, quantized=backend.endswith("int8"))
+
+
+def _load_model_into_future(
+    model_key: tuple[str, str],
+    future: "Future[Encoder]",
+) -> None:
+    try:
+        model = _load_encoder(*model_key)
+    except BaseException as e:
+        # Forget the failure so that a later call can try again
+        with _REGISTRY_LOCK:
+            if _MODEL_FUTURES.get(model_key) is future:
+                del _MODEL_FUTURES[model_key]
+        future.set_exception(e)
+    else:
+        future.set_result(model)
+
+
+def get_model(
+    model_name: str = DEFAULT_TRANSFORMER_MODEL,
+    backend: str | None = None,
+) -> Encoder:
+    """
+    Get the process-wide shared instance of a sentence transformer model.
+
+    The model is loaded the first time it is requested and then reused for
+    every following request. Requests for a model that is still loading
+    (for example from `preload_model_async`) wait for that single load to finish.
+
+    Parameters
+    ----------
+    model_name: str
+        The name of the sentence transformer model to get.
+        The default model is loaded from `DEFAULT_LOCAL_CACHE_MODEL`
+        if that directory exists.
+        Default: "thenlper/gte-small"
+    backend: Optional[str]
+        The encoder backend to run the model with.
+        One of "sentence-transformers", "onnx", or "onnx-int8".
+        Default: None (check environment variables
+        for PWOC_ENCODER_BACKEND or else use "sentence-transformers")
+
+    Returns
+    -------
+    Encoder
+        The loaded model. A `SentenceTransformer` for the default backend,
+        an `ONNXEncoder` for the ONNX backends.
+    """
+    model_key = (model_name, resolve_backend(backend))
+    future, should_load = _claim_model_load(model_key)
+    if should_load:
+        _load_model_into_future(model_key, future)
+
+    return future.result()
+
+
+def preload_model_async(
+    model_name: str = DEFAULT_TRANSFORMER_MODEL,
+    backend: str | None = None,
+) -> "Future[Encoder]":
+    """
+    Start loading a sentence transformer model on a background thread.
+
+    Useful to overlap the model load with network bound work.
+    Later calls to `get_model` wait for this load rather than starting another.
+
+    Parameters
+    ----------
+    model_name: str
+        The name of the sentence transformer model to load.
+        Default: "thenlper/gte-small"
+    backend: Optional[str]
+        The encoder backend to run the model with.
+        Default: None (check environment variables
+        for PWOC_ENCODER_BACKEND or else use "sentence-transformers")
+
+    Returns
+    -------
+    Future[Encoder]
+        A future which resolves to the loaded model.
+    """
+    model_key = (model_name, resolve_backend(backend))
+    future, should_load = _claim_model_load(model_key)
+    if should_load:
+        threading.Thread(
+            target=_load_model_into_future,
+            args=(model_key, future),
+            name=f"pwoc-model-load-{model_name}",
+            daemon=True,
+        ).start()
+
+    return future
+
+
+def preload_model(
+    model_name: str = DEFAULT_TRANSFORMER_MODEL,
+    backend: str | None = None,
+) -> None:
+    """
+    Load a sentence transformer model into the registry ahead of use.
+
+    Parameters
+    ----------
+    model_name: str
+        The name of the sentence transformer model to load.
+        Default: "thenlper/gte-small"
+    backend: Optional[str]
+        The encoder backend to run the model with.
+        Default: None (check environment variables
+        for PWOC_ENCODER_BACKEND or else use "sentence-transformers")
+    """
+    get_model(model_name, backend=backend)
+
+
+def unload_model(model_name: str | None = None) -> None:
+    """
+    Remove a sentence transformer model from the registry to free memory.
+
+    Parameters
+    ----------
+    model_name: Optional[str]
+        The name of the sentence transformer model to unload
+        (from every backend it was loaded with).
+        Default: None (unload all models)
+    """
+    with _REGISTRY_LOCK:
+        for model_key in list(_MODEL_FUTURES):
+            if model_name is None or model_key[0] == model_name:
+                del _MODEL_FUTURES[model_key]
+
+    # Release the weights now rather than whenever gc next runs
+    gc.collect()
+    log.info(f"Unloaded sentence transformer model(s): '{model_name or 'all'}'.")
+
+
+def get_model_memory_usage() -> dict[str, int]:
+    """
+    Get the memory used by the weights of each loaded model.
+
+    Returns
+    -------
+    dict[str, int]
+        Mapping of model name (suffixed with the backend for non-default
+        backends, e.g. "thenlper/gte-small@onnx-int8") to the number of bytes
+        used by the models parameters and buffers.
+    """
+    memory_usage = {}
+    for (model_name, backend), future in list(_MODEL_FUTURES.items()):
+        # Skip models that are still loading or failed to load
+        if not future.done() or future.exception() is not None:
+            continue
+
+        model = future.result()
+        if isinstance(model, ONNXEncoder):
+            n_bytes = model.memory_usage()
+        else:
+            torch_model = cast("SentenceTransformer", model)
+            n_bytes = sum(
+                tensor.numel() * tensor.element_size()
+                for tensor in [*torch_model.parameters(), *torch_model.buffers()]
+            )
+        memory_usage[get_model_cache_name(model_name, backend)] = n_bytes
+
+    return memory_usage
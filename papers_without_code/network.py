@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from ghapi.all import GhApi
+from requests.adapters import HTTPAdapter
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+DEFAULT_MAX_WORKERS = 16
+
+# Semantic Scholar, api.github.com, github.com, GROBID, and a few spare
+DEFAULT_POOLED_HOSTS = 8
+
+###############################################################################
+
+_SESSION: requests.Session | None = None
+_EXECUTOR: ThreadPoolExecutor | None = None
+_LOCK = threading.Lock()
+
+# GhApi keeps the last response headers on the client so each thread gets its own
+_THREAD_LOCAL = threading.local()
+
+###############################################################################
+
+
+def get_max_workers() -> int:
+    """
+    Get the number of concurrent network requests to allow.
+
+    Returns
+    -------
+    int
+        The PWOC_MAX_WORKERS environment variable if set, otherwise 16.
+    """
+    if "PWOC_MAX_WORKERS" in os.environ:
+        return max(int(os.environ["PWOC_MAX_WORKERS"]), 1)
+
+    return DEFAULT_MAX_WORKERS
+
+
+def get_session() -> requests.Session:
+    """
+    Get the process-wide shared HTTP session.
+
+    Connections are kept alive and pooled per host so repeated requests
+    to the same host skip the TCP and TLS handshakes. Each host pool is
+    sized to match the shared executor so no worker waits on a connection.
+
+    Returns
+    -------
+    requests.Session
+        The shared session.
+    """
+    global _SESSION
+    with _LOCK:
+        if _SESSION is None:
+            adapter = HTTPAdapter(
+                pool_connections=DEFAULT_POOLED_HOSTS,
+                pool_maxsize=get_max_workers(),
+            )
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _SESSION = session
+
+        return _SESSION
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Get the process-wide shared thread pool for network bound work.
+
+    Work submitted to this executor must not wait on other work submitted
+    to it or the pool can deadlock.
+
+    Returns
+    -------
+    ThreadPoolExecutor
+        The shared executor with `get_max_workers()` threads.
+    """
+    global _EXECUTOR
+    with _LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(
+                max_workers=get_max_workers(),
+                thread_name_prefix="pwoc-network",
+            )
+
+        return _EXECUTOR
+
+
+def get_github_api() -> GhApi:
+    """
+    Get the GitHub API client for the current thread.
+
+    Clients are reused for every call from the same thread
+    so that `api.recv_hdrs` always holds the headers of that threads
+    last response. The client reads the GITHUB_TOKEN environment variable
+    when it is first created so load any dotenv file before the first call.
+
+    Returns
+    -------
+    GhApi
+        The client.
+    """
+    api = getattr(_THREAD_LOCAL, "github_api", None)
+    if api is None:
+        api = GhApi()
+        _THREAD_LOCAL.github_api = api
+
+    return api
@@ -0,0 +1,307 @@
+#!/usr/bin/env python
+
+import gzip
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import threading
+from array import array
+from collections.abc import Iterator
+from pathlib import Path
+from typing import IO, Any
+
+import numpy as np
+
+from .custom_types import PathLike
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+PAPER_INDEX_RECORDS_FILE = "records.jsonl"
+PAPER_INDEX_KEYS_FILE = "keys.npy"
+PAPER_INDEX_OFFSETS_FILE = "offsets.npy"
+
+_ARXIV_URL = re.compile(
+    r"^(?:https?://)?(?:www\.)?arxiv\.org/(?:abs|pdf)/(.+?)(?:\.pdf)?$"
+)
+_ARXIV_VERSION = re.compile(r"v\d+$")
+
+_DEFAULT_INDEXES: dict[str, "PaperIndex | None"] = {}
+_DEFAULT_INDEXES_LOCK = threading.Lock()
+
+###############################################################################
+
+
+def normalize_paper_id(query: str) -> str:
+    """
+    Normalize a paper identifier so that equivalent forms match.
+
+    Parameters
+    ----------
+    query: str
+        A paper identifier in any form accepted by `get_paper`.
+
+    Returns
+    -------
+    str
+        The identifier as "type:value" in lowercase. DOIs lose any repeated
+        "doi:" prefixes, arXiv URLs become arXiv IDs, and arXiv IDs lose
+        their version.
+    """
+    normalized = query.strip().lower()
+
+    # Bare and repeated DOI prefixes
+    while normalized.startswith("doi:"):
+        normalized = normalized[len("doi:") :]
+    if normalized.startswith("10."):
+        return f"doi:{normalized}"
+
+    # arXiv URLs and versions
+    if normalized.startswith("url:"):
+        match = _ARXIV_URL.match(normalized[len("url:") :])
+        if match is not None:
+            normalized = f"arxiv:{match.group(1)}"
+    if normalized.startswith("arxiv:"):
+        return _ARXIV_VERSION.sub("", normalized)
+
+    return normalized
+
+
+def _get_aliases(response_data: dict[str, Any]) -> list[str]:
+    # Every identifier the paper can be queried with
+    aliases = []
+    if response_data.get("paperId") is not None:
+        aliases.append(response_data["paperId"].lower())
+    if response_data.get("corpusId") is not None:
+        aliases.append(f"corpusid:{response_data['corpusId']}")
+    external_ids = response_data.get("externalIds") or {}
+    for id_type in ("DOI", "ArXiv", "CorpusId"):
+        if external_ids.get(id_type) is not None:
+            aliases.append(normalize_paper_id(f"{id_type}:{external_ids[id_type]}"))
+
+    return aliases
+
+
+def _hash_alias(alias: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(alias.encode("utf-8"), digest_size=8).digest(),
+        "little",
+    )
+
+
+def _clean_whitespace(text: str | None) -> str | None:
+    if text is None:
+        return None
+    return " ".join(text.split())
+
+
+def _to_paper_data(record: dict[str, Any]) -> dict[str, Any] | None:
+    # Semantic Scholar API shaped records are used as is
+    if "paperId" in record:
+        return record
+
+    # Semantic Scholar datasets use lowercase keys
+    if "corpusid" in record:
+        return {
+            "paperId": record.get("paperid"),
+            "corpusId": record["corpusid"],
+            "externalIds": record.get("externalids") or {},
+            "url": record.get("url"),
+            "title": record.get("title"),
+            "authors": [
+                {"name": author["name"]} for author in record.get("authors") or []
+            ],
+            "abstract": record.get("abstract"),
+        }
+
+    # arXiv metadata snapshot
+    if "id" in record:
+        if record.get("authors_parsed"):
+            authors = [
+                {"name": " ".join(part for part in name_parts[1::-1] if part)}
+                for name_parts in record["authors_parsed"]
+            ]
+        else:
+            authors = [
+                {"name": name.strip()}
+                for name in re.split(r",| and ", record.get("authors") or "")
+                if name.strip()
+            ]
+
+        return {
+            "externalIds": {"ArXiv": record["id"], "DOI": record.get("doi")},
+            "url": f"https://arxiv.org/abs/{record['id']}",
+            "title": _clean_whitespace(record.get("title")),
+            "authors": authors,
+            "abstract": _clean_whitespace(record.get("abstract")),
+        }
+
+    return None
+
+
+def _open_snapshot(snapshot_path: Path) -> gzip.GzipFile | IO[bytes]:
+    if snapshot_path.suffix == ".gz":
+        return gzip.open(snapshot_path, "rb")
+    return snapshot_path.open("rb")
+
+
+def _iter_snapshot_records(snapshot_path: Path) -> Iterator[dict[str, Any]]:
+    with _open_snapshot(snapshot_path) as open_f:
+        for line_number, line in enumerate(open_f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                log.warning(f"Skipping malformed line {line_number} of snapshot.")
+                continue
+
+            paper_data = _to_paper_data(record)
+            if paper_data is not None:
+                yield paper_data
+
+
+def build_paper_index(
+    snapshot_paths: PathLike | list[PathLike],
+    index_dir: PathLike,
+) -> int:
+    """
+    Build an offline paper index from metadata snapshots.
+
+    The snapshots are read once, line by line, so they never need to fit
+    in memory. Each paper is written to a records file and every identifier
+    of the paper (arXiv ID, DOI, CorpusID, and paper ID) is hashed to a
+    sorted array pointing at the record.
+
+    Parameters
+    ----------
+    snapshot_paths: Union[PathLike, list[PathLike]]
+        The JSON lines snapshots to index. Either the arXiv metadata snapshot
+        (https://www.kaggle.com/datasets/Cornell-University/arxiv),
+        Semantic Scholar dataset files, or Semantic Scholar API responses.
+        Files ending in ".gz" are decompressed while reading.
+    index_dir: PathLike
+        The directory to store the index in.
+
+    Returns
+    -------
+    int
+        The number of papers indexed.
+    """
+    if not isinstance(snapshot_paths, list):
+        snapshot_paths = [snapshot_paths]
+    index_dir = Path(index_dir)
+    index_dir.mkdir(parents=True, exist_ok=True)
+
+    # Stream the records to disk and only keep the compact key arrays in memory
+    keys = array("Q")
+    offsets = array("Q")
+    n_papers = 0
+    with (index_dir / PAPER_INDEX_RECORDS_FILE).open("wb") as open_f:
+        for snapshot_path in snapshot_paths:
+            for paper_data in _iter_snapshot_records(Path(snapshot_path)):
+                aliases = set(_get_aliases(paper_data))
+                if len(aliases) == 0:
+                    continue
+
+                offset = open_f.tell()
+                open_f.write(json.dumps(paper_data).encode("utf-8") + b"\n")
+                for alias in aliases:
+                    keys.append(_hash_alias(alias))
+                    offsets.append(offset)
+                n_papers += 1
+
+    # Sort the identifiers for binary search
+    keys_arr = np.frombuffer(keys, dtype=np.uint64)
+    order = np.argsort(keys_arr, kind="stable")
+    np.save(
+        index_dir / PAPER_INDEX_OFFSETS_FILE,
+        np.frombuffer(offsets, dtype=np.uint64)[order],
+    )
+    np.save(index_dir / PAPER_INDEX_KEYS_FILE, keys_arr[order])
+
+    log.info(f"Indexed {n_papers} papers ({len(keys)} identifiers) to {index_dir}.")
+    return n_papers
+
+
+class PaperIndex:
+    """
+    A read-only, memory mapped, offline index of paper metadata.
+
+    Parameters
+    ----------
+    index_dir: PathLike
+        The directory the index was built in with `build_paper_index`.
+    """
+
+    def __init__(self, index_dir: PathLike) -> None:
+        self.index_dir = Path(index_dir)
+        self._keys = np.load(self.index_dir / PAPER_INDEX_KEYS_FILE, mmap_mode="r")
+        self._offsets = np.load(
+            self.index_dir / PAPER_INDEX_OFFSETS_FILE,
+            mmap_mode="r",
+        )
+        with (self.index_dir / PAPER_INDEX_RECORDS_FILE).open("rb") as open_f:
+            self._records = mmap.mmap(open_f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def get(self, alias: str) -> dict[str, Any] | None:
+        """
+        Get the metadata of a paper.
+
+        Parameters
+        ----------
+        alias: str
+            Any normalized identifier of the paper.
+
+        Returns
+        -------
+        Optional[dict[str, Any]]
+            The paper metadata in the shape of a Semantic Scholar API response.
+            None if the paper is not in the index.
+        """
+        key = np.uint64(_hash_alias(alias))
+        i = int(np.searchsorted(self._keys, key))
+
+        # Check the record in case of a hash collision
+        while i < len(self._keys) and self._keys[i] == key:
+            offset = int(self._offsets[i])
+            end = self._records.find(b"\n", offset)
+            paper_data = json.loads(self._records[offset:end])
+            if alias in _get_aliases(paper_data):
+                return paper_data
+            i += 1
+
+        return None
+
+
+def get_default_paper_index() -> PaperIndex | None:
+    """
+    Get the process-wide offline paper index.
+
+    Returns
+    -------
+    Optional[PaperIndex]
+        The index stored in the directory set by the PWOC_PAPER_INDEX_DIR
+        environment variable. None if the variable is not set or the index
+        could not be opened.
+    """
+    if "PWOC_PAPER_INDEX_DIR" not in os.environ:
+        return None
+
+    index_dir = os.environ["PWOC_PAPER_INDEX_DIR"]
+    with _DEFAULT_INDEXES_LOCK:
+        if index_dir not in _DEFAULT_INDEXES:
+            log.debug("Using PWOC_PAPER_INDEX_DIR from environment vars.")
+            try:
+                _DEFAULT_INDEXES[index_dir] = PaperIndex(index_dir)
+            except (OSError, ValueError) as e:
+                log.warning(f"Could not open paper index, error: '{e}'.")
+                _DEFAULT_INDEXES[index_dir] = None
+
+        return _DEFAULT_INDEXES[index_dir]
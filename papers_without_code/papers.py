@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+
+import logging
+from typing import Any
+
+import backoff
+import requests
+
+from .caches import PaperCache, get_default_paper_cache, try_cache
+from .custom_types import MinimalPaperDetails
+from .network import get_session
+from .paper_index import _get_aliases, get_default_paper_index, normalize_paper_id
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+SEMANTIC_SCHOLAR_API_URL = "https://api.semanticscholar.org/graph/v1"
+# IDs are fetched so every form of a papers identifier can be cached
+SEMANTIC_SCHOLAR_PAPER_FIELDS = "paperId,corpusId,externalIds,title,authors,abstract"
+
+# https://api.semanticscholar.org/api-docs/graph#tag/Paper-Data/operation/post_graph_get_papers
+SEMANTIC_SCHOLAR_BATCH_SIZE = 500
+
+# Responses worth retrying (rate limited or a server hiccup)
+_RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+###############################################################################
+
+
+def _to_batch_id(query: str) -> str:
+    # The batch endpoint needs the ID type for DOIs
+    query = query.strip()
+    if query.startswith("10."):
+        return f"DOI:{query}"
+    return query
+
+
+def _should_give_up(e: Exception) -> bool:
+    response = getattr(e, "response", None)
+    return response is None or response.status_code not in _RETRY_STATUS_CODES
+
+
+@backoff.on_exception(
+    backoff.expo,
+    requests.HTTPError,
+    giveup=_should_give_up,
+    max_time=60,
+)
+def _request_papers_batch(ids: list[str]) -> list[Any]:
+    # Returns the paper data (None if not found) for each ID in order
+    response = get_session().post(
+        f"{SEMANTIC_SCHOLAR_API_URL}/paper/batch",
+        params={"fields": SEMANTIC_SCHOLAR_PAPER_FIELDS},
+        json={"ids": ids},
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def _parse_paper(response_data: Any) -> MinimalPaperDetails:
+    return MinimalPaperDetails(
+        url=response_data.get("url")
+        or f"https://www.semanticscholar.org/paper/{response_data['paperId']}",
+        title=response_data.get("title"),
+        authors=response_data.get("authors", None),
+        abstract=response_data.get("abstract", None),
+        keywords=None,
+        other={"full_semantic_scholar_data": response_data},
+    )
+
+
+def _get_papers_chunk(queries: list[str]) -> list[MinimalPaperDetails | Exception]:
+    try:
+        found = _request_papers_batch([_to_batch_id(query) for query in queries])
+    except requests.RequestException as e:
+        # One malformed ID rejects the whole request, split to isolate it
+        response = getattr(e, "response", None)
+        if len(queries) > 1 and response is not None and response.status_code == 400:
+            middle = len(queries) // 2
+            return _get_papers_chunk(queries[:middle]) + _get_papers_chunk(
+                queries[middle:]
+            )
+
+        log.warning(f"Failed to get SemanticScholar papers, error: '{e}'.")
+        return [e for _ in queries]
+
+    return [
+        (
+            _parse_paper(response_data)
+            if response_data
+            else ValueError(f"No paper found with query: '{query}'")
+        )
+        for query, response_data in zip(queries, found, strict=True)
+    ]
+
+
+def get_papers(
+    queries: list[str],
+    use_cache: bool = True,
+) -> list[MinimalPaperDetails | Exception]:
+    """
+    Get many papers details from the Semantic Scholar API.
+
+    Queries are sent in batches of up to 500 to the paper batch endpoint.
+    Each query is a DOI, SemanticScholarID, CorpusID, ArXivID, ACL,
+    or URL with its type as for `get_paper`. A failed batch only fails
+    its own queries and malformed queries only fail themselves.
+    Papers in the offline index set by the PWOC_PAPER_INDEX_DIR environment
+    variable (see `build_paper_index`) are never fetched.
+
+    Parameters
+    ----------
+    queries: list[str]
+        The structured papers to query for.
+    use_cache: bool
+        Should paper metadata stored by earlier lookups be used (under any
+        of the papers DOI, arXiv ID, CorpusID, or paper ID).
+        Default: True (use the cache unless disabled with PWOC_DISABLE_CACHE)
+
+    Returns
+    -------
+    list[MinimalPaperDetails | Exception]
+        The details of each paper in the same order as the queries,
+        or the error if that paper could not be found or fetched.
+    """
+    paper_index = get_default_paper_index()
+    paper_cache = get_default_paper_cache() if use_cache else None
+
+    # Use the offline index or stored papers and only fetch each paper once
+    found: dict[str, MinimalPaperDetails | Exception] = {}
+    to_fetch: dict[str, str] = {}
+    for query in queries:
+        key = normalize_paper_id(query)
+        if key in found or key in to_fetch:
+            continue
+        cached = paper_index.get(key) if paper_index is not None else None
+        if cached is None and paper_cache is not None:
+            cached = try_cache("read from paper", paper_cache.get, key)
+        if cached is not None:
+            found[key] = _parse_paper(cached)
+        else:
+            to_fetch[key] = query
+
+    keys = list(to_fetch)
+    for i in range(0, len(keys), SEMANTIC_SCHOLAR_BATCH_SIZE):
+        chunk = keys[i : i + SEMANTIC_SCHOLAR_BATCH_SIZE]
+        log.info(f"Getting SemanticScholar paper details for {len(chunk)} queries.")
+        for key, result in zip(
+            chunk,
+            _get_papers_chunk([to_fetch[key] for key in chunk]),
+            strict=True,
+        ):
+            found[key] = result
+            if (
+                paper_cache is not None
+                and not isinstance(result, Exception)
+                and result.other is not None
+            ):
+                _store_paper(
+                    paper_cache, key, result.other["full_semantic_scholar_data"]
+                )
+
+    return [found[normalize_paper_id(query)] for query in queries]
+
+
+def _store_paper(
+    paper_cache: PaperCache,
+    key: str,
+    response_data: dict[str, Any],
+) -> None:
+    try_cache(
+        "write to paper",
+        paper_cache.put,
+        response_data["paperId"],
+        response_data,
+        aliases=[key, *_get_aliases(response_data)],
+    )
+
+
+def get_paper(query: str, use_cache: bool = True) -> MinimalPaperDetails:
+    """
+    Get a papers details from the Semantic Scholar API.
+
+    Provide a DOI, SemanticScholarID, CorpusID, ArXivID, ACL,
+    or URL from semanticscholar.org, arxiv.org, aclweb.org,
+    acm.org, or biorxiv.org. DOIs can be provided as is.
+    All other IDs should be given with their type, for example:
+    `doi:doi:10.18653/v1/2020.acl-main.447`
+    or `CorpusID:202558505` or `url:https://arxiv.org/abs/2004.07180`.
+
+    Parameters
+    ----------
+    query: str
+        The structured paper to query for.
+    use_cache: bool
+        Should paper metadata stored by earlier lookups be used.
+        Default: True (use the cache unless disabled with PWOC_DISABLE_CACHE)
+
+    Returns
+    -------
+    Paper
+        The paper details.
+
+    Raises
+    ------
+    ValueErorr
+        No paper was found.
+    """
+    (result,) = get_papers([query], use_cache=use_cache)
+    if isinstance(result, Exception):
+        raise result
+
+    log.info(f"Found SemanticScholar paper with query: '{query}'")
+    return result
@@ -3,8 +3,9 @@
 import logging
 from typing import Any
 
+from .caches import get_default_keyword_cache
 from .custom_types import AuthorDetails, MinimalPaperDetails
-from .search import _get_keywords
+from .keywords import get_keywords
 
 ###############################################################################
 
@@ -62,7 +63,10 @@ def parse_grobid_data(
     # Construct keyword content
     title = _get_title(grobid_data)
     abstract = _get_abstract(grobid_data)
-    keywords = _get_keywords(f"{title}\n\n{abstract}")
+    keywords = get_keywords(
+        f"{title}\n\n{abstract}",
+        keyword_cache=get_default_keyword_cache(),
+    )
 
     # Parse
     return MinimalPaperDetails(
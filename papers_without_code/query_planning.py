@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+
+import logging
+import re
+from dataclasses import dataclass
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+# https://docs.github.com/en/search-github/searching-on-github/searching-for-repositories
+MAX_QUERY_LENGTH = 256
+MAX_QUERY_OPERATORS = 5
+
+# Results requested per keyword, merged queries request more to keep the depth
+RESULTS_PER_KEYWORD = 10
+MAX_RESULTS_PER_PAGE = 100
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+###############################################################################
+
+
+def _tokenize(text: str) -> tuple[str, ...]:
+    # Split camel case repo names ("SciBERT" stays whole, "sciBert" splits)
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text)
+    return tuple(_TOKEN.findall(text.lower()))
+
+
+def _contains_phrase(tokens: tuple[str, ...], phrase: tuple[str, ...]) -> bool:
+    if len(phrase) == 0 or len(phrase) > len(tokens):
+        return False
+
+    return any(
+        tokens[i : i + len(phrase)] == phrase
+        for i in range(len(tokens) - len(phrase) + 1)
+    )
+
+
+@dataclass
+class PlannedQuery:
+    terms: list[str]
+    keywords: list[str]
+
+    @property
+    def per_page(self) -> int:
+        """The number of results to request to keep the depth of each keyword."""
+        return min(RESULTS_PER_KEYWORD * len(self.keywords), MAX_RESULTS_PER_PAGE)
+
+    def to_query_string(self, strict: bool) -> str:
+        """
+        Build the GitHub search query.
+
+        Parameters
+        ----------
+        strict: bool
+            Search for each term as an exact phrase.
+
+        Returns
+        -------
+        str
+            The terms joined with OR.
+        """
+        if strict:
+            return " OR ".join(f'"{term}"' for term in self.terms)
+        if len(self.terms) == 1:
+            return self.terms[0]
+        return " OR ".join(f"({term})" for term in self.terms)
+
+    def attribute(self, repo_name: str, description: str | None) -> str:
+        """
+        Find which keyword a search result was found for.
+
+        Parameters
+        ----------
+        repo_name: str
+            The full name ("owner/name") of the repository.
+        description: Optional[str]
+            The description of the repository.
+
+        Returns
+        -------
+        str
+            The most specific keyword found as a phrase in the name or
+            description, else the first keyword whose words all appear,
+            else the first searched term.
+        """
+        tokens = _tokenize(f"{repo_name} {description or ''}")
+        for keyword in self.keywords:
+            if _contains_phrase(tokens, _tokenize(keyword)):
+                return keyword
+
+        # GitHub also matches topics and word stems
+        token_set = set(tokens)
+        for keyword in self.keywords:
+            if set(_tokenize(keyword)) <= token_set:
+                return keyword
+
+        return self.terms[0]
+
+
+def plan_keyword_queries(keywords: list[str]) -> list[PlannedQuery]:
+    """
+    Plan the fewest GitHub searches which cover every keyword.
+
+    Duplicate keywords (ignoring case, whitespace, and punctuation) are
+    dropped. A keyword containing another keyword as a phrase (for example
+    "Language Model for Scientific Text" contains "Scientific Text") is
+    folded into the shorter keyword since searching the shorter phrase also
+    finds every match of the longer one. The remaining keywords are combined
+    into OR-queries within GitHub's query length and operator limits.
+
+    Parameters
+    ----------
+    keywords: list[str]
+        The keywords to search for.
+
+    Returns
+    -------
+    list[PlannedQuery]
+        The queries to run. Each has the terms it searches for and every
+        keyword it answers (most specific first) for attributing results.
+    """
+    # Dedupe
+    unique_keywords: dict[tuple[str, ...], str] = {}
+    for keyword in keywords:
+        tokens = _tokenize(keyword)
+        if len(tokens) > 0 and tokens not in unique_keywords:
+            unique_keywords[tokens] = " ".join(keyword.split())
+
+    # Fold keywords into the shortest keyword they contain
+    by_length = sorted(unique_keywords, key=len)
+    covering: dict[tuple[str, ...], list[tuple[str, ...]]] = {}
+    for tokens in by_length:
+        for term_tokens in covering:
+            if _contains_phrase(tokens, term_tokens):
+                covering[term_tokens].append(tokens)
+                break
+        else:
+            covering[tokens] = [tokens]
+
+    # Pack terms into OR-queries in the original keyword order
+    plans: list[PlannedQuery] = []
+    for tokens in unique_keywords:
+        if tokens not in covering:
+            continue
+
+        term = unique_keywords[tokens]
+        folded = [unique_keywords[t] for t in sorted(covering[tokens], key=len)[::-1]]
+        if len(plans) > 0:
+            candidate = PlannedQuery(
+                terms=[*plans[-1].terms, term],
+                keywords=[*plans[-1].keywords, *folded],
+            )
+            if (
+                len(candidate.terms) - 1 <= MAX_QUERY_OPERATORS
+                and len(candidate.to_query_string(strict=True)) <= MAX_QUERY_LENGTH
+                and RESULTS_PER_KEYWORD * len(candidate.keywords)
+                <= MAX_RESULTS_PER_PAGE
+            ):
+                plans[-1] = candidate
+                continue
+
+        plans.append(PlannedQuery(terms=[term], keywords=folded))
+
+    log.debug(f"Planned {len(plans)} searches for {len(keywords)} keywords.")
+    return plans
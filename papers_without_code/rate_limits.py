@@ -0,0 +1,396 @@
+#!/usr/bin/env python
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+SEARCH_ENDPOINT = "search"
+CORE_ENDPOINT = "core"
+GRAPHQL_ENDPOINT = "graphql"
+
+# (requests per window authenticated, unauthenticated, window in seconds)
+# https://docs.github.com/en/rest/overview/resources-in-the-rest-api#rate-limiting
+DEFAULT_GITHUB_RATE_LIMITS = {
+    SEARCH_ENDPOINT: (30, 10, 60),
+    CORE_ENDPOINT: (5000, 60, 60 * 60),
+    GRAPHQL_ENDPOINT: (5000, 0, 60 * 60),
+}
+DEFAULT_MAX_WAIT_SECONDS = 60.0
+
+# OpenAI gpt-3.5-turbo limits for a paid account
+DEFAULT_LLM_REQUESTS_PER_MINUTE = 3500
+DEFAULT_LLM_TOKENS_PER_MINUTE = 90_000
+
+###############################################################################
+
+
+class GitHubRateLimitError(Exception):
+    """Raised when a GitHub request would have to wait too long for rate limits."""
+
+
+@dataclass
+class RateLimitUsage:
+    endpoint_class: str
+    limit: int
+    remaining: int
+    reset_at: float | None
+    requests: int
+    throttled_seconds: float
+    rejected: int
+
+
+class _TokenBucket:
+    def __init__(self, limit: int, window_seconds: float) -> None:
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.tokens = float(limit)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.reset_at: float | None = None
+        self.requests = 0
+        self.throttled_seconds = 0.0
+        self.rejected = 0
+
+    def refill(self, now: float) -> None:
+        if self.limit > 0:
+            rate = self.limit / self.window_seconds
+            self.tokens = min(self.limit, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+
+    def wait_time(self, now: float, n_tokens: float = 1) -> float:
+        self.refill(now)
+        if self.limit <= 0:
+            return float("inf")
+
+        # Tokens go negative when callers are queued
+        # (requests larger than the limit only wait for a full bucket)
+        n_tokens = min(n_tokens, self.limit)
+        token_wait = max(n_tokens - self.tokens, 0) * self.window_seconds / self.limit
+        return max(self.blocked_until - now, token_wait)
+
+
+class GitHubRequestScheduler:
+    """
+    Schedule GitHub API requests within GitHub's rate limits.
+
+    Keeps a token bucket for each endpoint class ("search", "core", "graphql")
+    which refills at the rate GitHub allows. The buckets are kept in sync
+    with the `X-RateLimit-*` and `Retry-After` headers of every response.
+    Requests which would have to wait too long for a token fail fast
+    with a `GitHubRateLimitError` rather than retrying blindly.
+
+    Parameters
+    ----------
+    authenticated: Optional[bool]
+        Are requests made with a GitHub token. Only used for the initial
+        limits before any response headers have been seen.
+        Default: None (check environment variables for GITHUB_TOKEN)
+    max_wait_seconds: Optional[float]
+        The longest a request may be queued before failing.
+        Default: None (check environment variables
+        for PWOC_GITHUB_MAX_WAIT_SECONDS or else use 60 seconds)
+    """
+
+    def __init__(
+        self,
+        authenticated: bool | None = None,
+        max_wait_seconds: float | None = None,
+    ) -> None:
+        if authenticated is None:
+            authenticated = "GITHUB_TOKEN" in os.environ
+        if max_wait_seconds is None:
+            if "PWOC_GITHUB_MAX_WAIT_SECONDS" in os.environ:
+                log.debug("Using PWOC_GITHUB_MAX_WAIT_SECONDS from environment vars.")
+                max_wait_seconds = float(os.environ["PWOC_GITHUB_MAX_WAIT_SECONDS"])
+            else:
+                max_wait_seconds = DEFAULT_MAX_WAIT_SECONDS
+
+        self.max_wait_seconds = max_wait_seconds
+        self._lock = threading.Lock()
+        self._buckets = {
+            endpoint_class: _TokenBucket(
+                authenticated_limit if authenticated else unauthenticated_limit,
+                window_seconds,
+            )
+            for endpoint_class, (
+                authenticated_limit,
+                unauthenticated_limit,
+                window_seconds,
+            ) in DEFAULT_GITHUB_RATE_LIMITS.items()
+        }
+
+    def _get_bucket(self, endpoint_class: str) -> _TokenBucket:
+        # Unknown resources (e.g. "code_search") are tracked as they are seen
+        # their limits come from the response headers
+        if endpoint_class not in self._buckets:
+            limit, _, window_seconds = DEFAULT_GITHUB_RATE_LIMITS[CORE_ENDPOINT]
+            self._buckets[endpoint_class] = _TokenBucket(limit, window_seconds)
+        return self._buckets[endpoint_class]
+
+    def acquire(
+        self, endpoint_class: str, max_wait_seconds: float | None = None
+    ) -> None:
+        """
+        Wait for permission to make a request.
+
+        Parameters
+        ----------
+        endpoint_class: str
+            The rate limit the request counts against.
+            One of "search", "core", or "graphql".
+        max_wait_seconds: Optional[float]
+            The longest to wait, zero to only proceed if a request can be made now.
+            Default: None (use the scheduler's `max_wait_seconds`)
+
+        Raises
+        ------
+        GitHubRateLimitError
+            The request would have to wait longer than `max_wait_seconds`.
+        """
+        if max_wait_seconds is None:
+            max_wait_seconds = self.max_wait_seconds
+
+        with self._lock:
+            bucket = self._get_bucket(endpoint_class)
+            wait = bucket.wait_time(time.monotonic())
+            if wait > max_wait_seconds:
+                bucket.rejected += 1
+                raise GitHubRateLimitError(
+                    f"GitHub '{endpoint_class}' rate limit reached, the next request "
+                    f"could be made in {wait:.1f} seconds "
+                    f"(more than the allowed wait of {max_wait_seconds:.1f} seconds). "
+                    f"Setting a GITHUB_TOKEN raises the limits."
+                )
+
+            # Take the token now so that later callers queue behind this one
+            bucket.tokens -= 1
+            bucket.requests += 1
+            bucket.throttled_seconds += wait
+
+        if wait > 0:
+            log.debug(
+                f"Waiting {wait:.1f} seconds for GitHub '{endpoint_class}' limit."
+            )
+            time.sleep(wait)
+
+    def record_response(
+        self,
+        endpoint_class: str,
+        headers: Mapping[str, str] | None,
+    ) -> bool:
+        """
+        Update the rate limits from the headers of a GitHub response.
+
+        Parameters
+        ----------
+        endpoint_class: str
+            The rate limit the request counted against. Overridden by the
+            `X-RateLimit-Resource` header when present.
+        headers: Optional[Mapping[str, str]]
+            The response headers.
+
+        Returns
+        -------
+        bool
+            Whether the response shows the rate limit was hit
+            (retry the request after acquiring again).
+        """
+        if not headers:
+            return False
+
+        headers = {key.lower(): value for key, value in headers.items()}
+        endpoint_class = headers.get("x-ratelimit-resource", endpoint_class)
+        now = time.monotonic()
+        rate_limited = False
+        with self._lock:
+            bucket = self._get_bucket(endpoint_class)
+            bucket.refill(now)
+            if "x-ratelimit-limit" in headers:
+                bucket.limit = int(headers["x-ratelimit-limit"])
+            if "x-ratelimit-reset" in headers:
+                bucket.reset_at = float(headers["x-ratelimit-reset"])
+            if "x-ratelimit-remaining" in headers:
+                remaining = int(headers["x-ratelimit-remaining"])
+                bucket.tokens = min(bucket.tokens, remaining)
+
+                # Nothing left until the window resets
+                if remaining == 0 and bucket.reset_at is not None:
+                    rate_limited = True
+                    bucket.blocked_until = max(
+                        bucket.blocked_until,
+                        now + max(bucket.reset_at - time.time(), 0),
+                    )
+            if "retry-after" in headers:
+                rate_limited = True
+                bucket.blocked_until = max(
+                    bucket.blocked_until,
+                    now + float(headers["retry-after"]),
+                )
+
+        return rate_limited
+
+    def usage(self) -> dict[str, RateLimitUsage]:
+        """
+        Get the rate limit budget and how much of it has been used.
+
+        Returns
+        -------
+        dict[str, RateLimitUsage]
+            Mapping of endpoint class to its limit, remaining requests,
+            reset time (epoch seconds), and the number of requests made,
+            seconds spent queued, and requests rejected by this scheduler.
+        """
+        with self._lock:
+            now = time.monotonic()
+            usage = {}
+            for endpoint_class, bucket in self._buckets.items():
+                bucket.refill(now)
+                usage[endpoint_class] = RateLimitUsage(
+                    endpoint_class=endpoint_class,
+                    limit=bucket.limit,
+                    remaining=max(int(bucket.tokens), 0),
+                    reset_at=bucket.reset_at,
+                    requests=bucket.requests,
+                    throttled_seconds=bucket.throttled_seconds,
+                    rejected=bucket.rejected,
+                )
+
+            return usage
+
+
+###############################################################################
+
+_SCHEDULER: GitHubRequestScheduler | None = None
+_SCHEDULER_LOCK = threading.Lock()
+
+
+def get_github_scheduler() -> GitHubRequestScheduler:
+    """
+    Get the process-wide shared GitHub request scheduler.
+
+    Returns
+    -------
+    GitHubRequestScheduler
+        The shared scheduler.
+    """
+    global _SCHEDULER
+    with _SCHEDULER_LOCK:
+        if _SCHEDULER is None:
+            _SCHEDULER = GitHubRequestScheduler()
+
+        return _SCHEDULER
+
+
+###############################################################################
+
+
+class LLMRateLimiter:
+    """
+    Limit LLM requests to a requests-per-minute and tokens-per-minute quota.
+
+    Callers reserve their share of both quotas before each request and wait
+    (without blocking the event loop) until the request fits. Reservations are
+    made in order so callers are served first come, first served.
+
+    Parameters
+    ----------
+    requests_per_minute: Optional[int]
+        The most requests to make per minute.
+        Default: None (check environment variables
+        for PWOC_LLM_REQUESTS_PER_MINUTE or else use 3500)
+    tokens_per_minute: Optional[int]
+        The most prompt and completion tokens to use per minute.
+        Default: None (check environment variables
+        for PWOC_LLM_TOKENS_PER_MINUTE or else use 90000)
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int | None = None,
+        tokens_per_minute: int | None = None,
+    ) -> None:
+        if requests_per_minute is None:
+            if "PWOC_LLM_REQUESTS_PER_MINUTE" in os.environ:
+                log.debug("Using PWOC_LLM_REQUESTS_PER_MINUTE from environment vars.")
+                requests_per_minute = int(os.environ["PWOC_LLM_REQUESTS_PER_MINUTE"])
+            else:
+                requests_per_minute = DEFAULT_LLM_REQUESTS_PER_MINUTE
+        if tokens_per_minute is None:
+            if "PWOC_LLM_TOKENS_PER_MINUTE" in os.environ:
+                log.debug("Using PWOC_LLM_TOKENS_PER_MINUTE from environment vars.")
+                tokens_per_minute = int(os.environ["PWOC_LLM_TOKENS_PER_MINUTE"])
+            else:
+                tokens_per_minute = DEFAULT_LLM_TOKENS_PER_MINUTE
+
+        self._lock = threading.Lock()
+        self._requests = _TokenBucket(requests_per_minute, 60)
+        self._tokens = _TokenBucket(tokens_per_minute, 60)
+
+    def reserve(self, n_tokens: int) -> float:
+        """
+        Reserve quota for a request.
+
+        Parameters
+        ----------
+        n_tokens: int
+            The (estimated) tokens the request will use.
+
+        Returns
+        -------
+        float
+            The seconds to wait before making the request.
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = max(
+                self._requests.wait_time(now),
+                self._tokens.wait_time(now, n_tokens),
+            )
+            self._requests.tokens -= 1
+            self._tokens.tokens -= min(n_tokens, self._tokens.limit)
+            self._requests.throttled_seconds += wait
+            return wait
+
+    async def acquire(self, n_tokens: int) -> None:
+        """
+        Wait until a request fits within the quota.
+
+        Parameters
+        ----------
+        n_tokens: int
+            The (estimated) tokens the request will use.
+        """
+        wait = self.reserve(n_tokens)
+        if wait > 0:
+            log.debug(f"Waiting {wait:.1f} seconds for LLM rate limits.")
+            await asyncio.sleep(wait)
+
+
+_LLM_RATE_LIMITER: LLMRateLimiter | None = None
+
+
+def get_llm_rate_limiter() -> LLMRateLimiter:
+    """
+    Get the process-wide shared LLM rate limiter.
+
+    Returns
+    -------
+    LLMRateLimiter
+        The shared rate limiter.
+    """
+    global _LLM_RATE_LIMITER
+    with _SCHEDULER_LOCK:
+        if _LLM_RATE_LIMITER is None:
+            _LLM_RATE_LIMITER = LLMRateLimiter()
+
+        return _LLM_RATE_LIMITER
@@ -0,0 +1,638 @@
+#!/usr/bin/env python
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any
+
+import backoff
+import requests
+from bs4 import BeautifulSoup
+from requests.exceptions import HTTPError
+
+from .caches import CachedReadme, ReadmeCache
+from .network import get_session
+from .rate_limits import (
+    CORE_ENDPOINT,
+    GRAPHQL_ENDPOINT,
+    GitHubRateLimitError,
+    get_github_scheduler,
+)
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+GITHUB_API_URL = "https://api.github.com"
+
+# Repositories per GraphQL README query, each costs one node per candidate path
+README_GRAPHQL_BATCH_SIZE = 50
+
+# Checked in order, the REST endpoint finds any other README name
+README_CANDIDATE_PATHS = ("README.md", "README.rst", "README", "readme.md")
+
+# No tokenizer we use averages more than this many characters per token
+# so a prefix of max_tokens * this many characters always covers the budget
+MAX_CHARS_PER_TOKEN = 10
+
+_FENCED_CODE_BLOCK = re.compile(r"^ {0,3}(```|~~~).*?^ {0,3}\1[^\n]*$", re.M | re.S)
+_HTML_COMMENT = re.compile(r"<!--.*?-->", re.S)
+_HTML_TAG = re.compile(r"</?[a-zA-Z][^>]*>")
+_MARKDOWN_IMAGE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+_MARKDOWN_LINK = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+_MARKDOWN_REFERENCE_DEFINITION = re.compile(r"^ {0,3}\[[^\]]+\]:\s+\S+.*$", re.M)
+_RST_DIRECTIVE = re.compile(r"^\.\. [\w-]+::.*$(\n^[ \t]+.*$)*", re.M)
+_URL = re.compile(r"https?://\S+")
+_BIBTEX_ENTRY_START = re.compile(r"@[a-zA-Z]+\s*\{")
+_COMMAND_LINE = re.compile(
+    r"^\s*(\$ |>>> |pip3? install|conda |git clone|python3? |cd |npm |yarn |"
+    r"docker |bash |sh |wget |curl |make |apt(-get)? |brew |cargo |go get )",
+    re.M,
+)
+_MARKDOWN_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_BOILERPLATE_SECTION_TITLES = re.compile(
+    r"^(licen[cs]e|citation|cite|citing|how to cite|bibtex|"
+    r"acknowledge?ments?|contributors?|contributing|table of contents)\b",
+    re.I,
+)
+
+###############################################################################
+
+
+class _InFlightFetches:
+    # Lets concurrent callers share one fetch per repository
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._futures: dict[str, Future] = {}
+
+    def claim(self, keys: list[str]) -> tuple[dict[str, Future], dict[str, Future]]:
+        # Returns the futures the caller must resolve
+        # and the futures already being resolved by others
+        owned = {}
+        waiting = {}
+        with self._lock:
+            for key in keys:
+                if key in self._futures:
+                    waiting[key] = self._futures[key]
+                else:
+                    owned[key] = self._futures[key] = Future()
+
+        return owned, waiting
+
+    def resolve(
+        self,
+        key: str,
+        future: Future,
+        result: Any = None,
+        exception: BaseException | None = None,
+    ) -> None:
+        with self._lock:
+            if self._futures.get(key) is future:
+                del self._futures[key]
+
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
+
+_IN_FLIGHT_FETCHES = _InFlightFetches()
+
+# Cache failures are logged and treated as misses
+_CACHE_ERRORS = (OSError, ValueError, sqlite3.Error)
+
+# Resolves an in-flight fetch that didn't find the README, waiters fetch it themselves
+_NOT_FETCHED = object()
+
+###############################################################################
+
+
+def _get_cached(
+    readme_cache: ReadmeCache | None,
+    repo_name: str,
+) -> CachedReadme | None:
+    if readme_cache is None:
+        return None
+
+    try:
+        return readme_cache.get(repo_name)
+    except _CACHE_ERRORS as e:
+        log.warning(f"Failed to read from README cache, error: '{e}'.")
+        return None
+
+
+def _store(
+    readme_cache: ReadmeCache | None,
+    repo_name: str,
+    text: str | None,
+    etag: str | None = None,
+    last_modified: str | None = None,
+) -> None:
+    if readme_cache is None:
+        return
+
+    try:
+        readme_cache.put(repo_name, text, etag=etag, last_modified=last_modified)
+    except _CACHE_ERRORS as e:
+        log.warning(f"Failed to write to README cache, error: '{e}'.")
+
+
+def _get_github_auth_headers() -> dict[str, str]:
+    # Same token GhApi uses
+    token = os.environ.get("GITHUB_TOKEN")
+    if token:
+        return {"Authorization": f"token {token}"}
+    return {}
+
+
+def _build_readmes_graphql_query(repo_names: list[str]) -> str:
+    repo_queries = []
+    for i, repo_name in enumerate(repo_names):
+        owner, name = repo_name.split("/", 1)
+        readme_queries = " ".join(
+            f"f{j}: object(expression: {json.dumps(f'HEAD:{path}')}) "
+            "{ ... on Blob { text } }"
+            for j, path in enumerate(README_CANDIDATE_PATHS)
+        )
+        repo_queries.append(
+            f"r{i}: repository(owner: {json.dumps(owner)}, name: {json.dumps(name)}) "
+            f"{{ {readme_queries} }}"
+        )
+
+    return "query { " + " ".join(repo_queries) + " }"
+
+
+def _request_readmes_graphql(repo_names: list[str]) -> dict[str, str]:
+    headers = _get_github_auth_headers()
+    readmes = {}
+    scheduler = get_github_scheduler()
+    for start in range(0, len(repo_names), README_GRAPHQL_BATCH_SIZE):
+        batch = repo_names[start : start + README_GRAPHQL_BATCH_SIZE]
+        try:
+            # Don't wait on the limit, the REST API can pick up the slack
+            scheduler.acquire(GRAPHQL_ENDPOINT, max_wait_seconds=0)
+            response = get_session().post(
+                f"{GITHUB_API_URL}/graphql",
+                headers=headers,
+                json={"query": _build_readmes_graphql_query(batch)},
+            )
+            scheduler.record_response(GRAPHQL_ENDPOINT, response.headers)
+            response.raise_for_status()
+            response_data = response.json()
+        except (requests.RequestException, ValueError, GitHubRateLimitError) as e:
+            log.warning(f"Failed to get READMEs with GraphQL, error: '{e}'.")
+            continue
+
+        # Missing repos are null and reported in errors, the rest still have data
+        repos_data = response_data.get("data") or {}
+        for i, repo_name in enumerate(batch):
+            repo_data = repos_data.get(f"r{i}") or {}
+            for j in range(len(README_CANDIDATE_PATHS)):
+                blob = repo_data.get(f"f{j}") or {}
+                if blob.get("text"):
+                    readmes[repo_name] = blob["text"]
+                    break
+
+    return readmes
+
+
+def get_readmes_bulk(
+    repo_names: list[str],
+    readme_cache: ReadmeCache | None = None,
+) -> dict[str, str]:
+    """
+    Get the README text of many repositories with batched GraphQL queries.
+
+    GitHub only allows authenticated GraphQL requests so nothing is fetched
+    unless the GITHUB_TOKEN environment variable is set.
+    Repositories already being fetched by another caller are skipped.
+    Failures are logged rather than raised, fetch any missing READMEs
+    with `fetch_readme` instead.
+
+    Parameters
+    ----------
+    repo_names: list[str]
+        The full names ("owner/name") of the repositories.
+    readme_cache: Optional[ReadmeCache]
+        A cache to serve READMEs from and store fetched READMEs in.
+        Default: None (always fetch)
+
+    Returns
+    -------
+    dict[str, str]
+        Mapping of repository name to README text for every repository
+        with a cached README or a README at one of `README_CANDIDATE_PATHS`.
+    """
+    # Serve what we can from the cache
+    readmes = {}
+    repo_names_to_fetch = []
+    for repo_name in repo_names:
+        cached = _get_cached(readme_cache, repo_name)
+        if cached is None or not cached.fresh:
+            repo_names_to_fetch.append(repo_name)
+        elif cached.text is not None:
+            readmes[repo_name] = cached.text
+
+    if len(repo_names_to_fetch) == 0 or len(_get_github_auth_headers()) == 0:
+        return readmes
+
+    # Only fetch the READMEs nobody else is fetching
+    owned, _ = _IN_FLIGHT_FETCHES.claim(
+        [repo_name.lower() for repo_name in repo_names_to_fetch]
+    )
+    fetched: dict[str, str] = {}
+    try:
+        fetched = _request_readmes_graphql(
+            [
+                repo_name
+                for repo_name in repo_names_to_fetch
+                if repo_name.lower() in owned
+            ]
+        )
+        for repo_name, text in fetched.items():
+            _store(readme_cache, repo_name, text)
+    finally:
+        fetched_lower = {repo_name.lower(): text for repo_name, text in fetched.items()}
+        for key, future in owned.items():
+            _IN_FLIGHT_FETCHES.resolve(
+                key,
+                future,
+                result=fetched_lower.get(key, _NOT_FETCHED),
+            )
+
+    readmes.update(fetched)
+    return readmes
+
+
+@dataclass
+class _ReadmeResponse:
+    text: str | None
+    etag: str | None = None
+    last_modified: str | None = None
+    not_modified: bool = False
+
+
+def _request_readme(
+    repo_name: str,
+    etag: str | None = None,
+    last_modified: str | None = None,
+) -> _ReadmeResponse:
+    # Conditional requests when we have validators
+    headers = {
+        "Accept": "application/vnd.github.raw",
+        **_get_github_auth_headers(),
+    }
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    get_github_scheduler().acquire(CORE_ENDPOINT, max_wait_seconds=0)
+    response = get_session().get(
+        f"{GITHUB_API_URL}/repos/{repo_name}/readme",
+        headers=headers,
+    )
+    get_github_scheduler().record_response(CORE_ENDPOINT, response.headers)
+    if response.status_code == 304:
+        return _ReadmeResponse(text=None, not_modified=True)
+    if response.status_code == 404:
+        return _ReadmeResponse(text=None)
+
+    response.raise_for_status()
+    return _ReadmeResponse(
+        text=response.text,
+        etag=response.headers.get("ETag"),
+        last_modified=response.headers.get("Last-Modified"),
+    )
+
+
+def get_readme(repo_name: str) -> str | None:
+    """
+    Get the raw README text of a repository from the GitHub REST API.
+
+    Parameters
+    ----------
+    repo_name: str
+        The full name ("owner/name") of the repository.
+
+    Returns
+    -------
+    Optional[str]
+        The README text or None if the repository has no README.
+
+    Raises
+    ------
+    GitHubRateLimitError
+        The core rate limit has been used up (requests are never queued).
+    HTTPError
+        Any other failure.
+    """
+    return _request_readme(repo_name).text
+
+
+def scrape_readme(repo_name: str) -> str | None:
+    """
+    Get the README text of a repository from its rendered github.com page.
+
+    Much slower than `get_readme`, only use this as a fallback.
+
+    Parameters
+    ----------
+    repo_name: str
+        The full name ("owner/name") of the repository.
+
+    Returns
+    -------
+    Optional[str]
+        The README text or None if the page has no README.
+    """
+    # Request repo page
+    response = get_session().get(f"https://github.com/{repo_name}")
+    response.raise_for_status()
+
+    # Read README content
+    soup = BeautifulSoup(response.content, "html.parser")
+    readme_container = soup.find(id="readme")
+    if not readme_container:
+        return None
+
+    # Drop code blocks and images before extracting text
+    for element in readme_container.find_all(["pre", "svg", "img"]):
+        element.decompose()
+
+    return readme_container.text
+
+
+_scrape_readme_with_retry = backoff.on_exception(
+    backoff.expo,
+    HTTPError,
+    max_time=60,
+)(scrape_readme)
+
+
+def _fetch_readme_uncached(
+    repo_name: str,
+    cached: CachedReadme | None,
+    readme_cache: ReadmeCache | None,
+) -> str | None:
+    try:
+        response = _request_readme(
+            repo_name,
+            etag=cached.etag if cached is not None else None,
+            last_modified=cached.last_modified if cached is not None else None,
+        )
+    except (HTTPError, GitHubRateLimitError) as e:
+        # Most likely rate limited, the html page doesn't count against limits
+        log.debug(
+            f"Failed to get README for '{repo_name}' from API, "
+            f"falling back to html. Error: '{e}'."
+        )
+        text = _scrape_readme_with_retry(repo_name)
+        _store(readme_cache, repo_name, text)
+        return text
+
+    # Stored README is still current
+    if response.not_modified and cached is not None:
+        _store(
+            readme_cache,
+            repo_name,
+            cached.text,
+            etag=cached.etag,
+            last_modified=cached.last_modified,
+        )
+        return cached.text
+
+    _store(
+        readme_cache,
+        repo_name,
+        response.text,
+        etag=response.etag,
+        last_modified=response.last_modified,
+    )
+    return response.text
+
+
+def fetch_readme(
+    repo_name: str,
+    readme_cache: ReadmeCache | None = None,
+) -> str | None:
+    """
+    Get the README text of a repository from the cache, API, or html page.
+
+    Expired cache entries are revalidated with a conditional request.
+    The html page is only scraped when the API request fails
+    (for example when rate limited). Concurrent calls for the same repository
+    share a single fetch.
+
+    Parameters
+    ----------
+    repo_name: str
+        The full name ("owner/name") of the repository.
+    readme_cache: Optional[ReadmeCache]
+        A cache to serve the README from and store a fetched README in.
+        Default: None (always fetch)
+
+    Returns
+    -------
+    Optional[str]
+        The README text or None if the repository has no README.
+    """
+    key = repo_name.lower()
+    while True:
+        cached = _get_cached(readme_cache, repo_name)
+        if cached is not None and cached.fresh:
+            return cached.text
+
+        # Wait for anyone already fetching this README
+        owned, waiting = _IN_FLIGHT_FETCHES.claim([key])
+        if key in waiting:
+            result = waiting[key].result()
+            if result is not _NOT_FETCHED:
+                return result
+            continue
+
+        future = owned[key]
+        try:
+            text = _fetch_readme_uncached(repo_name, cached, readme_cache)
+        except BaseException as e:
+            _IN_FLIGHT_FETCHES.resolve(key, future, exception=e)
+            raise
+
+        _IN_FLIGHT_FETCHES.resolve(key, future, result=text)
+        return text
+
+
+###############################################################################
+
+
+def _remove_bibtex_entries(text: str) -> str:
+    # Entries have nested braces so they can't be matched with a regex alone
+    parts = []
+    position = 0
+    for match in _BIBTEX_ENTRY_START.finditer(text):
+        if match.start() < position:
+            continue
+
+        depth = 0
+        end = None
+        for i in range(match.end() - 1, len(text)):
+            if text[i] == "{":
+                depth += 1
+            elif text[i] == "}":
+                depth -= 1
+                if depth == 0:
+                    end = i + 1
+                    break
+
+        # Unbalanced, leave as is
+        if end is None:
+            continue
+
+        parts.append(text[position : match.start()])
+        position = end
+
+    parts.append(text[position:])
+    return "".join(parts)
+
+
+def _remove_boilerplate_sections(text: str) -> str:
+    # Drop markdown sections such as License or Citation (and their subsections)
+    kept_lines = []
+    skip_level = None
+    for line in text.split("\n"):
+        heading = _MARKDOWN_HEADING.match(line)
+        if heading:
+            level = len(heading.group(1))
+            if skip_level is not None and level <= skip_level:
+                skip_level = None
+            if skip_level is None and _BOILERPLATE_SECTION_TITLES.match(
+                heading.group(2)
+            ):
+                skip_level = level
+
+        if skip_level is None:
+            kept_lines.append(line)
+
+    return "\n".join(kept_lines)
+
+
+def clean_readme_text(text: str) -> str:
+    """
+    Strip content from a README which carries little meaning for semantic search.
+
+    Removes code blocks, shell commands, badges and images, HTML, URLs,
+    BibTeX entries, and License / Citation / Acknowledgement sections,
+    then collapses whitespace.
+
+    Parameters
+    ----------
+    text: str
+        The README text (Markdown, reStructuredText, or plain text).
+
+    Returns
+    -------
+    str
+        The remaining prose.
+    """
+    text = _FENCED_CODE_BLOCK.sub(" ", text)
+    text = _remove_boilerplate_sections(text)
+    text = _HTML_COMMENT.sub(" ", text)
+    text = _MARKDOWN_IMAGE.sub(" ", text)
+    text = _HTML_TAG.sub(" ", text)
+    text = _MARKDOWN_LINK.sub(r"\1", text)
+    text = _MARKDOWN_REFERENCE_DEFINITION.sub(" ", text)
+    text = _RST_DIRECTIVE.sub(" ", text)
+    text = _remove_bibtex_entries(text)
+
+    # Commands are removed up to the end of the line
+    text = "\n".join(
+        "" if _COMMAND_LINE.match(line) else line for line in text.split("\n")
+    )
+    text = _URL.sub(" ", text)
+
+    return " ".join(text.split())
+
+
+def truncate_to_token_budget(text: str, tokenizer: Any, max_tokens: int) -> str:
+    """
+    Cut text to at most `max_tokens` tokens without tokenizing all of it.
+
+    Only a character prefix large enough to cover the budget is tokenized.
+    The cut is made at the end of the last token which fits in the budget.
+
+    Parameters
+    ----------
+    text: str
+        The text to truncate.
+    tokenizer: Any
+        A HuggingFace fast tokenizer (one that supports `return_offsets_mapping`).
+        If None or not a fast tokenizer only the character prefix is applied.
+    max_tokens: int
+        The maximum number of tokens to keep (excluding special tokens).
+
+    Returns
+    -------
+    str
+        The truncated text.
+    """
+    prefix = text[: max_tokens * MAX_CHARS_PER_TOKEN]
+    if tokenizer is None or not getattr(tokenizer, "is_fast", False):
+        return prefix
+
+    encoding = tokenizer(
+        prefix,
+        add_special_tokens=False,
+        truncation=True,
+        max_length=max_tokens,
+        return_offsets_mapping=True,
+    )
+    offsets = encoding["offset_mapping"]
+
+    # Everything fit
+    if len(offsets) < max_tokens:
+        return prefix
+
+    return prefix[: offsets[-1][1]]
+
+
+def prepare_readme_for_encoding(text: str, tokenizer: Any, max_tokens: int) -> str:
+    """
+    Clean a README and cut it to the encoders token budget.
+
+    Parameters
+    ----------
+    text: str
+        The README text.
+    tokenizer: Any
+        The encoders tokenizer.
+    max_tokens: int
+        The encoders maximum sequence length.
+
+    Returns
+    -------
+    str
+        The text to encode.
+
+    See Also
+    --------
+    clean_readme_text
+        The function used to remove non-prose content.
+    truncate_to_token_budget
+        The function used to cut text to the token budget.
+    """
+    cleaned = clean_readme_text(text)
+
+    # Nothing but code or badges, better to encode the original than nothing
+    if len(cleaned) == 0:
+        cleaned = " ".join(text.split())
+
+    # Leave room for the special tokens added during encoding
+    return truncate_to_token_budget(cleaned, tokenizer, max(max_tokens - 2, 1))
@@ -1,29 +1,59 @@
 #!/usr/bin/env python
 
-import itertools
-import json
+import asyncio
 import logging
-from concurrent.futures import ThreadPoolExecutor
-from dataclasses import dataclass
+import os
+import sqlite3
+import time
+import urllib.error
+from collections.abc import Iterator
+from dataclasses import dataclass, replace
 from functools import partial
-from pathlib import Path
+from typing import Any, cast
 
-import backoff
-import requests
-from bs4 import BeautifulSoup
+import numpy as np
 from dataclasses_json import DataClassJsonMixin
 from dotenv import load_dotenv
-from fastcore.net import HTTP4xxClientError
 from ghapi.all import GhApi
-from langchain import PromptTemplate
-from langchain.chat_models import ChatOpenAI
-from langchain.output_parsers import PydanticOutputParser
-from langchain.schema import HumanMessage
-from pydantic import BaseModel, Field
-from requests.exceptions import HTTPError
-from sentence_transformers import SentenceTransformer, util
 
+from .caches import (
+    EmbeddingCache,
+    KeywordCache,
+    ReadmeCache,
+    SearchResponseCache,
+    get_default_embedding_cache,
+    get_default_keyword_cache,
+    get_default_readme_cache,
+    get_default_search_cache,
+    try_cache,
+)
 from .custom_types import MinimalPaperDetails
+from .encoders import Encoder
+from .keywords import (  # noqa: F401
+    LLM_KEYWORD_MODEL,
+    LLM_KEYWORD_PROMPT_STRING,
+    LLMKeywordResults,
+    _get_keywords,
+    _get_paper_text,
+    get_keywords,
+    prewarm_keyword_cache,
+)
+from .models import (  # noqa: F401
+    DEFAULT_LOCAL_CACHE_MODEL,
+    DEFAULT_TRANSFORMER_MODEL,
+    get_model,
+    get_model_cache_name,
+    preload_model_async,
+)
+from .network import get_executor, get_github_api
+from .papers import get_paper, get_papers  # noqa: F401
+from .query_planning import PlannedQuery, plan_keyword_queries
+from .rate_limits import SEARCH_ENDPOINT, get_github_scheduler
+from .readmes import (
+    fetch_readme,
+    get_readmes_bulk,
+    prepare_readme_for_encoding,
+)
 
 ###############################################################################
 
@@ -31,144 +61,18 @@ log = logging.getLogger(__name__)
 
 ###############################################################################
 
-DEFAULT_TRANSFORMER_MODEL = "thenlper/gte-small"
-DEFAULT_LOCAL_CACHE_MODEL = f"./sentence-transformers_{DEFAULT_TRANSFORMER_MODEL}"
+DEFAULT_ENCODE_BATCH_SIZE = 32
 
 ###############################################################################
 
 
-def get_paper(query: str) -> MinimalPaperDetails:
-    """
-    Get a papers details from the Semantic Scholar API.
-
-    Provide a DOI, SemanticScholarID, CorpusID, ArXivID, ACL,
-    or URL from semanticscholar.org, arxiv.org, aclweb.org,
-    acm.org, or biorxiv.org. DOIs can be provided as is.
-    All other IDs should be given with their type, for example:
-    `doi:doi:10.18653/v1/2020.acl-main.447`
-    or `CorpusID:202558505` or `url:https://arxiv.org/abs/2004.07180`.
-
-    Parameters
-    ----------
-    query: str
-        The structured paper to query for.
-
-    Returns
-    -------
-    Paper
-        The paper details.
-
-    Raises
-    ------
-    ValueErorr
-        No paper was found.
-    """
-    log.info(f"Getting SemanticScholar paper details with query: '{query}'")
-    response = requests.get(
-        f"https://api.semanticscholar.org/graph/v1/paper/{query.strip()}"
-        "?fields=paperId,title,authors,abstract"
-    )
-    response.raise_for_status()
-    response_data = response.json()
-    log.info(f"Found SemanticScholar paper with query: '{query}'")
-    log.info(f"Response data: {response_data}")
-
-    # Handle no paper found
-    if len(response_data) == 0:
-        raise ValueError(f"No paper found with DOI: '{query}'")
-
-    return MinimalPaperDetails(
-        url=f"https://www.semanticscholar.org/paper/{response_data['paperId']}",
-        title=response_data.get("title"),
-        authors=response_data.get("authors", None),
-        abstract=response_data.get("abstract", None),
-        keywords=None,
-        other={"full_semantic_scholar_data": response_data},
-    )
-
-
-class LLMKeywordResults(BaseModel):
-    keywords: list[str] = Field(
-        description=("Extracted keyword sequences found in the text.")
-    )
-
-
-LLM_KEYWORD_RESULTS_PARSER = PydanticOutputParser(pydantic_object=LLMKeywordResults)
-
-LLM_KEYWORD_PROMPT_STRING = (
-    "Task: Create a list of five keywords from the following text. "
-    "Keywords can range from one to four words in length. "
-    "Only extracted text should be included in the list of keywords. "
-    "Keywords can include acronyms and abbreviations.\n\n"
-    "{{ format_instructions }}"
-    "\n\n---\n\n"
-    "Example Input Text:\n\n"
-    "SciBERT: A Pretrained Language Model for Scientific Text "
-    "Obtaining large-scale annotated data for NLP tasks in the "
-    "scientific domain is challenging and expensive. We release SciBERT, "
-    "a pretrained language model based on BERT (Devlin et. al., 2018) "
-    "to address the lack of high-quality, large-scale labeled scientific data. "
-    "SciBERT leverages unsupervised pretraining on a large multi-domain corpus of "
-    "scientific publications to improve performance on downstream scientific "
-    "NLP tasks. We evaluate on a suite of tasks including sequence tagging, "
-    "sentence classification and dependency parsing, with datasets from a "
-    "variety of scientific domains. We demonstrate statistically significant "
-    "improvements over BERT and achieve new state-of-the-art results on several "
-    "of these tasks. The code and pretrained models are available at "
-    "https://github.com/allenai/scibert/."
-    "\n\n---\n\n"
-    "Example Output Text:\n\n"
-    '{"keywords": ['
-    '"SciBERT", '
-    '"Language Model for Scientific Text", '
-    '"large-scale labeled scientific data", '
-    '"Scientific Text", '
-    '"SciBERT leverages unsupervised pretraining"'
-    "]}"
-    "\n\n---\n\n"
-    "Input Text:\n\n{{ text }}"
-    "\n\n---\n\n"
-)
-
-LLM_KEYWORD_PROMPT_TEMPLATE = PromptTemplate.from_template(
-    LLM_KEYWORD_PROMPT_STRING,
-    template_format="jinja2",
-)
-
-backoff.on_exception(backoff.expo, exception=json.JSONDecodeError, max_time=10)
-
-
-def _run_keyword_get_from_llm(text: str, llm: ChatOpenAI) -> LLMKeywordResults:
-    # Fill prompt to get input
-    input_ = LLM_KEYWORD_PROMPT_TEMPLATE.format_prompt(
-        text=text,
-        format_instructions=LLM_KEYWORD_RESULTS_PARSER.get_format_instructions(),
-    )
-
-    # Generate keywords
-    output = llm([HumanMessage(content=input_.text)]).content.strip()
-
-    # Parse output
-    parsed_output = LLM_KEYWORD_RESULTS_PARSER.parse(output)
-
-    return parsed_output
-
-
-def _get_keywords(text: str) -> list[str]:
-    # Create connection to LLM
-    llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0, max_tokens=1000)
-
-    # Get keywords
-    parsed_output = _run_keyword_get_from_llm(text, llm)
-
-    # Return keywords
-    return parsed_output.keywords
-
-
 @dataclass
 class SearchQueryDataTracker:
     query_str: str
     strict: bool = False
+    page: int = 1
+    # Set for queries which search several keywords at once
+    plan: PlannedQuery | None = None
 
 
 @dataclass
@@ -181,50 +85,148 @@ class SearchQueryResponse:
     description: str
 
 
-@backoff.on_exception(backoff.expo, HTTP4xxClientError)
-def _search_repos(
-    query: SearchQueryDataTracker, api: GhApi
-) -> list[SearchQueryResponse]:
-    # Make request
-    if query.strict:
-        response = api(
-            "/search/repositories",
-            "GET",
-            query={
-                "q": f'"{query.query_str}"',
-                "per_page": 10,
-            },
-        )
-    else:
-        response = api(
-            "/search/repositories",
-            "GET",
-            query={
-                "q": f"{query.query_str}",
-                "per_page": 10,
-            },
-        )
+SEARCH_RESULTS_PER_PAGE = 10
+
+# Retries for requests GitHub rejected for rate limits (each waits for the limit)
+MAX_RATE_LIMITED_ATTEMPTS = 3
+
+
+def _request_search(
+    q: str,
+    api: GhApi,
+    etag: str | None = None,
+    per_page: int = SEARCH_RESULTS_PER_PAGE,
+    page: int = 1,
+) -> tuple[dict | None, str | None]:
+    # Returns the response (None if not modified since the etag) and its etag
+    headers = {"If-None-Match": etag} if etag else None
+    query: dict[str, Any] = {"q": q, "per_page": per_page}
+    if page > 1:
+        query["page"] = page
+
+    # Wait for the search rate limit rather than retrying blindly
+    scheduler = get_github_scheduler()
+    attempt = 1
+    while True:
+        scheduler.acquire(SEARCH_ENDPOINT)
+        try:
+            response = api(
+                "/search/repositories",
+                "GET",
+                headers=headers,
+                query=query,
+            )
+        except urllib.error.HTTPError as e:
+            rate_limited = scheduler.record_response(
+                SEARCH_ENDPOINT, dict(e.headers.items())
+            )
+            if e.code == 304:
+                return None, etag
+            if not rate_limited or attempt == MAX_RATE_LIMITED_ATTEMPTS:
+                raise
+            log.debug(f"GitHub search rate limited, retrying query: '{q}'.")
+            attempt += 1
+        else:
+            response_headers = {
+                key.lower(): value
+                for key, value in (getattr(api, "recv_hdrs", None) or {}).items()
+            }
+            scheduler.record_response(SEARCH_ENDPOINT, response_headers)
+            return response, response_headers.get("etag")
+
 
+def _parse_search_items(response: dict) -> list[dict[str, Any]]:
     # Dedupe and process
     dedupe_repos_strs = set()
-    results = []
+    items = []
     # Unpack items
     for item in response["items"]:
         if not item["fork"]:
             if item["full_name"] not in dedupe_repos_strs:
                 dedupe_repos_strs.add(item["full_name"])
-                results.append(
-                    SearchQueryResponse(
-                        query_str=query.query_str,
-                        repo_name=item["full_name"],
-                        stars=item["stargazers_count"],
-                        forks=item["forks"],
-                        watchers=item["watchers_count"],
-                        description=item["description"],
-                    )
+                items.append(
+                    {
+                        "repo_name": item["full_name"],
+                        "stars": item["stargazers_count"],
+                        "forks": item["forks"],
+                        "watchers": item["watchers_count"],
+                        "description": item["description"],
+                    }
                 )
 
-    return results
+    return items
+
+
+def _search_repos(
+    query: SearchQueryDataTracker,
+    api: GhApi | None = None,
+    search_cache: SearchResponseCache | None = None,
+) -> list[SearchQueryResponse]:
+    # Use this threads client
+    if api is None:
+        api = get_github_api()
+
+    # Build the query
+    if query.plan is not None:
+        q = query.plan.to_query_string(query.strict)
+        per_page = query.plan.per_page
+    elif query.strict:
+        q = f'"{query.query_str}"'
+        per_page = SEARCH_RESULTS_PER_PAGE
+    else:
+        q = f"{query.query_str}"
+        per_page = SEARCH_RESULTS_PER_PAGE
+
+    # Use stored results until they expire
+    cache_key = (query.query_str, query.strict, per_page)
+    cached = None
+    if search_cache is not None:
+        cached = try_cache(
+            "read from search", search_cache.get, *cache_key, page=query.page
+        )
+    if cached is not None and cached.fresh:
+        items = cached.results
+
+    else:
+        # Make request (revalidating expired results)
+        response, etag = _request_search(
+            q,
+            api,
+            etag=cached.etag if cached is not None else None,
+            per_page=per_page,
+            page=query.page,
+        )
+
+        # Not modified, expired results are still current
+        if response is None and cached is not None:
+            items = cached.results
+            if search_cache is not None:
+                try_cache(
+                    "write to search", search_cache.refresh, *cache_key, page=query.page
+                )
+        else:
+            items = _parse_search_items(response or {"items": []})
+            if search_cache is not None:
+                try_cache(
+                    "write to search",
+                    search_cache.put,
+                    *cache_key,
+                    results=items,
+                    etag=etag,
+                    page=query.page,
+                )
+
+    # Split merged results back to the keyword each was found for
+    if query.plan is not None:
+        return [
+            SearchQueryResponse(
+                query_str=query.plan.attribute(item["repo_name"], item["description"]),
+                **item,
+            )
+            for item in items
+        ]
+
+    return [SearchQueryResponse(query_str=query.query_str, **item) for item in items]
 
 
 @dataclass
@@ -238,26 +240,23 @@ class RepoReadmeResponse:
     description: str
 
 
-@backoff.on_exception(backoff.expo, HTTPError, max_time=60)
 def _get_repo_readme_content(
     repo_data: SearchQueryResponse,
+    readme_text: str | None = None,
+    readme_cache: ReadmeCache | None = None,
 ) -> RepoReadmeResponse | None:
-    # Request repo page
-    response = requests.get(f"https://github.com/{repo_data.repo_name}")
-    response.raise_for_status()
-
-    # Read README content
-    soup = BeautifulSoup(response.content, "html.parser")
-    readme_container = soup.find(id="readme")
+    # Not already fetched in bulk
+    if readme_text is None:
+        readme_text = fetch_readme(repo_data.repo_name, readme_cache=readme_cache)
 
     # Will be filtered out after this
-    if not readme_container:
+    if not readme_text:
         return None
 
     return RepoReadmeResponse(
         repo_name=repo_data.repo_name,
         search_query=repo_data.query_str,
-        readme_text=readme_container.text,
+        readme_text=readme_text,
         stars=repo_data.stars,
         forks=repo_data.forks,
         watchers=repo_data.watchers,
@@ -277,38 +276,130 @@ class RepoDetails(DataClassJsonMixin):
     description: str
 
 
-def _semantic_sim_repos(
-    all_repos_details: list[RepoReadmeResponse],
-    paper: MinimalPaperDetails,
-    model: SentenceTransformer | None = None,
-) -> list[RepoDetails]:
-    # Load model
-    if not model:
-        potential_cache_dir = Path(DEFAULT_LOCAL_CACHE_MODEL).resolve()
-        if potential_cache_dir.exists():
-            model = SentenceTransformer(str(potential_cache_dir))
-        else:
-            model = SentenceTransformer(DEFAULT_TRANSFORMER_MODEL)
+def _top_k_indices(scores: np.ndarray, top_k: int | None = None) -> np.ndarray:
+    # Nothing requested
+    if top_k is not None and top_k <= 0:
+        return np.array([], dtype=np.int64)
+
+    # Full ordering requested (or k covers everything)
+    if top_k is None or top_k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+
+    # Partial sort to find the top k then only order those
+    top_k_unordered = np.argpartition(-scores, top_k - 1)[:top_k]
+    return top_k_unordered[np.argsort(-scores[top_k_unordered], kind="stable")]
+
+
+def _encode_texts(
+    texts: list[str],
+    model: Encoder,
+    batch_size: int = DEFAULT_ENCODE_BATCH_SIZE,
+    embedding_cache: EmbeddingCache | None = None,
+) -> np.ndarray:
+    # No cache, encode everything
+    if embedding_cache is None:
+        return model.encode(
+            texts,
+            batch_size=batch_size,
+            normalize_embeddings=True,
+        )
+
+    # Only encode the texts we haven't seen before
+    # The cache is only an optimization, on any failure just encode
+    try:
+        cached_embeddings = embedding_cache.get(texts)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        log.warning(f"Failed to read from embedding cache, error: '{e}'.")
+        cached_embeddings = [None for _ in texts]
+
+    missing_indices = [
+        i for i, embedding in enumerate(cached_embeddings) if embedding is None
+    ]
+    if len(missing_indices) == 0:
+        return np.stack(cast(list[np.ndarray], cached_embeddings))
+
+    missing_texts = [texts[i] for i in missing_indices]
+    missing_embeddings = model.encode(
+        missing_texts,
+        batch_size=batch_size,
+        normalize_embeddings=True,
+    )
+    try:
+        embedding_cache.put(missing_texts, missing_embeddings)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        log.warning(f"Failed to write to embedding cache, error: '{e}'.")
+
+    # Fill in the gaps
+    embeddings = np.empty(
+        (len(texts), missing_embeddings.shape[1]),
+        dtype=missing_embeddings.dtype,
+    )
+    embeddings[missing_indices] = missing_embeddings
+    for i, embedding in enumerate(cached_embeddings):
+        if embedding is not None:
+            embeddings[i] = embedding
+
+    return embeddings
 
-    # Encode abstract once
+
+def _encode_paper(
+    paper: MinimalPaperDetails,
+    model: Encoder,
+    embedding_cache: EmbeddingCache | None = None,
+) -> np.ndarray:
+    # Encode abstract (or title if no abstract) once
     if paper.abstract:
-        sem_vec_paper = model.encode(paper.abstract, convert_to_tensor=True)
+        paper_text = paper.abstract
     else:
-        sem_vec_paper = model.encode(paper.title, convert_to_tensor=True)
+        paper_text = paper.title
+    (sem_vec_paper,) = _encode_texts(
+        [paper_text],
+        model=model,
+        embedding_cache=embedding_cache,
+    )
+    return sem_vec_paper
+
+
+def _encode_readmes(
+    repos_details: list[RepoReadmeResponse],
+    model: Encoder,
+    batch_size: int = DEFAULT_ENCODE_BATCH_SIZE,
+    embedding_cache: EmbeddingCache | None = None,
+) -> np.ndarray:
+    # Strip non-prose content and cut to the token budget before tokenization
+    readme_texts = [
+        prepare_readme_for_encoding(
+            repo_details.readme_text,
+            tokenizer=model.tokenizer,
+            max_tokens=model.max_seq_length,
+        )
+        for repo_details in repos_details
+    ]
+
+    # Encode all readmes as batches
+    return _encode_texts(
+        readme_texts,
+        model=model,
+        batch_size=batch_size,
+        embedding_cache=embedding_cache,
+    )
 
-    # Collapse all readmes
-    complete_repo_details = []
-    for repo_details in all_repos_details:
-        sem_vec_readme = model.encode(repo_details.readme_text, convert_to_tensor=True)
 
-        # Compute cosine-similarities
-        score = util.cos_sim(sem_vec_readme, sem_vec_paper).item()
+def _rank_repos(
+    all_repos_details: list[RepoReadmeResponse],
+    scores: np.ndarray,
+    top_k: int | None = None,
+) -> list[RepoDetails]:
+    # Collapse all readmes in ranked order
+    complete_repo_details = []
+    for index in _top_k_indices(scores, top_k=top_k):
+        repo_details = all_repos_details[index]
         complete_repo_details.append(
             RepoDetails(
                 name=repo_details.repo_name,
                 link=f"https://github.com/{repo_details.repo_name}",
                 search_query=repo_details.search_query,
-                similarity=score,
+                similarity=float(scores[index]),
                 stars=repo_details.stars,
                 forks=repo_details.forks,
                 watchers=repo_details.watchers,
@@ -319,21 +410,508 @@ def _semantic_sim_repos(
     return complete_repo_details
 
 
-def get_repos(
+def _semantic_sim_repos(
+    all_repos_details: list[RepoReadmeResponse],
+    paper: MinimalPaperDetails,
+    model: Encoder | None = None,
+    batch_size: int = DEFAULT_ENCODE_BATCH_SIZE,
+    top_k: int | None = None,
+    embedding_cache: EmbeddingCache | None = None,
+    model_name: str = DEFAULT_TRANSFORMER_MODEL,
+    backend: str | None = None,
+) -> list[RepoDetails]:
+    # Nothing to rank, don't wait on the model
+    if len(all_repos_details) == 0:
+        return []
+
+    # Get shared model
+    if not model:
+        model = get_model(model_name, backend=backend)
+
+    sem_vec_paper = _encode_paper(paper, model, embedding_cache=embedding_cache)
+    sem_vecs_readmes = _encode_readmes(
+        all_repos_details,
+        model,
+        batch_size=batch_size,
+        embedding_cache=embedding_cache,
+    )
+
+    # Compute cosine-similarities for all readmes at once
+    # (embeddings are normalized so the dot product is the cosine similarity)
+    scores = sem_vecs_readmes @ sem_vec_paper
+    return _rank_repos(all_repos_details, scores, top_k=top_k)
+
+
+def _get_search_queries(
     paper: MinimalPaperDetails,
-    loaded_sent_transformer: SentenceTransformer | None = None,
+    keyword_cache: KeywordCache | None = None,
+    keyword_backend: str | None = None,
+    model: Encoder | None = None,
+    model_name: str = DEFAULT_TRANSFORMER_MODEL,
+    backend: str | None = None,
+) -> list[SearchQueryDataTracker]:
+    # No keywords were provided, generate from abstract and title
+    if not paper.keywords:
+        # Get keywords
+        log.info("Right before keyword search...")
+        keywords = get_keywords(
+            _get_paper_text(paper),
+            keyword_backend=keyword_backend,
+            keyword_cache=keyword_cache,
+            model=model,
+            model_name=model_name,
+            backend=backend,
+        )
+        log.info("Right after keywords search...")
+
+    # Paper was provided with keywords, use those
+    else:
+        keywords = paper.keywords
+
+    # Create the queries, combining keywords to make fewer searches
+    return [
+        SearchQueryDataTracker(
+            query_str=" OR ".join(plan.terms),
+            strict=True,
+            plan=plan,
+        )
+        for plan in plan_keyword_queries(keywords)
+    ]
+
+
+class _ReadmeEncodingBatcher:
+    # Encodes READMEs in batches as they arrive
+    # so encoding overlaps with the network requests still in flight
+
+    def __init__(
+        self,
+        model: Encoder | None,
+        batch_size: int,
+        embedding_cache: EmbeddingCache | None,
+        model_name: str,
+        backend: str | None,
+    ) -> None:
+        self.model = model
+        self.batch_size = batch_size
+        self.embedding_cache = embedding_cache
+        self.model_name = model_name
+        self.backend = backend
+        self.queue: asyncio.Queue[RepoReadmeResponse | None] = asyncio.Queue()
+        self.repos_details: list[RepoReadmeResponse] = []
+        self.vectors: list[np.ndarray] = []
+        self.paper_vector: np.ndarray | None = None
+        self._task: asyncio.Future | None = None
+
+    async def _get_model(self) -> Encoder:
+        # Only wait on the model once there is something to encode
+        if self.model is None:
+            self.model = await asyncio.wrap_future(
+                preload_model_async(self.model_name, backend=self.backend)
+            )
+        return self.model
+
+    async def _encode(self, batch: list[RepoReadmeResponse]) -> None:
+        model = await self._get_model()
+        self.vectors.append(
+            await asyncio.get_running_loop().run_in_executor(
+                None,
+                partial(
+                    _encode_readmes,
+                    batch,
+                    model,
+                    batch_size=self.batch_size,
+                    embedding_cache=self.embedding_cache,
+                ),
+            )
+        )
+        self.repos_details.extend(batch)
+
+    async def run(self) -> None:
+        batch = []
+        while (repo_details := await self.queue.get()) is not None:
+            batch.append(repo_details)
+            if len(batch) >= self.batch_size:
+                await self._encode(batch)
+                batch = []
+
+        # Encode the remainder
+        if len(batch) > 0:
+            await self._encode(batch)
+
+    def start(self) -> None:
+        self._task = asyncio.ensure_future(self.run())
+
+    async def finish(self) -> None:
+        # Encode everything queued so far (can be started again after)
+        await self.queue.put(None)
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    def cancel(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+    async def best_score(self, paper: MinimalPaperDetails) -> float:
+        if len(self.repos_details) == 0:
+            return float("-inf")
+
+        sem_vec_paper = await self.encode_paper(paper)
+        return float(np.max(np.concatenate(self.vectors) @ sem_vec_paper))
+
+    async def encode_paper(self, paper: MinimalPaperDetails) -> np.ndarray:
+        # Shared by the description prefilter and the final ranking
+        if self.paper_vector is None:
+            model = await self._get_model()
+            self.paper_vector = await asyncio.get_running_loop().run_in_executor(
+                None,
+                partial(
+                    _encode_paper, paper, model, embedding_cache=self.embedding_cache
+                ),
+            )
+        return self.paper_vector
+
+    async def score_descriptions(
+        self,
+        paper: MinimalPaperDetails,
+        candidates: list[SearchQueryResponse],
+    ) -> np.ndarray:
+        model = await self._get_model()
+        sem_vec_paper = await self.encode_paper(paper)
+        sem_vecs_descriptions = await asyncio.get_running_loop().run_in_executor(
+            None,
+            partial(
+                _encode_texts,
+                # Fall back to the repo name when there is no description
+                [
+                    candidate.description or candidate.repo_name
+                    for candidate in candidates
+                ],
+                model=model,
+                batch_size=self.batch_size,
+                embedding_cache=self.embedding_cache,
+            ),
+        )
+        return sem_vecs_descriptions @ sem_vec_paper
+
+    async def rank(
+        self, paper: MinimalPaperDetails, top_k: int | None
+    ) -> list[RepoDetails]:
+        # Nothing to rank, don't wait on the model
+        if len(self.repos_details) == 0:
+            return []
+
+        sem_vec_paper = await self.encode_paper(paper)
+        scores = np.concatenate(self.vectors) @ sem_vec_paper
+        return _rank_repos(self.repos_details, scores, top_k=top_k)
+
+
+def _select_candidates(
+    candidates: list[SearchQueryResponse],
+    scores: np.ndarray,
+    max_candidates: int,
+) -> list[SearchQueryResponse]:
+    # Keep the top N and anything tied with the Nth
+    if len(candidates) <= max_candidates:
+        return candidates
+    if max_candidates <= 0:
+        return []
+
+    threshold = np.sort(scores)[::-1][max_candidates - 1]
+    return [
+        candidates[index]
+        for index in np.argsort(-scores, kind="stable")
+        if scores[index] >= threshold
+    ]
+
+
+async def _search_new_repos(
+    query: SearchQueryDataTracker,
+    search_cache: SearchResponseCache | None,
+    seen_repo_names: set[str],
+) -> list[SearchQueryResponse]:
+    # Drop repos already found by other queries
+    # (only the event loop thread touches the set so no lock is needed)
+    found_repos = await asyncio.get_running_loop().run_in_executor(
+        get_executor(),
+        partial(_search_repos, query, search_cache=search_cache),
+    )
+    new_repos = [
+        found_repo
+        for found_repo in found_repos
+        if found_repo.repo_name not in seen_repo_names
+    ]
+    seen_repo_names.update(found_repo.repo_name for found_repo in new_repos)
+    return new_repos
+
+
+async def _get_readmes(
+    repos: list[SearchQueryResponse],
+    readme_cache: ReadmeCache | None,
+    readmes_queue: "asyncio.Queue[RepoReadmeResponse | None]",
+) -> None:
+    if len(repos) == 0:
+        return
+
+    # Get the READMEs in bulk where possible and one by one for the rest
+    loop = asyncio.get_running_loop()
+    exe = get_executor()
+    bulk_readmes = await loop.run_in_executor(
+        exe,
+        get_readmes_bulk,
+        [repo.repo_name for repo in repos],
+        readme_cache,
+    )
+    readme_fetches = [
+        loop.run_in_executor(
+            exe,
+            _get_repo_readme_content,
+            repo,
+            bulk_readmes.get(repo.repo_name),
+            readme_cache,
+        )
+        for repo in repos
+    ]
+
+    # Hand off each README as soon as it arrives, filtering repos without one
+    for readme_fetch in asyncio.as_completed(readme_fetches):
+        repo_details = await readme_fetch
+        if repo_details is not None:
+            await readmes_queue.put(repo_details)
+
+
+async def _search_and_get_readmes(
+    query: SearchQueryDataTracker,
+    search_cache: SearchResponseCache | None,
+    readme_cache: ReadmeCache | None,
+    seen_repo_names: set[str],
+    readmes_queue: "asyncio.Queue[RepoReadmeResponse | None]",
+) -> int:
+    new_repos = await _search_new_repos(query, search_cache, seen_repo_names)
+    await _get_readmes(new_repos, readme_cache, readmes_queue)
+    return len(new_repos)
+
+
+async def _search_and_prefilter(
+    queries: list[SearchQueryDataTracker],
+    paper: MinimalPaperDetails,
+    max_candidates: int,
+    search_cache: SearchResponseCache | None,
+    readme_cache: ReadmeCache | None,
+    seen_repo_names: set[str],
+    batcher: _ReadmeEncodingBatcher,
+) -> tuple[int, int]:
+    # Returns the number of new repos found and how many READMEs were fetched
+    # Collect every candidate first
+    found = await asyncio.gather(
+        *[_search_new_repos(query, search_cache, seen_repo_names) for query in queries]
+    )
+    candidates = [repo for repos in found for repo in repos]
+    n_found = len(candidates)
+
+    # Only fetch READMEs for the candidates with the closest descriptions
+    if len(candidates) > max_candidates:
+        scores = await batcher.score_descriptions(paper, candidates)
+        selected = _select_candidates(candidates, scores, max_candidates)
+        log.debug(
+            f"Fetching READMEs for {len(selected)} of {len(candidates)} candidates."
+        )
+        candidates = selected
+
+    await _get_readmes(candidates, readme_cache, batcher.queue)
+    return n_found, len(candidates)
+
+
+@dataclass
+class AdaptiveSearchBudget:
+    # Stop searching once a README is at least this similar to the paper
+    confidence_threshold: float = 0.85
+    # The most GitHub search requests to make for one paper
+    max_search_calls: int = 10
+    # No further searches are started after this many seconds
+    max_seconds: float = 30.0
+
+
+def _deeper_search_rounds(
+    queries: list[SearchQueryDataTracker],
+) -> Iterator[list[SearchQueryDataTracker]]:
+    # Alternate between the next page of the strict queries
+    # and the keywords searched as loose terms (one search per keyword
+    # since relaxed terms can't be combined with OR)
+    relaxed = [
+        SearchQueryDataTracker(query_str=term, strict=False)
+        for query in queries
+        for term in (query.plan.terms if query.plan else [query.query_str])
+    ]
+    page = 1
+    while True:
+        page += 1
+        yield [replace(query, page=page) for query in queries]
+        yield [replace(query, page=page - 1) for query in relaxed]
+
+
+class _SearchRunner:
+    # Runs rounds of searches, fetching and queueing READMEs for encoding
+
+    def __init__(
+        self,
+        paper: MinimalPaperDetails,
+        max_candidates: int | None,
+        search_cache: SearchResponseCache | None,
+        readme_cache: ReadmeCache | None,
+        batcher: _ReadmeEncodingBatcher,
+    ) -> None:
+        self.paper = paper
+        self.remaining_candidates = max_candidates
+        self.search_cache = search_cache
+        self.readme_cache = readme_cache
+        self.batcher = batcher
+        self.seen_repo_names: set[str] = set()
+        self.n_search_calls = 0
+
+    async def run_round(self, queries: list[SearchQueryDataTracker]) -> int:
+        self.n_search_calls += len(queries)
+
+        # Run every search (and its README fetches) concurrently
+        if self.remaining_candidates is None:
+            n_found = await asyncio.gather(
+                *[
+                    _search_and_get_readmes(
+                        query,
+                        self.search_cache,
+                        self.readme_cache,
+                        self.seen_repo_names,
+                        self.batcher.queue,
+                    )
+                    for query in queries
+                ]
+            )
+            return sum(n_found)
+
+        # Prefilter on descriptions before fetching READMEs
+        n_new, n_fetched = await _search_and_prefilter(
+            queries,
+            self.paper,
+            self.remaining_candidates,
+            self.search_cache,
+            self.readme_cache,
+            self.seen_repo_names,
+            self.batcher,
+        )
+        self.remaining_candidates -= n_fetched
+        return n_new
+
+    async def run_adaptive(
+        self,
+        queries: list[SearchQueryDataTracker],
+        budget: AdaptiveSearchBudget,
+    ) -> None:
+        start = time.monotonic()
+        await self.run_round(queries)
+
+        # Search deeper until a confident match or the budget runs out
+        exhausted: set[bool] = set()
+        for round_queries in _deeper_search_rounds(queries):
+            if len(exhausted) == 2 or self.n_search_calls >= budget.max_search_calls:
+                log.debug("No more searches to make within the call budget.")
+                break
+            if time.monotonic() - start >= budget.max_seconds:
+                log.debug("Adaptive search time budget reached.")
+                break
+            if self.remaining_candidates is not None and self.remaining_candidates <= 0:
+                break
+
+            # Skip kinds of search which stopped finding anything new
+            round_queries = [
+                query for query in round_queries if query.strict not in exhausted
+            ][: budget.max_search_calls - self.n_search_calls]
+            if len(round_queries) == 0:
+                continue
+
+            # Wait for everything found so far to be encoded
+            await self.batcher.finish()
+            best_score = await self.batcher.best_score(self.paper)
+            self.batcher.start()
+            if best_score >= budget.confidence_threshold:
+                log.debug(f"Found a confident match ({best_score:.3f}), stopping.")
+                break
+
+            log.debug(
+                f"Best match so far ({best_score:.3f}) below "
+                f"{budget.confidence_threshold}, searching deeper: {round_queries}"
+            )
+            if await self.run_round(round_queries) == 0:
+                exhausted.add(round_queries[0].strict)
+
+
+async def get_repos_async(
+    paper: MinimalPaperDetails,
+    loaded_sent_transformer: Encoder | None = None,
+    batch_size: int = DEFAULT_ENCODE_BATCH_SIZE,
+    top_k: int | None = None,
+    model_name: str = DEFAULT_TRANSFORMER_MODEL,
+    use_cache: bool = True,
+    backend: str | None = None,
+    max_candidates: int | None = None,
+    adaptive_budget: AdaptiveSearchBudget | None = None,
+    keyword_backend: str | None = None,
 ) -> list[RepoDetails]:
     """
     Try to find GitHub repositories matching a provided paper.
 
+    Every search streams its results straight into README fetching and
+    every README streams into batched encoding as soon as it arrives.
+    When `max_candidates` is set the searches are collected first
+    and only the READMEs of the best matching descriptions are fetched.
+
     Parameters
     ----------
     paper: MinimalPaperDetails
         The paper to try and find similar repositories to.
-    loaded_sent_transformer: Optional[SentenceTransformer]
-        An optional preloaded SentenceTransformer model to use
-        instead of loading a new one.
-        Default: None
+    loaded_sent_transformer: Optional[Encoder]
+        An optional preloaded SentenceTransformer (or other encoder) to use
+        instead of the shared model from the model registry.
+        Default: None (use `models.get_model(model_name, backend)`)
+    batch_size: int
+        The number of READMEs to encode together in a single forward pass.
+        Default: 32
+    top_k: Optional[int]
+        Only return the top k most similar repositories.
+        Default: None (return all repositories)
+    model_name: str
+        The name of the sentence transformer model used for encoding.
+        Embeddings are cached by this name so it must match
+        `loaded_sent_transformer` when one is provided.
+        Default: "thenlper/gte-small"
+    use_cache: bool
+        Should persistent caches be used to avoid repeating work
+        from previous searches.
+        Default: True (use caches unless disabled with PWOC_DISABLE_CACHE)
+    backend: Optional[str]
+        The encoder backend to use when no model is provided.
+        One of "sentence-transformers", "onnx", or "onnx-int8".
+        Embeddings are cached separately per backend.
+        Default: None (check environment variables
+        for PWOC_ENCODER_BACKEND or else use "sentence-transformers")
+    max_candidates: Optional[int]
+        Only fetch and encode the READMEs of this many search results.
+        Candidates are chosen by how similar their short descriptions are
+        to the paper (keeping any tied with the last candidate).
+        Default: None (check environment variables
+        for PWOC_MAX_README_CANDIDATES or else use every search result)
+    adaptive_budget: Optional[AdaptiveSearchBudget]
+        Search adaptively: stop after the first searches if a README is
+        similar enough to the paper, otherwise search more pages and
+        looser queries until one is found or the budget of search calls
+        and time is used up.
+        Default: None (check environment variables for PWOC_ADAPTIVE_SEARCH
+        and use the default `AdaptiveSearchBudget` if set
+        or else run each search once)
+    keyword_backend: Optional[str]
+        How to generate keywords for papers without them.
+        Either "llm" or "local" (see `keywords.get_keywords`).
+        Default: None (check environment variables
+        for PWOC_KEYWORD_BACKEND or else use "llm")
 
     Returns
     -------
@@ -342,81 +920,170 @@ def get_repos(
         sorted by each repositories README's semantic similarity
         to the abstract (or title if no abstract was attached to the paper details).
     """
+    # Start loading the model in the background
+    # it is only needed once the first READMEs arrive
+    if loaded_sent_transformer is None:
+        preload_model_async(model_name, backend=backend)
+
     # Try loading dotenv
     load_dotenv()
 
-    # Connect to API
-    api = GhApi()
-
-    # No keywords were provided, generate from abstract and title
-    if not paper.keywords:
-        # Get all the queries we want to run
-        if paper.title and paper.abstract:
-            paper_content = f"{paper.title}\n\n{paper.abstract}"
-        elif paper.title:
-            paper_content = paper.title
-        elif paper.abstract:
-            paper_content = paper.abstract
-
-        # Get keywords
-        log.info("Right before keyword search...")
-        keywords = _get_keywords(
-            paper_content,
-        )
-        log.info("Right after keywords search...")
-
-        # Create the queries
-        set_queries = [
-            SearchQueryDataTracker(
-                query_str=keyword,
-                strict=True,
-            )
-            for keyword in keywords
-        ]
-
-    # Paper was provided with keywords, use those
-    else:
-        set_queries = [
-            SearchQueryDataTracker(
-                query_str=keyword,
-                strict=True,
-            )
-            for keyword in paper.keywords
-        ]
+    # Handle max candidates
+    if max_candidates is None and "PWOC_MAX_README_CANDIDATES" in os.environ:
+        log.debug("Using PWOC_MAX_README_CANDIDATES from environment vars.")
+        max_candidates = int(os.environ["PWOC_MAX_README_CANDIDATES"])
+
+    # Handle adaptive search
+    if adaptive_budget is None and os.environ.get(
+        "PWOC_ADAPTIVE_SEARCH", ""
+    ).lower() in ("1", "true", "yes"):
+        log.debug("Using PWOC_ADAPTIVE_SEARCH from environment vars.")
+        adaptive_budget = AdaptiveSearchBudget()
+
+    # Get the queries (generating keywords can take a while)
+    set_queries = await asyncio.get_running_loop().run_in_executor(
+        get_executor(),
+        partial(
+            _get_search_queries,
+            paper,
+            keyword_cache=get_default_keyword_cache() if use_cache else None,
+            keyword_backend=keyword_backend,
+            model=loaded_sent_transformer,
+            model_name=model_name,
+            backend=backend,
+        ),
+    )
 
     # Progress info
     log.info(
         f"Searching GitHub for Paper: '{paper.title}'. Using queries: {set_queries}"
     )
 
-    # Create partial search func with API access already attached
-    search_func = partial(_search_repos, api=api)
-
-    # Do a bunch of threading during the search
-    with ThreadPoolExecutor() as exe:
-        # Find repos from GH Search
-        found_repos = itertools.chain(*list(exe.map(search_func, set_queries)))
-
-        # Combine all responses
-        repos_to_parse = []
-        set_repo_strs = set()
-        for found_repo in found_repos:
-            if found_repo.repo_name not in set_repo_strs:
-                repos_to_parse.append(found_repo)
-                set_repo_strs.add(found_repo.repo_name)
-
-        # Get the README for each repo in the set
-        repos_and_readmes = list(
-            exe.map(
-                _get_repo_readme_content,
-                repos_to_parse,
-            )
-        )
+    # Start encoding READMEs as they arrive
+    batcher = _ReadmeEncodingBatcher(
+        model=loaded_sent_transformer,
+        batch_size=batch_size,
+        embedding_cache=(
+            get_default_embedding_cache(get_model_cache_name(model_name, backend))
+            if use_cache
+            else None
+        ),
+        model_name=model_name,
+        backend=backend,
+    )
+    batcher.start()
+
+    # Search and fetch the READMEs of everything found
+    runner = _SearchRunner(
+        paper,
+        max_candidates=max_candidates,
+        search_cache=get_default_search_cache() if use_cache else None,
+        readme_cache=get_default_readme_cache() if use_cache else None,
+        batcher=batcher,
+    )
+    try:
+        if adaptive_budget is None:
+            await runner.run_round(set_queries)
+        else:
+            await runner.run_adaptive(set_queries, adaptive_budget)
+    except BaseException:
+        batcher.cancel()
+        raise
+
+    # Report the remaining API budget for capacity planning
+    for usage in get_github_scheduler().usage().values():
+        log.debug(f"GitHub rate limit usage: {usage}")
+
+    # Finish encoding and rank
+    await batcher.finish()
+    return await batcher.rank(paper, top_k=top_k)
 
-    # Filter nones from readmes
-    repos_and_readmes = [
-        r_and_r for r_and_r in repos_and_readmes if r_and_r is not None
-    ]
 
-    repos = _semantic_sim_repos(repos_and_readmes, paper, model=loaded_sent_transformer)
-    return sorted(repos, key=lambda x: x.similarity, reverse=True)
+def get_repos(
+    paper: MinimalPaperDetails,
+    loaded_sent_transformer: Encoder | None = None,
+    batch_size: int = DEFAULT_ENCODE_BATCH_SIZE,
+    top_k: int | None = None,
+    model_name: str = DEFAULT_TRANSFORMER_MODEL,
+    use_cache: bool = True,
+    backend: str | None = None,
+    max_candidates: int | None = None,
+    adaptive_budget: AdaptiveSearchBudget | None = None,
+    keyword_backend: str | None = None,
+) -> list[RepoDetails]:
+    """
+    Try to find GitHub repositories matching a provided paper.
+
+    Runs `get_repos_async` to completion. From async code
+    await `get_repos_async` directly instead.
+
+    Parameters
+    ----------
+    paper: MinimalPaperDetails
+        The paper to try and find similar repositories to.
+    loaded_sent_transformer: Optional[Encoder]
+        An optional preloaded SentenceTransformer (or other encoder) to use
+        instead of the shared model from the model registry.
+        Default: None (use `models.get_model(model_name, backend)`)
+    batch_size: int
+        The number of READMEs to encode together in a single forward pass.
+        Default: 32
+    top_k: Optional[int]
+        Only return the top k most similar repositories.
+        Default: None (return all repositories)
+    model_name: str
+        The name of the sentence transformer model used for encoding.
+        Embeddings are cached by this name so it must match
+        `loaded_sent_transformer` when one is provided.
+        Default: "thenlper/gte-small"
+    use_cache: bool
+        Should persistent caches be used to avoid repeating work
+        from previous searches.
+        Default: True (use caches unless disabled with PWOC_DISABLE_CACHE)
+    backend: Optional[str]
+        The encoder backend to use when no model is provided.
+        One of "sentence-transformers", "onnx", or "onnx-int8".
+        Embeddings are cached separately per backend.
+        Default: None (check environment variables
+        for PWOC_ENCODER_BACKEND or else use "sentence-transformers")
+    max_candidates: Optional[int]
+        Only fetch and encode the READMEs of this many search results.
+        Candidates are chosen by how similar their short descriptions are
+        to the paper (keeping any tied with the last candidate).
+        Default: None (check environment variables
+        for PWOC_MAX_README_CANDIDATES or else use every search result)
+    adaptive_budget: Optional[AdaptiveSearchBudget]
+        Search adaptively: stop after the first searches if a README is
+        similar enough to the paper, otherwise search more pages and
+        looser queries until one is found or the budget of search calls
+        and time is used up.
+        Default: None (check environment variables for PWOC_ADAPTIVE_SEARCH
+        and use the default `AdaptiveSearchBudget` if set
+        or else run each search once)
+    keyword_backend: Optional[str]
+        How to generate keywords for papers without them.
+        Either "llm" or "local" (see `keywords.get_keywords`).
+        Default: None (check environment variables
+        for PWOC_KEYWORD_BACKEND or else use "llm")
+
+    Returns
+    -------
+    list[RepoDetails]
+        A list of repositories that are similar to the paper,
+        sorted by each repositories README's semantic similarity
+        to the abstract (or title if no abstract was attached to the paper details).
+    """
+    return asyncio.run(
+        get_repos_async(
+            paper,
+            loaded_sent_transformer=loaded_sent_transformer,
+            batch_size=batch_size,
+            top_k=top_k,
+            model_name=model_name,
+            use_cache=use_cache,
+            backend=backend,
+            max_candidates=max_candidates,
+            adaptive_budget=adaptive_budget,
+            keyword_backend=keyword_backend,
+        )
+    )
@@ -0,0 +1 @@
+"""Unit test package for papers_without_code."""
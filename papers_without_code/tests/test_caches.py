@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+
+import multiprocessing
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from papers_without_code.caches import (
+    EmbeddingCache,
+    KeywordCache,
+    PaperCache,
+    ReadmeCache,
+    SearchResponseCache,
+)
+
+###############################################################################
+
+
+def _vec(*values: float) -> np.ndarray:
+    return np.array([values], dtype=np.float32)
+
+
+def _put_from_other_process(cache_dir: str) -> None:
+    cache = EmbeddingCache("test-model", cache_dir=cache_dir, max_entries=4)
+    cache.put(["from child"], _vec(4, 3, 2, 1))
+
+
+###############################################################################
+
+
+def test_embedding_cache_hit_and_miss(tmp_path: Path) -> None:
+    cache = EmbeddingCache("test-model", cache_dir=tmp_path, max_entries=4)
+
+    # Nothing stored yet
+    assert cache.get(["a"]) == [None]
+
+    cache.put(["a", "b"], np.concatenate([_vec(1, 0, 0, 0), _vec(0, 1, 0, 0)]))
+    a, missing, b = cache.get(["a", "c", "b"])
+    np.testing.assert_array_equal(a, [1, 0, 0, 0])
+    np.testing.assert_array_equal(b, [0, 1, 0, 0])
+    assert missing is None
+    assert len(cache) == 2
+
+    # Keys are on normalized whitespace
+    (a_spaced,) = cache.get(["  a \n"])
+    np.testing.assert_array_equal(a_spaced, [1, 0, 0, 0])
+
+    # Keys are namespaced by model
+    other = EmbeddingCache("other-model", cache_dir=tmp_path, max_entries=4)
+    assert other.get(["a"]) == [None]
+
+
+def test_embedding_cache_lru_eviction(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    # Always record access times so that LRU order is exact
+    monkeypatch.setattr("papers_without_code.caches.LRU_TOUCH_INTERVAL_SECONDS", -1)
+    cache = EmbeddingCache("test-model", cache_dir=tmp_path, max_entries=3)
+    cache.put(["x"], _vec(1, 0))
+    cache.put(["y"], _vec(0, 1))
+    cache.put(["z"], _vec(1, 1))
+
+    # Use x so that y is the least recently used
+    cache.get(["x"])
+    cache.put(["w"], _vec(2, 2))
+
+    x, y, z, w = cache.get(["x", "y", "z", "w"])
+    assert y is None
+    np.testing.assert_array_equal(x, [1, 0])
+    np.testing.assert_array_equal(z, [1, 1])
+    np.testing.assert_array_equal(w, [2, 2])
+    assert len(cache) == 3
+
+
+def test_embedding_cache_dimension_mismatch(tmp_path: Path) -> None:
+    cache = EmbeddingCache("test-model", cache_dir=tmp_path, max_entries=3)
+    cache.put(["a"], _vec(1, 0, 0))
+
+    with pytest.raises(ValueError):
+        cache.put(["b"], _vec(1, 0))
+
+    # The cache is still usable
+    (a,) = cache.get(["a"])
+    np.testing.assert_array_equal(a, [1, 0, 0])
+
+
+def test_embedding_cache_reopen(tmp_path: Path) -> None:
+    cache = EmbeddingCache("test-model", cache_dir=tmp_path, max_entries=3)
+    cache.put(["a"], _vec(1, 2))
+
+    # Stored capacity wins over the requested capacity
+    reopened = EmbeddingCache("test-model", cache_dir=tmp_path, max_entries=10)
+    assert reopened.max_entries == 3
+    (a,) = reopened.get(["a"])
+    np.testing.assert_array_equal(a, [1, 2])
+
+
+def test_embedding_cache_failed_put_is_consistent(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    cache = EmbeddingCache("test-model", cache_dir=tmp_path, max_entries=1)
+    cache.put(["a"], _vec(1, 0))
+
+    # Fail after the vector has been written over a's slot
+    def _fail(*args: object, **kwargs: object) -> None:
+        raise KeyboardInterrupt()
+
+    monkeypatch.setattr(cache, "_publish", _fail)
+    with pytest.raises(KeyboardInterrupt):
+        cache.put(["x"], _vec(0, 1))
+    monkeypatch.undo()
+
+    # a was evicted and x never published, neither may return x's vector
+    assert cache.get(["a", "x"]) == [None, None]
+
+    # The connection is not left inside a transaction and the slot is reusable
+    cache.put(["y"], _vec(3, 3))
+    (y,) = cache.get(["y"])
+    np.testing.assert_array_equal(y, [3, 3])
+
+
+def test_embedding_cache_interrupted_reserve_rolls_back(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    cache = EmbeddingCache("test-model", cache_dir=tmp_path, max_entries=2)
+    cache.put(["a"], _vec(1, 0))
+
+    def _fail(*args: object, **kwargs: object) -> None:
+        raise KeyboardInterrupt()
+
+    monkeypatch.setattr(cache, "_reserve_slots", _fail)
+    with pytest.raises(KeyboardInterrupt):
+        cache.put(["b"], _vec(0, 1))
+    monkeypatch.undo()
+
+    cache.put(["b"], _vec(0, 1))
+    a, b = cache.get(["a", "b"])
+    np.testing.assert_array_equal(a, [1, 0])
+    np.testing.assert_array_equal(b, [0, 1])
+
+
+def test_embedding_cache_shared_between_processes(tmp_path: Path) -> None:
+    cache = EmbeddingCache("test-model", cache_dir=tmp_path, max_entries=4)
+    cache.put(["from parent"], _vec(1, 2, 3, 4))
+
+    process = multiprocessing.get_context("spawn").Process(
+        target=_put_from_other_process,
+        args=(str(tmp_path),),
+    )
+    process.start()
+    process.join(timeout=60)
+    assert process.exitcode == 0
+
+    from_parent, from_child = cache.get(["from parent", "from child"])
+    np.testing.assert_array_equal(from_parent, [1, 2, 3, 4])
+    np.testing.assert_array_equal(from_child, [4, 3, 2, 1])
+
+
+def test_search_cache(tmp_path: Path) -> None:
+    cache = SearchResponseCache(cache_dir=tmp_path, ttl_seconds=60)
+    assert cache.get("graph neural network", True, 10) is None
+
+    results = [{"repo_name": "a/one", "stars": 1}]
+    cache.put("Graph  Neural Network", True, 10, results=results, etag='W/"abc"')
+
+    # Keyed on the normalized query, strictness, page size, and page
+    cached = cache.get(" graph neural network", True, 10)
+    assert cached is not None
+    assert cached.results == results
+    assert cached.etag == 'W/"abc"'
+    assert cached.fresh
+    assert cache.get("graph neural network", False, 10) is None
+    assert cache.get("graph neural network", True, 20) is None
+    assert cache.get("graph neural network", True, 10, page=2) is None
+
+    # Shared with other instances
+    assert (
+        SearchResponseCache(cache_dir=tmp_path).get("graph neural network", True, 10)
+        == cached
+    )
+
+
+def test_search_cache_expiry_and_refresh(tmp_path: Path) -> None:
+    cache = SearchResponseCache(cache_dir=tmp_path, ttl_seconds=0)
+    cache.put("query", True, 10, results=[], etag="etag")
+
+    # Expired results are kept for revalidation
+    cached = cache.get("query", True, 10)
+    assert cached is not None
+    assert not cached.fresh
+
+    cache.ttl_seconds = 60
+    before = cached.fetched_at
+    cache.refresh("query", True, 10)
+    refreshed = cache.get("query", True, 10)
+    assert refreshed is not None
+    assert refreshed.fresh
+    assert refreshed.fetched_at >= before
+
+
+def test_readme_cache_tiers(tmp_path: Path) -> None:
+    cache = ReadmeCache(cache_dir=tmp_path, ttl_seconds=60, memory_entries=2)
+    assert cache.get("a/one") is None
+
+    cache.put("a/one", "one", etag='"1"', last_modified="Mon")
+    cache.put("b/two", None)
+    cache.put("c/three", "three")
+
+    # Least recently used entry left memory but is still on disk
+    assert list(cache._memory) == ["b/two", "c/three"]
+    cached = cache.get("A/One")
+    assert cached is not None
+    assert (cached.text, cached.etag, cached.last_modified) == ("one", '"1"', "Mon")
+    assert cached.fresh
+    assert list(cache._memory) == ["c/three", "a/one"]
+
+    # Missing READMEs are stored too
+    no_readme = ReadmeCache(cache_dir=tmp_path).get("b/two")
+    assert no_readme is not None
+    assert no_readme.text is None
+
+    cache.ttl_seconds = 0
+    expired = cache.get("c/three")
+    assert expired is not None
+    assert not expired.fresh
+
+
+def test_keyword_cache(tmp_path: Path) -> None:
+    cache = KeywordCache(cache_dir=tmp_path)
+    assert cache.get("model", "prompt {{ text }}", "Title\n\nAbstract") is None
+
+    cache.put("model", "prompt {{ text }}", "Title\n\nAbstract", ["a", "b"])
+    assert cache.get("model", "prompt {{ text }}", "Title  \n\nAbstract") == ["a", "b"]
+
+    # A different model or prompt doesn't reuse the keywords
+    assert cache.get("other-model", "prompt {{ text }}", "Title\n\nAbstract") is None
+    assert cache.get("model", "new prompt {{ text }}", "Title\n\nAbstract") is None
+    assert (cache.hits, cache.misses) == (1, 3)
+
+    # Shared with other instances
+    assert KeywordCache(cache_dir=tmp_path).get(
+        "model", "prompt {{ text }}", "Title\n\nAbstract"
+    ) == ["a", "b"]
+
+
+def test_paper_cache_aliases_and_expiry(tmp_path: Path) -> None:
+    cache = PaperCache(cache_dir=tmp_path, ttl_seconds=60)
+    assert cache.get("doi:10.1/abc") is None
+
+    cache.put("abc", {"title": "A"}, aliases=["doi:10.1/abc", "arxiv:1234.5678"])
+    for alias in ["abc", "doi:10.1/abc", "arxiv:1234.5678"]:
+        assert cache.get(alias) == {"title": "A"}
+
+    # Updates are seen through every alias
+    cache.put("abc", {"title": "B"}, aliases=["corpusid:1"])
+    assert cache.get("doi:10.1/abc") == {"title": "B"}
+
+    # Expired papers are dropped on reopen
+    cache.ttl_seconds = 0
+    assert cache.get("abc") is None
+    reopened = PaperCache(cache_dir=tmp_path, ttl_seconds=0)
+    reopened.ttl_seconds = 60
+    assert reopened.get("corpusid:1") is None
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+
+import numpy as np
+import pytest
+
+from papers_without_code.encoders import check_ranking_parity, resolve_backend
+from papers_without_code.models import get_model_cache_name
+
+###############################################################################
+
+
+class FixedEncoder:
+    tokenizer = None
+    max_seq_length = 512
+
+    def __init__(self, vectors: dict[str, list[float]]) -> None:
+        self.vectors = vectors
+
+    def encode(
+        self,
+        sentences: str | list[str],
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+    ) -> np.ndarray:
+        if isinstance(sentences, str):
+            return self.encode([sentences], normalize_embeddings=normalize_embeddings)[
+                0
+            ]
+
+        embeddings = np.array([self.vectors[text] for text in sentences])
+        return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+###############################################################################
+
+
+def test_resolve_backend(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("PWOC_ENCODER_BACKEND", raising=False)
+    assert resolve_backend() == "sentence-transformers"
+    assert resolve_backend("onnx-int8") == "onnx-int8"
+
+    monkeypatch.setenv("PWOC_ENCODER_BACKEND", "onnx")
+    assert resolve_backend() == "onnx"
+    assert get_model_cache_name("some/model") == "some/model@onnx"
+    assert get_model_cache_name("some/model", "sentence-transformers") == "some/model"
+
+    with pytest.raises(ValueError):
+        resolve_backend("tensorflow")
+
+
+def test_check_ranking_parity() -> None:
+    reference = FixedEncoder(
+        {"q": [1, 0], "a": [1, 0.1], "b": [1, 1], "c": [0, 1]},
+    )
+
+    # Tiny perturbation keeps the ranking
+    close = FixedEncoder(
+        {"q": [1, 0], "a": [1, 0.11], "b": [1, 1.01], "c": [0.001, 1]},
+    )
+    results = check_ranking_parity(reference, close, "q", ["a", "b", "c"])
+    assert results.same_ranking
+    assert results.passed
+
+    # Swapped ranking fails
+    swapped = FixedEncoder(
+        {"q": [1, 0], "a": [1, 1], "b": [1, 0.1], "c": [0, 1]},
+    )
+    results = check_ranking_parity(reference, swapped, "q", ["a", "b", "c"])
+    assert not results.same_ranking
+    assert not results.passed
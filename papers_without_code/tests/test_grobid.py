@@ -0,0 +1,285 @@
+#!/usr/bin/env python
+
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+import requests
+
+pytest.importorskip("grobid_client")
+pytest.importorskip("docker")
+
+from papers_without_code import get_papers_from_pdfs, grobid, processing
+from papers_without_code.custom_types import MinimalPaperDetails
+from papers_without_code.grobid import (
+    GrobidInstance,
+    GrobidPool,
+    GrobidProcessingError,
+    find_grobid_containers,
+    find_pdfs,
+    process_pdf,
+    setup_grobid_pool,
+    wait_until_alive,
+)
+
+###############################################################################
+
+HEADER_TEI = """<TEI xmlns="http://www.tei-c.org/ns/1.0">
+<teiHeader><fileDesc><titleStmt><title>Fancy Model</title></titleStmt>
+</fileDesc></teiHeader></TEI>"""
+
+###############################################################################
+
+
+class FakeGrobidClient:
+    def __init__(self, status_code: int = 200) -> None:
+        self.status_code = status_code
+        self.calls: list[dict[str, Any]] = []
+
+    def process_pdf(self, **kwargs: Any) -> tuple[str, int, str]:
+        self.calls.append(kwargs)
+        return kwargs["pdf_file"], self.status_code, HEADER_TEI
+
+
+def _make_pool(n_instances: int) -> GrobidPool:
+    return GrobidPool(
+        [
+            GrobidInstance(
+                url=f"http://127.0.0.1:{8070 + i}",
+                client=f"client-{i}",  # type: ignore
+                container_id=f"container-{i}",
+            )
+            for i in range(n_instances)
+        ]
+    )
+
+
+@pytest.fixture
+def pdf_path(tmp_path: Path) -> Path:
+    pdf_path = tmp_path / "paper.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4")
+    return pdf_path
+
+
+def test_process_pdf_modes(
+    monkeypatch: pytest.MonkeyPatch,
+    pdf_path: Path,
+) -> None:
+    monkeypatch.delenv("GROBID_MODE", raising=False)
+    monkeypatch.delenv("GROBID_CONSOLIDATE_HEADER", raising=False)
+    client = FakeGrobidClient()
+
+    # Header only and consolidated by default
+    data = process_pdf(client, pdf_path)  # type: ignore
+    assert "teiHeader" in data
+    assert client.calls[-1]["service"] == "processHeaderDocument"
+    assert client.calls[-1]["consolidate_header"] is True
+
+    process_pdf(client, pdf_path, mode="fulltext")  # type: ignore
+    assert client.calls[-1]["service"] == "processFulltextDocument"
+
+    # Configurable from the environment
+    monkeypatch.setenv("GROBID_MODE", "fulltext")
+    monkeypatch.setenv("GROBID_CONSOLIDATE_HEADER", "false")
+    process_pdf(client, pdf_path)  # type: ignore
+    assert client.calls[-1]["service"] == "processFulltextDocument"
+    assert client.calls[-1]["consolidate_header"] is False
+
+    with pytest.raises(ValueError):
+        process_pdf(client, pdf_path, mode="references")  # type: ignore
+
+
+def test_process_pdf_errors(pdf_path: Path) -> None:
+    with pytest.raises(ValueError):
+        process_pdf(FakeGrobidClient(status_code=500), pdf_path)  # type: ignore
+    with pytest.raises(IsADirectoryError):
+        process_pdf(FakeGrobidClient(), pdf_path.parent)  # type: ignore
+
+
+def test_find_pdfs(tmp_path: Path) -> None:
+    for name in ["a.pdf", "nested/b.PDF", "nested/notes.txt"]:
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_bytes(b"")
+
+    assert find_pdfs(tmp_path) == [tmp_path / "a.pdf", tmp_path / "nested/b.PDF"]
+    assert find_pdfs(tmp_path / "**/*.txt") == [tmp_path / "nested/notes.txt"]
+    assert find_pdfs(tmp_path / "a.pdf") == [tmp_path / "a.pdf"]
+    assert find_pdfs(tmp_path / "missing") == []
+
+
+def test_get_papers_from_pdfs(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    for name in ["a.pdf", "b.pdf", "broken.pdf"]:
+        (tmp_path / name).write_bytes(b"")
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def _process_pdf(client: Any, pdf_path: Path, **kwargs: Any) -> dict:
+        nonlocal in_flight, max_in_flight
+        with lock:
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+        time.sleep(0.05)
+        with lock:
+            in_flight -= 1
+        if pdf_path.stem == "broken":
+            raise ValueError("Processing failed")
+        return {"title": pdf_path.stem}
+
+    n_setups = 0
+
+    def _setup_grobid_pool() -> GrobidPool:
+        nonlocal n_setups
+        n_setups += 1
+        return _make_pool(1)
+
+    monkeypatch.setattr(grobid, "setup_grobid_pool", _setup_grobid_pool)
+    monkeypatch.setattr(grobid, "process_pdf", _process_pdf)
+    monkeypatch.setattr(
+        processing,
+        "parse_grobid_data",
+        lambda data: MinimalPaperDetails(title=data["title"], authors=[], abstract=""),
+    )
+    results = dict(get_papers_from_pdfs(tmp_path, max_concurrency=2))
+
+    # One server for every PDF and failures don't stop the others
+    assert n_setups == 1
+    assert max_in_flight == 2
+    assert {
+        path.name: result.title
+        for path, result in results.items()
+        if not isinstance(result, Exception)
+    } == {"a.pdf": "a", "b.pdf": "b"}
+    assert isinstance(results[tmp_path / "broken.pdf"], ValueError)
+
+    with pytest.raises(FileNotFoundError):
+        next(get_papers_from_pdfs(tmp_path / "*.txt"))
+
+
+def test_grobid_pool_least_loaded_and_retries(
+    monkeypatch: pytest.MonkeyPatch,
+    pdf_path: Path,
+) -> None:
+    pool = _make_pool(3)
+    pool.instances[0].in_flight = 2
+    pool.instances[1].in_flight = 1
+    calls = []
+
+    def _process_pdf(client: str, pdf_path: Path, **kwargs: Any) -> dict:
+        calls.append(client)
+        if client == "client-2":
+            raise requests.ConnectionError("Container died")
+        if client == "client-1":
+            raise GrobidProcessingError("Server error", status_code=500)
+        return {"client": client}
+
+    monkeypatch.setattr(grobid, "process_pdf", _process_pdf)
+    monkeypatch.setattr(grobid, "_is_alive", lambda url: False)
+
+    # Least loaded first, failed servers are retried elsewhere and marked unhealthy
+    assert pool.process_pdf(pdf_path) == {"client": "client-0"}
+    assert calls == ["client-2", "client-1", "client-0"]
+    assert [instance.healthy for instance in pool.instances] == [True, False, False]
+    assert [instance.in_flight for instance in pool.instances] == [2, 1, 0]
+
+    # Bad PDFs are not retried
+    def _bad_pdf(client: str, pdf_path: Path, **kwargs: Any) -> dict:
+        calls.append(client)
+        raise GrobidProcessingError("Bad PDF", status_code=400)
+
+    calls.clear()
+    monkeypatch.setattr(grobid, "process_pdf", _bad_pdf)
+    with pytest.raises(GrobidProcessingError):
+        pool.process_pdf(pdf_path)
+    assert calls == ["client-0"]
+    assert pool.instances[0].healthy
+
+    # Unhealthy servers are checked again later
+    monkeypatch.setattr(grobid, "GROBID_HEALTH_RECHECK_SECONDS", 0)
+    monkeypatch.setattr(grobid, "_is_alive", lambda url: url.endswith("8072"))
+    pool.instances[0].healthy = False
+    calls.clear()
+    with pytest.raises(GrobidProcessingError):
+        pool.process_pdf(pdf_path)
+    assert calls == ["client-2"]
+
+
+def test_find_grobid_containers_uses_configured_image(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    containers = [
+        SimpleNamespace(image=SimpleNamespace(tags=tags))
+        for tags in [["custom/grobid:1"], [], ["lfoppiano/grobid:0.7.2"]]
+    ]
+    docker_client = SimpleNamespace(
+        containers=SimpleNamespace(list=lambda all: containers)
+    )
+
+    monkeypatch.setenv("GROBID_IMAGE", "custom/grobid:1")
+    assert find_grobid_containers(docker_client=docker_client) == containers[:1]  # type: ignore
+
+
+def test_wait_until_alive_polls_with_backoff(monkeypatch: pytest.MonkeyPatch) -> None:
+    checks = []
+    sleeps: list[float] = []
+    monkeypatch.setattr(
+        grobid, "_is_alive", lambda url: checks.append(url) or len(checks) == 4
+    )
+    monkeypatch.setattr(grobid.time, "sleep", sleeps.append)
+
+    assert wait_until_alive("http://127.0.0.1:8070", timeout_seconds=60)
+    assert sleeps == [0.1, 0.2, 0.4]
+
+    # Gives up at the deadline
+    checks.clear()
+    assert not wait_until_alive("http://127.0.0.1:8070", timeout_seconds=0)
+    assert len(checks) == 1
+
+
+def test_setup_grobid_pool_reuses_connection_record(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    monkeypatch.setenv("PWOC_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(grobid, "_is_alive", lambda url: True)
+    n_docker_setups = 0
+
+    def _start_pool(image: str, ports: list[int], grobid_client_kws: dict) -> Any:
+        nonlocal n_docker_setups
+        n_docker_setups += 1
+        pool = _make_pool(len(ports))
+        for instance, port in zip(pool.instances, ports, strict=True):
+            instance.url = f"http://127.0.0.1:{port}"
+        return pool
+
+    monkeypatch.setattr(grobid, "_start_pool", _start_pool)
+
+    # Cold start goes through Docker and records the servers
+    pool = setup_grobid_pool(n_instances=2, image="grobid", port=9000)
+    assert n_docker_setups == 1
+    assert (tmp_path / "grobid-connection.json").exists()
+
+    # Warm start only checks the servers are alive
+    pool = setup_grobid_pool(n_instances=2, image="grobid", port=9000)
+    assert n_docker_setups == 1
+    assert [instance.url for instance in pool.instances] == [
+        "http://127.0.0.1:9000",
+        "http://127.0.0.1:9001",
+    ]
+    assert [instance.container_id for instance in pool.instances] == [
+        "container-0",
+        "container-1",
+    ]
+
+    # A different setup or a dead server goes through Docker again
+    setup_grobid_pool(n_instances=3, image="grobid", port=9000)
+    assert n_docker_setups == 2
+    monkeypatch.setattr(grobid, "_is_alive", lambda url: False)
+    setup_grobid_pool(n_instances=3, image="grobid", port=9000)
+    assert n_docker_setups == 3
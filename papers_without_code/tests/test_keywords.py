@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from papers_without_code import keywords
+from papers_without_code.caches import KeywordCache
+from papers_without_code.custom_types import MinimalPaperDetails
+from papers_without_code.keywords import (
+    LLMKeywordResults,
+    _get_candidate_phrases,
+    _get_keywords,
+    _run_keyword_get_from_llm,
+    extract_keywords_local,
+    get_keywords,
+    get_keywords_batch,
+    prewarm_keyword_cache,
+)
+from papers_without_code.rate_limits import LLMRateLimiter
+
+###############################################################################
+
+
+class BagOfWordsModel:
+    # Embeds text by which vocabulary words it contains
+    def __init__(self, vocabulary: list[str]) -> None:
+        self.vocabulary = vocabulary
+        self.n_calls = 0
+
+    def encode(
+        self,
+        texts: list[str],
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+    ) -> np.ndarray:
+        self.n_calls += 1
+        embeddings = np.array(
+            [
+                [float(word in text.lower()) for word in self.vocabulary] + [0.01]
+                for text in texts
+            ]
+        )
+        return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def fake_llm(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    generated = []
+
+    def _run_keyword_get_from_llm(text: str, llm: object) -> LLMKeywordResults:
+        generated.append(text)
+        return LLMKeywordResults(keywords=[f"{text} keyword"])
+
+    monkeypatch.setattr(keywords, "ChatOpenAI", lambda **kwargs: None)
+    monkeypatch.setattr(keywords, "_LLM", None)
+    monkeypatch.setattr(
+        keywords, "_run_keyword_get_from_llm", _run_keyword_get_from_llm
+    )
+    return generated
+
+
+###############################################################################
+
+
+def test_keywords_cached_and_prewarmed(fake_llm: list[str], tmp_path: Path) -> None:
+    cache = KeywordCache(cache_dir=tmp_path)
+
+    # Only papers without keywords and not already stored are generated
+    cache.put(
+        keywords.LLM_KEYWORD_MODEL,
+        keywords.LLM_KEYWORD_PROMPT_STRING,
+        "stored\n\nabstract",
+        ["stored keyword"],
+    )
+    papers = [
+        MinimalPaperDetails(title=title, authors=[], abstract="abstract")
+        for title in ["new", "stored", "new"]
+    ]
+    papers.append(
+        MinimalPaperDetails(
+            title="given", authors=[], abstract="abstract", keywords=["given"]
+        )
+    )
+    assert prewarm_keyword_cache(papers, keyword_cache=cache) == 1
+    assert fake_llm == ["new\n\nabstract"]
+
+    # Repeat papers skip the LLM
+    assert _get_keywords("new\n\nabstract", keyword_cache=cache) == [
+        "new\n\nabstract keyword"
+    ]
+    assert len(fake_llm) == 1
+
+
+def test_get_candidate_phrases() -> None:
+    candidates = _get_candidate_phrases(
+        "We release SciBERT, a language model for scientific text. "
+        "SciBERT improves results.",
+        max_words=3,
+    )
+
+    # Most frequent first, no stopwords at the ends, no crossing punctuation
+    assert candidates[0] == "SciBERT"
+    assert "language model" in candidates
+    assert "model for scientific" in candidates
+    assert "a language model" not in candidates
+    assert "SciBERT a" not in candidates
+    assert "text SciBERT" not in candidates
+    assert "We" not in candidates
+
+
+def test_extract_keywords_local_is_diverse() -> None:
+    model = BagOfWordsModel(["graph", "neural", "contrastive"])
+    text = "Graph neural networks. Neural graph models. Contrastive learning."
+    extracted = extract_keywords_local(
+        text,
+        model=model,  # type: ignore
+        n_keywords=2,
+    )
+
+    # The second keyword covers what the first doesn't
+    assert len(extracted) == 2
+    assert any("contrastive" in keyword.lower() for keyword in extracted)
+    assert model.n_calls == 1
+
+
+def test_get_keywords_backends(
+    monkeypatch: pytest.MonkeyPatch,
+    fake_llm: list[str],
+) -> None:
+    model = BagOfWordsModel(["graph"])
+    assert get_keywords("graph", model=model) == ["graph keyword"]  # type: ignore
+
+    # Selected by config
+    monkeypatch.setenv("PWOC_KEYWORD_BACKEND", "local")
+    assert get_keywords("graph", model=model) == ["graph"]  # type: ignore
+    assert len(fake_llm) == 1
+
+    with pytest.raises(ValueError):
+        get_keywords("graph", keyword_backend="unknown")
+
+
+def test_get_keywords_falls_back_to_local(monkeypatch: pytest.MonkeyPatch) -> None:
+    def _fail(text: str, keyword_cache: object = None) -> list[str]:
+        raise TimeoutError("LLM timed out")
+
+    monkeypatch.setattr(keywords, "_get_keywords", _fail)
+    model = BagOfWordsModel(["graph"])
+    assert get_keywords(
+        "graph", keyword_backend="llm", model=model  # type: ignore
+    ) == ["graph"]
+
+    with pytest.raises(TimeoutError):
+        get_keywords("graph", keyword_backend="llm", fallback=False)
+
+
+def test_get_keywords_batch(
+    monkeypatch: pytest.MonkeyPatch,
+    fake_llm: list[str],
+    tmp_path: Path,
+) -> None:
+    def _fail_on_bad(text: str, llm: object) -> LLMKeywordResults:
+        if text == "bad":
+            raise TimeoutError("timed out")
+        fake_llm.append(text)
+        return LLMKeywordResults(keywords=[f"{text} keyword"])
+
+    monkeypatch.setattr(keywords, "_run_keyword_get_from_llm", _fail_on_bad)
+    cache = KeywordCache(cache_dir=tmp_path)
+    cache.put(
+        keywords.LLM_KEYWORD_MODEL, keywords.LLM_KEYWORD_PROMPT_STRING, "b", ["x"]
+    )
+    results = get_keywords_batch(
+        ["a", "b", "bad", "a"],
+        keyword_cache=cache,
+        rate_limiter=LLMRateLimiter(1000, 1_000_000),
+    )
+
+    # In order with per-item errors, each distinct text generated once
+    assert results[0] == ["a keyword"]
+    assert results[1] == ["x"]
+    assert isinstance(results[2], TimeoutError)
+    assert results[3] == ["a keyword"]
+    assert fake_llm == ["a"]
+
+
+def test_get_keywords_batch_packs_prompts(
+    monkeypatch: pytest.MonkeyPatch,
+    fake_llm: list[str],
+) -> None:
+    packed = []
+
+    def _run_batch(texts: list[str], llm: object) -> dict[int, list[str]]:
+        packed.append(texts)
+        # The LLM left out the last text
+        return {i: [f"{text} packed"] for i, text in enumerate(texts[:-1])}
+
+    monkeypatch.setattr(keywords, "_run_batch_keyword_get_from_llm", _run_batch)
+    long_text = "x" * (keywords.LLM_PACKABLE_TEXT_CHARS + 1)
+    results = get_keywords_batch(
+        ["a", "b", "c", long_text],
+        papers_per_prompt=3,
+        rate_limiter=LLMRateLimiter(1000, 1_000_000),
+    )
+
+    assert packed == [["a", "b", "c"]]
+    assert results == [
+        ["a packed"],
+        ["b packed"],
+        ["c keyword"],
+        [f"{long_text} keyword"],
+    ]
+    assert sorted(fake_llm) == sorted(["c", long_text])
+
+
+def test_run_keyword_get_from_llm_retries_parse_errors(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr("backoff._sync.time.sleep", lambda seconds: None)
+    outputs = ["not json", '{"keywords": ["a", "b"]}']
+
+    def _llm(messages: list) -> SimpleNamespace:
+        return SimpleNamespace(content=outputs.pop(0))
+
+    assert _run_keyword_get_from_llm("text", _llm).keywords == [  # type: ignore
+        "a",
+        "b",
+    ]
+    assert outputs == []
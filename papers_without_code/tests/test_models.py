@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+import sys
+import threading
+import time
+import types
+from collections.abc import Iterator
+
+import pytest
+
+from papers_without_code import models
+
+###############################################################################
+
+
+class FakeTensor:
+    def __init__(self, n: int) -> None:
+        self.n = n
+
+    def numel(self) -> int:
+        return self.n
+
+    def element_size(self) -> int:
+        return 4
+
+
+class FakeSentenceTransformer:
+    n_constructed = 0
+    fail_next = False
+
+    def __init__(self, model_name_or_path: str) -> None:
+        # Slow enough for concurrent callers to overlap
+        time.sleep(0.1)
+        if FakeSentenceTransformer.fail_next:
+            FakeSentenceTransformer.fail_next = False
+            raise OSError("Failed to load weights")
+
+        FakeSentenceTransformer.n_constructed += 1
+        self.model_name_or_path = model_name_or_path
+
+    def parameters(self) -> list[FakeTensor]:
+        return [FakeTensor(10), FakeTensor(5)]
+
+    def buffers(self) -> list[FakeTensor]:
+        return [FakeTensor(1)]
+
+
+@pytest.fixture(autouse=True)
+def fake_sentence_transformers(monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    fake_module = types.ModuleType("sentence_transformers")
+    fake_module.SentenceTransformer = FakeSentenceTransformer  # type: ignore
+    monkeypatch.setitem(sys.modules, "sentence_transformers", fake_module)
+    FakeSentenceTransformer.n_constructed = 0
+    FakeSentenceTransformer.fail_next = False
+    models.unload_model()
+    yield
+    models.unload_model()
+
+
+###############################################################################
+
+
+def test_get_model_loads_once_for_concurrent_callers() -> None:
+    results = []
+
+    def _get() -> None:
+        results.append(models.get_model("fake-model"))
+
+    threads = [threading.Thread(target=_get) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert FakeSentenceTransformer.n_constructed == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_get_model_joins_background_load() -> None:
+    future = models.preload_model_async("fake-model")
+    model = models.get_model("fake-model")
+
+    assert future.result() is model
+    assert FakeSentenceTransformer.n_constructed == 1
+
+
+def test_failed_load_can_be_retried() -> None:
+    FakeSentenceTransformer.fail_next = True
+    with pytest.raises(OSError):
+        models.get_model("fake-model")
+
+    model = models.get_model("fake-model")
+    assert model.model_name_or_path == "fake-model"
+    assert FakeSentenceTransformer.n_constructed == 1
+
+
+def test_unload_and_memory_usage() -> None:
+    models.preload_model("fake-model")
+    assert models.get_model_memory_usage() == {"fake-model": (10 + 5 + 1) * 4}
+
+    models.unload_model("fake-model")
+    assert models.get_model_memory_usage() == {}
+
+    # Loading again constructs a new model
+    models.get_model("fake-model")
+    assert FakeSentenceTransformer.n_constructed == 2
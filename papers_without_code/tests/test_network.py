@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+
+from collections.abc import Iterator
+
+import pytest
+
+from papers_without_code import network
+
+###############################################################################
+
+
+@pytest.fixture
+def fresh_network(monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    monkeypatch.setattr(network, "_SESSION", None)
+    monkeypatch.setattr(network, "_EXECUTOR", None)
+    yield
+    if network._EXECUTOR is not None:
+        network._EXECUTOR.shutdown()
+
+
+###############################################################################
+
+
+def test_get_max_workers(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("PWOC_MAX_WORKERS", raising=False)
+    assert network.get_max_workers() == network.DEFAULT_MAX_WORKERS
+
+    monkeypatch.setenv("PWOC_MAX_WORKERS", "4")
+    assert network.get_max_workers() == 4
+
+
+def test_session_pool_matches_executor(
+    monkeypatch: pytest.MonkeyPatch,
+    fresh_network: None,
+) -> None:
+    monkeypatch.setenv("PWOC_MAX_WORKERS", "5")
+
+    session = network.get_session()
+    executor = network.get_executor()
+
+    # Shared across calls
+    assert network.get_session() is session
+    assert network.get_executor() is executor
+
+    # Every worker can hold its own connection to the same host
+    adapter = session.get_adapter("https://api.github.com")
+    assert adapter._pool_maxsize == 5
+    assert executor._max_workers == 5
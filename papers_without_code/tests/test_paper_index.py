@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+
+import gzip
+import json
+from pathlib import Path
+
+import pytest
+
+from papers_without_code import paper_index, papers
+from papers_without_code.paper_index import (
+    PaperIndex,
+    build_paper_index,
+    get_default_paper_index,
+)
+
+###############################################################################
+
+ARXIV_RECORDS = [
+    {
+        "id": "2004.07180",
+        "doi": "10.18653/v1/2020.ACL-main.447",
+        "title": "SPECTER: Document-level Representation\n  Learning",
+        "authors": "Arman Cohan, Sergey Feldman",
+        "authors_parsed": [["Cohan", "Arman", ""], ["Feldman", "Sergey", ""]],
+        "abstract": "  Representation learning\nis critical. ",
+    },
+    {
+        "id": "hep-th/9901001",
+        "doi": None,
+        "title": "Old Style",
+        "authors": "A. Author and B. Author",
+        "abstract": "Strings.",
+    },
+]
+
+S2_RECORD = {
+    "corpusid": 202558505,
+    "externalids": {"DOI": "10.1/S2", "ArXiv": None},
+    "url": "https://www.semanticscholar.org/paper/abc",
+    "title": "Semantic Scholar Paper",
+    "authors": [{"authorId": "1", "name": "Someone"}],
+}
+
+###############################################################################
+
+
+@pytest.fixture
+def index_dir(tmp_path: Path) -> Path:
+    arxiv_path = tmp_path / "arxiv.jsonl"
+    arxiv_path.write_text(
+        "\n".join(json.dumps(record) for record in ARXIV_RECORDS) + "\nnot json\n\n"
+    )
+    s2_path = tmp_path / "papers.jsonl.gz"
+    with gzip.open(s2_path, "wt") as open_f:
+        open_f.write(json.dumps(S2_RECORD) + "\n")
+
+    assert build_paper_index([arxiv_path, s2_path], tmp_path / "index") == 3
+    return tmp_path / "index"
+
+
+def test_paper_index_lookup(index_dir: Path) -> None:
+    index = PaperIndex(index_dir)
+
+    paper_data = index.get("arxiv:2004.07180")
+    assert paper_data is not None
+    assert paper_data["title"] == "SPECTER: Document-level Representation Learning"
+    assert paper_data["abstract"] == "Representation learning is critical."
+    assert paper_data["authors"] == [
+        {"name": "Arman Cohan"},
+        {"name": "Sergey Feldman"},
+    ]
+    assert index.get("doi:10.18653/v1/2020.acl-main.447") == paper_data
+
+    old_style = index.get("arxiv:hep-th/9901001")
+    assert old_style is not None
+    assert old_style["authors"] == [{"name": "A. Author"}, {"name": "B. Author"}]
+
+    s2_paper = index.get("corpusid:202558505")
+    assert s2_paper is not None
+    assert s2_paper == index.get("doi:10.1/s2")
+    assert s2_paper["title"] == "Semantic Scholar Paper"
+
+    assert index.get("arxiv:0000.00000") is None
+
+
+def test_get_papers_uses_offline_index(
+    monkeypatch: pytest.MonkeyPatch,
+    index_dir: Path,
+) -> None:
+    monkeypatch.setenv("PWOC_PAPER_INDEX_DIR", str(index_dir))
+    monkeypatch.setattr(paper_index, "_DEFAULT_INDEXES", {})
+    monkeypatch.setattr(papers, "get_default_paper_cache", lambda: None)
+    requested = []
+
+    def _get_papers_chunk(queries: list[str]) -> list:
+        requested.extend(queries)
+        return [ValueError("Not found") for _ in queries]
+
+    monkeypatch.setattr(papers, "_get_papers_chunk", _get_papers_chunk)
+    results = papers.get_papers(
+        ["url:https://arxiv.org/abs/2004.07180v2", "CorpusId:202558505", "missing"]
+    )
+
+    # Only papers missing from the index go to the network
+    assert requested == ["missing"]
+    assert not isinstance(results[0], Exception)
+    assert results[0].url == "https://arxiv.org/abs/2004.07180"
+    assert not isinstance(results[1], Exception)
+    assert results[1].url == "https://www.semanticscholar.org/paper/abc"
+    assert isinstance(results[2], ValueError)
+
+
+def test_get_default_paper_index_missing(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    monkeypatch.setattr(paper_index, "_DEFAULT_INDEXES", {})
+    monkeypatch.delenv("PWOC_PAPER_INDEX_DIR", raising=False)
+    assert get_default_paper_index() is None
+
+    monkeypatch.setenv("PWOC_PAPER_INDEX_DIR", str(tmp_path / "missing"))
+    assert get_default_paper_index() is None
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+import requests
+
+from papers_without_code import papers
+from papers_without_code.caches import PaperCache
+from papers_without_code.papers import get_paper, get_papers, normalize_paper_id
+
+###############################################################################
+
+
+class FakeResponse:
+    def __init__(self, status_code: int = 200, json_data: Any = None) -> None:
+        self.status_code = status_code
+        self.json_data = json_data
+
+    def json(self) -> Any:
+        return self.json_data
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error", response=self)
+
+
+def _paper_data(paper_id: str) -> dict:
+    return {
+        "paperId": paper_id,
+        "corpusId": 7,
+        "externalIds": {"DOI": "10.1/ABC", "ArXiv": "2004.07180"},
+        "title": f"Title {paper_id}",
+        "authors": [],
+        "abstract": "abstract",
+    }
+
+
+@pytest.fixture
+def batch_requests(monkeypatch: pytest.MonkeyPatch) -> list[list[str]]:
+    monkeypatch.setattr(papers, "get_default_paper_index", lambda: None)
+    monkeypatch.setattr(papers, "get_default_paper_cache", lambda: None)
+    requested: list[list[str]] = []
+
+    def _post(url: str, params: dict, json: dict) -> FakeResponse:
+        assert url == "https://api.semanticscholar.org/graph/v1/paper/batch"
+        assert params == {
+            "fields": "paperId,corpusId,externalIds,title,authors,abstract"
+        }
+        ids = json["ids"]
+        requested.append(ids)
+
+        # Malformed IDs reject the whole request
+        if "bad" in ids:
+            return FakeResponse(400)
+        if "error" in ids:
+            return FakeResponse(404)
+        return FakeResponse(
+            json_data=[
+                None if paper_id == "missing" else _paper_data(paper_id)
+                for paper_id in ids
+            ]
+        )
+
+    monkeypatch.setattr(papers, "get_session", lambda: SimpleNamespace(post=_post))
+    return requested
+
+
+###############################################################################
+
+
+def test_get_papers_chunks_and_keeps_order(
+    monkeypatch: pytest.MonkeyPatch,
+    batch_requests: list[list[str]],
+) -> None:
+    monkeypatch.setattr(papers, "SEMANTIC_SCHOLAR_BATCH_SIZE", 2)
+    results = get_papers(["CorpusId:1", "10.1/abc", "missing", "ARXIV:2"])
+
+    assert batch_requests == [["CorpusId:1", "DOI:10.1/abc"], ["missing", "ARXIV:2"]]
+    assert [
+        result.title if not isinstance(result, Exception) else None
+        for result in results
+    ] == ["Title CorpusId:1", "Title DOI:10.1/abc", None, "Title ARXIV:2"]
+    assert isinstance(results[2], ValueError)
+
+
+def test_get_papers_per_item_errors(batch_requests: list[list[str]]) -> None:
+    results = get_papers(["a", "bad", "b", "c"])
+
+    # The malformed ID is isolated, the rest are still found
+    assert isinstance(results[1], requests.HTTPError)
+    assert [result.url for result in results if not isinstance(result, Exception)] == [
+        f"https://www.semanticscholar.org/paper/{paper_id}" for paper_id in "abc"
+    ]
+
+    # Other failures fail their batch
+    results = get_papers(["a", "error"])
+    assert all(isinstance(result, requests.HTTPError) for result in results)
+
+
+def test_get_paper(batch_requests: list[list[str]]) -> None:
+    assert get_paper(" CorpusId:1 ").title == "Title CorpusId:1"
+    assert batch_requests == [["CorpusId:1"]]
+
+    with pytest.raises(ValueError):
+        get_paper("missing")
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("10.18653/v1/2020.ACL-main.447", "doi:10.18653/v1/2020.acl-main.447"),
+        ("doi:doi:10.18653/v1/2020.acl-main.447", "doi:10.18653/v1/2020.acl-main.447"),
+        (" arXiv:2004.07180v2 ", "arxiv:2004.07180"),
+        ("url:https://arxiv.org/abs/2004.07180v1", "arxiv:2004.07180"),
+        ("url:https://arxiv.org/pdf/2004.07180.pdf", "arxiv:2004.07180"),
+        ("CorpusID:202558505", "corpusid:202558505"),
+    ],
+)
+def test_normalize_paper_id(query: str, expected: str) -> None:
+    assert normalize_paper_id(query) == expected
+
+
+def test_get_papers_uses_cache_aliases(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+    batch_requests: list[list[str]],
+) -> None:
+    cache = PaperCache(cache_dir=tmp_path, ttl_seconds=60)
+    monkeypatch.setattr(papers, "get_default_paper_cache", lambda: cache)
+
+    # Duplicate queries are fetched once
+    results = get_papers(["arxiv:2004.07180v1", "ARXIV:2004.07180"])
+    assert batch_requests == [["arxiv:2004.07180v1"]]
+    assert results[0] == results[1]
+
+    # Other identifiers of the same paper are served from the cache
+    assert get_paper("10.1/abc").title == "Title arxiv:2004.07180v1"
+    assert get_paper("CorpusId:7").title == "Title arxiv:2004.07180v1"
+    assert len(batch_requests) == 1
+
+    # Unless disabled
+    get_paper("CorpusId:7", use_cache=False)
+    assert batch_requests[-1] == ["CorpusId:7"]
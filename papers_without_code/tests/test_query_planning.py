@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+
+from typing import Any
+
+import pytest
+
+from papers_without_code import rate_limits
+from papers_without_code.query_planning import (
+    MAX_QUERY_LENGTH,
+    PlannedQuery,
+    plan_keyword_queries,
+)
+from papers_without_code.rate_limits import GitHubRequestScheduler
+from papers_without_code.search import SearchQueryDataTracker, _search_repos
+
+###############################################################################
+
+
+def test_plan_keyword_queries_dedupes_and_subsumes() -> None:
+    plans = plan_keyword_queries(
+        [
+            "Scientific Text",
+            "Language Model for Scientific Text",
+            "scientific  text",
+            "SciBERT",
+            "",
+        ]
+    )
+
+    # One OR-query for everything
+    assert len(plans) == 1
+    assert plans[0].terms == ["Scientific Text", "SciBERT"]
+    assert plans[0].keywords == [
+        "Language Model for Scientific Text",
+        "Scientific Text",
+        "SciBERT",
+    ]
+    assert plans[0].to_query_string(strict=True) == '"Scientific Text" OR "SciBERT"'
+    assert plans[0].per_page == 30
+
+
+def test_plan_keyword_queries_within_github_limits() -> None:
+    # Seven terms is more than five OR operators allow
+    plans = plan_keyword_queries([f"keyword {i}" for i in range(7)])
+    assert [len(plan.terms) for plan in plans] == [6, 1]
+
+    # Long terms are split across queries
+    long_keywords = [f"{i} {'x' * 100}" for i in range(3)]
+    plans = plan_keyword_queries(long_keywords)
+    assert len(plans) == 2
+    for plan in plans:
+        assert len(plan.to_query_string(strict=True)) <= MAX_QUERY_LENGTH
+
+
+@pytest.mark.parametrize(
+    "repo_name, description, expected",
+    [
+        (
+            "a/scibert",
+            "Language model for scientific text",
+            "Language Model for Scientific Text",
+        ),
+        ("a/one", "Text classification (scientific)", "Scientific Text"),
+        ("a/SciBERT", None, "SciBERT"),
+        ("a/one", "Unrelated", "Scientific Text"),
+    ],
+)
+def test_planned_query_attribute(
+    repo_name: str,
+    description: str | None,
+    expected: str,
+) -> None:
+    plan = PlannedQuery(
+        terms=["Scientific Text", "SciBERT"],
+        keywords=["Language Model for Scientific Text", "Scientific Text", "SciBERT"],
+    )
+    assert plan.attribute(repo_name, description) == expected
+
+
+def test_search_repos_splits_planned_results(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(
+        rate_limits,
+        "_SCHEDULER",
+        GitHubRequestScheduler(authenticated=True),
+    )
+    requests_made = []
+
+    def _api(*args: Any, **kwargs: Any) -> dict:
+        requests_made.append(kwargs["query"])
+        return {
+            "items": [
+                {
+                    "fork": False,
+                    "full_name": full_name,
+                    "stargazers_count": 1,
+                    "forks": 2,
+                    "watchers_count": 3,
+                    "description": description,
+                }
+                for full_name, description in [
+                    ("a/graph-nets", "Graph neural networks"),
+                    ("b/one", "Contrastive learning for images"),
+                ]
+            ]
+        }
+
+    (plan,) = plan_keyword_queries(["graph neural networks", "contrastive learning"])
+    results = _search_repos(
+        SearchQueryDataTracker(
+            query_str=" OR ".join(plan.terms), strict=True, plan=plan
+        ),
+        _api,  # type: ignore
+    )
+
+    assert requests_made == [
+        {
+            "q": '"graph neural networks" OR "contrastive learning"',
+            "per_page": 20,
+        }
+    ]
+    assert [(result.repo_name, result.query_str) for result in results] == [
+        ("a/graph-nets", "graph neural networks"),
+        ("b/one", "contrastive learning"),
+    ]
@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+
+import io
+import time
+import urllib.error
+from pathlib import Path
+from typing import Any
+
+import pytest
+from fastcore.net import ExceptionsHTTP, HTTP4xxClientError
+
+from papers_without_code import rate_limits
+from papers_without_code.caches import SearchResponseCache
+from papers_without_code.rate_limits import (
+    CORE_ENDPOINT,
+    SEARCH_ENDPOINT,
+    GitHubRateLimitError,
+    GitHubRequestScheduler,
+    LLMRateLimiter,
+)
+from papers_without_code.search import SearchQueryDataTracker, _search_repos
+
+###############################################################################
+
+
+@pytest.fixture
+def sleeps(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    # Record sleeps instead of waiting
+    recorded: list[float] = []
+    monkeypatch.setattr(rate_limits.time, "sleep", recorded.append)
+    return recorded
+
+
+###############################################################################
+
+
+def test_acquire_queues_then_fails_fast(sleeps: list[float]) -> None:
+    # Unauthenticated search allows 10 requests a minute
+    scheduler = GitHubRequestScheduler(authenticated=False, max_wait_seconds=10)
+    for _ in range(10):
+        scheduler.acquire(SEARCH_ENDPOINT)
+    assert sleeps == []
+
+    # The next token is six seconds away
+    scheduler.acquire(SEARCH_ENDPOINT)
+    assert sleeps == [pytest.approx(6, abs=0.1)]
+
+    # And the one after that would wait twelve, longer than allowed
+    with pytest.raises(GitHubRateLimitError):
+        scheduler.acquire(SEARCH_ENDPOINT)
+
+    usage = scheduler.usage()[SEARCH_ENDPOINT]
+    assert usage.limit == 10
+    assert usage.requests == 11
+    assert usage.rejected == 1
+    assert usage.throttled_seconds == pytest.approx(6, abs=0.1)
+
+
+def test_record_response_exhausted(sleeps: list[float]) -> None:
+    scheduler = GitHubRequestScheduler(authenticated=True, max_wait_seconds=60)
+    rate_limited = scheduler.record_response(
+        CORE_ENDPOINT,
+        {
+            # Resource and casing come from the headers
+            "x-ratelimit-resource": SEARCH_ENDPOINT,
+            "X-RateLimit-Limit": "30",
+            "X-RateLimit-Remaining": "0",
+            "X-RateLimit-Reset": str(time.time() + 30),
+        },
+    )
+    assert rate_limited
+    assert scheduler.usage()[SEARCH_ENDPOINT].remaining == 0
+
+    # Core is unaffected
+    scheduler.acquire(CORE_ENDPOINT, max_wait_seconds=0)
+
+    # Search waits for the reset
+    with pytest.raises(GitHubRateLimitError):
+        scheduler.acquire(SEARCH_ENDPOINT, max_wait_seconds=0)
+    scheduler.acquire(SEARCH_ENDPOINT)
+    assert sleeps == [pytest.approx(30, abs=0.5)]
+
+
+def test_record_response_retry_after(sleeps: list[float]) -> None:
+    scheduler = GitHubRequestScheduler(authenticated=True)
+    assert scheduler.record_response(SEARCH_ENDPOINT, {"Retry-After": "5"})
+    assert not scheduler.record_response(
+        SEARCH_ENDPOINT, {"X-RateLimit-Remaining": "3"}
+    )
+
+    scheduler.acquire(SEARCH_ENDPOINT)
+    assert sleeps == [pytest.approx(5, abs=0.1)]
+
+
+def test_search_repos_retries_when_rate_limited(
+    monkeypatch: pytest.MonkeyPatch,
+    sleeps: list[float],
+) -> None:
+    monkeypatch.setattr(
+        rate_limits,
+        "_SCHEDULER",
+        GitHubRequestScheduler(authenticated=True),
+    )
+    calls = []
+
+    def _api(*args: Any, **kwargs: Any) -> dict:
+        calls.append(kwargs["query"]["q"])
+        if len(calls) == 1:
+            raise ExceptionsHTTP[403]("url", {"Retry-After": "2"}, io.BytesIO())
+        return {
+            "items": [
+                {
+                    "fork": False,
+                    "full_name": "a/one",
+                    "stargazers_count": 1,
+                    "forks": 2,
+                    "watchers_count": 3,
+                    "description": "desc",
+                }
+            ]
+        }
+
+    results = _search_repos(
+        SearchQueryDataTracker(query_str="keyword", strict=True),
+        _api,  # type: ignore
+    )
+    assert calls == ['"keyword"', '"keyword"']
+    assert [result.repo_name for result in results] == ["a/one"]
+    assert sleeps == [pytest.approx(2, abs=0.1)]
+
+
+def test_search_repos_raises_other_errors(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(
+        rate_limits,
+        "_SCHEDULER",
+        GitHubRequestScheduler(authenticated=True),
+    )
+
+    def _api(*args: Any, **kwargs: Any) -> dict:
+        raise ExceptionsHTTP[422]("url", {}, io.BytesIO())
+
+    with pytest.raises(HTTP4xxClientError):
+        _search_repos(SearchQueryDataTracker(query_str="keyword"), _api)  # type: ignore
+
+
+def _search_item(full_name: str) -> dict:
+    return {
+        "fork": False,
+        "full_name": full_name,
+        "stargazers_count": 1,
+        "forks": 2,
+        "watchers_count": 3,
+        "description": "desc",
+    }
+
+
+class FakeGhApi:
+    def __init__(self, responses: list[Any]) -> None:
+        self.responses = responses
+        self.request_headers: list[dict | None] = []
+        self.recv_hdrs: dict[str, str] = {}
+
+    def __call__(self, *args: Any, headers: dict | None = None, **kwargs: Any) -> dict:
+        self.request_headers.append(headers)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        self.recv_hdrs = {"ETag": f'"{len(self.request_headers)}"'}
+        return response
+
+
+def test_search_repos_cache_revalidation(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    monkeypatch.setattr(
+        rate_limits,
+        "_SCHEDULER",
+        GitHubRequestScheduler(authenticated=True),
+    )
+    cache = SearchResponseCache(cache_dir=tmp_path, ttl_seconds=60)
+    api = FakeGhApi(
+        [
+            {"items": [_search_item("a/one")]},
+            urllib.error.HTTPError("url", 304, "Not Modified", {}, io.BytesIO()),  # type: ignore
+        ]
+    )
+
+    # First search is stored, the second is served from the cache
+    for query_str in ["Keyword", "keyword "]:
+        results = _search_repos(
+            SearchQueryDataTracker(query_str=query_str, strict=True),
+            api,  # type: ignore
+            search_cache=cache,
+        )
+        assert [result.repo_name for result in results] == ["a/one"]
+        assert results[0].query_str == query_str
+    assert api.request_headers == [None]
+
+    # Once expired the results are revalidated with the stored etag
+    cache.ttl_seconds = 0
+    results = _search_repos(
+        SearchQueryDataTracker(query_str="keyword", strict=True),
+        api,  # type: ignore
+        search_cache=cache,
+    )
+    assert [result.repo_name for result in results] == ["a/one"]
+    assert api.request_headers[-1] == {"If-None-Match": '"1"'}
+
+
+def test_llm_rate_limiter_requests_and_tokens() -> None:
+    limiter = LLMRateLimiter(requests_per_minute=2, tokens_per_minute=600)
+
+    # Within both limits
+    assert limiter.reserve(100) == 0
+    assert limiter.reserve(100) == 0
+
+    # Out of requests (one refills every 30 seconds)
+    assert limiter.reserve(100) == pytest.approx(30, abs=0.1)
+
+    # Queued behind the last request and out of tokens (10 refill a second)
+    limiter = LLMRateLimiter(requests_per_minute=100, tokens_per_minute=600)
+    assert limiter.reserve(500) == 0
+    assert limiter.reserve(300) == pytest.approx(20, abs=0.1)
+
+    # Larger than the limit only waits for a full bucket
+    assert limiter.reserve(10_000) == pytest.approx(80, abs=0.1)
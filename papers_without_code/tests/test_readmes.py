@@ -0,0 +1,351 @@
+#!/usr/bin/env python
+
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+import requests
+
+from papers_without_code import rate_limits, readmes
+from papers_without_code.caches import ReadmeCache
+from papers_without_code.rate_limits import GitHubRateLimitError
+from papers_without_code.readmes import (
+    MAX_CHARS_PER_TOKEN,
+    clean_readme_text,
+    fetch_readme,
+    get_readme,
+    get_readmes_bulk,
+    prepare_readme_for_encoding,
+    truncate_to_token_budget,
+)
+
+###############################################################################
+
+EXAMPLE_README = """# Fancy Model
+
+[![Build](https://img.shields.io/badge/build-passing-green.svg)](https://ci.example.com)
+<img src="figure.png" width="400">
+
+Official implementation of [Fancy Model](https://arxiv.org/abs/1234.5678)
+for graph classification.
+
+## Installation
+
+```bash
+pip install -r requirements.txt
+```
+
+$ python train.py --epochs 10
+
+## Usage
+
+We train with contrastive learning.
+
+## Citation
+
+```
+@article{fancy2023,
+  title={Fancy {Model}},
+  author={Someone},
+}
+```
+
+@inproceedings{fancy2022, title={{Older} Model}}
+
+## License
+
+MIT License. Permission is hereby granted, free of charge.
+"""
+
+###############################################################################
+
+
+class WhitespaceFastTokenizer:
+    is_fast = True
+
+    def __init__(self) -> None:
+        self.n_chars_tokenized = 0
+
+    def __call__(self, text: str, max_length: int, **kwargs: Any) -> dict:
+        self.n_chars_tokenized += len(text)
+        offsets = [match.span() for match in re.finditer(r"\S+", text)]
+        return {"offset_mapping": offsets[:max_length]}
+
+
+class FakeResponse:
+    def __init__(
+        self,
+        status_code: int = 200,
+        text: str = "",
+        json_data: Any = None,
+    ) -> None:
+        self.status_code = status_code
+        self.text = text
+        self.json_data = json_data
+        self.headers: dict[str, str] = {}
+
+    def json(self) -> Any:
+        return self.json_data
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error")
+
+
+@pytest.fixture(autouse=True)
+def fresh_scheduler(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(
+        rate_limits,
+        "_SCHEDULER",
+        rate_limits.GitHubRequestScheduler(authenticated=True),
+    )
+
+
+###############################################################################
+
+
+def test_get_readmes_bulk(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("GITHUB_TOKEN", "abc")
+    monkeypatch.setattr(readmes, "README_GRAPHQL_BATCH_SIZE", 2)
+    queries = []
+
+    def _post(url: str, headers: dict, json: dict) -> FakeResponse:
+        queries.append(json["query"])
+        assert headers["Authorization"] == "token abc"
+        if len(queries) == 1:
+            return FakeResponse(
+                json_data={
+                    "data": {
+                        # Only has a README.rst
+                        "r0": {"f0": None, "f1": {"text": "rst readme"}},
+                        # Deleted repo
+                        "r1": None,
+                    },
+                    "errors": [{"message": "Could not resolve to a Repository"}],
+                }
+            )
+        return FakeResponse(status_code=502)
+
+    monkeypatch.setattr(readmes, "get_session", lambda: SimpleNamespace(post=_post))
+    found = get_readmes_bulk(["a/one", "b/two", "c/three"])
+
+    # Second batch failed, those repos are left for the REST API
+    assert found == {"a/one": "rst readme"}
+    assert len(queries) == 2
+    assert 'r1: repository(owner: "b", name: "two")' in queries[0]
+    assert 'f0: object(expression: "HEAD:README.md")' in queries[0]
+
+
+def test_get_readmes_bulk_requires_token(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("GITHUB_TOKEN", raising=False)
+
+    def _fail(*args: Any, **kwargs: Any) -> None:
+        raise AssertionError("GraphQL should not be called unauthenticated")
+
+    monkeypatch.setattr(readmes, "get_session", lambda: SimpleNamespace(post=_fail))
+    assert get_readmes_bulk(["a/one"]) == {}
+
+
+@pytest.mark.parametrize(
+    "response, expected",
+    [
+        (FakeResponse(text="# Title"), "# Title"),
+        (FakeResponse(status_code=404), None),
+    ],
+)
+def test_get_readme(
+    monkeypatch: pytest.MonkeyPatch,
+    response: FakeResponse,
+    expected: str | None,
+) -> None:
+    def _get(url: str, headers: dict) -> FakeResponse:
+        assert url == "https://api.github.com/repos/a/one/readme"
+        assert headers["Accept"] == "application/vnd.github.raw"
+        return response
+
+    monkeypatch.setattr(readmes, "get_session", lambda: SimpleNamespace(get=_get))
+    assert get_readme("a/one") == expected
+
+
+def _count_requests(
+    monkeypatch: pytest.MonkeyPatch,
+    response: readmes._ReadmeResponse | Exception,
+) -> list[dict]:
+    requests_made = []
+
+    def _request_readme(repo_name: str, **validators: str | None) -> Any:
+        requests_made.append(validators)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(readmes, "_request_readme", _request_readme)
+    monkeypatch.setattr(readmes, "_scrape_readme_with_retry", lambda name: "html")
+    return requests_made
+
+
+def test_fetch_readme_cache_and_revalidation(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    cache = ReadmeCache(cache_dir=tmp_path, ttl_seconds=60)
+    requests_made = _count_requests(
+        monkeypatch,
+        readmes._ReadmeResponse(text="api", etag='"1"', last_modified="Mon"),
+    )
+
+    # Fetched once then served from the cache
+    assert fetch_readme("a/one", readme_cache=cache) == "api"
+    assert fetch_readme("a/one", readme_cache=cache) == "api"
+    assert len(requests_made) == 1
+
+    # Expired entries are revalidated with their validators
+    cache.ttl_seconds = 0
+    requests_made = _count_requests(
+        monkeypatch,
+        readmes._ReadmeResponse(text=None, not_modified=True),
+    )
+    assert fetch_readme("a/one", readme_cache=cache) == "api"
+    assert requests_made == [{"etag": '"1"', "last_modified": "Mon"}]
+
+
+def test_fetch_readme_falls_back_to_html(monkeypatch: pytest.MonkeyPatch) -> None:
+    _count_requests(monkeypatch, GitHubRateLimitError("core limit"))
+    assert fetch_readme("a/one") == "html"
+
+
+def test_fetch_readme_single_flight(monkeypatch: pytest.MonkeyPatch) -> None:
+    started = threading.Event()
+    release = threading.Event()
+    n_requests = 0
+
+    def _request_readme(repo_name: str, **validators: str | None) -> Any:
+        nonlocal n_requests
+        n_requests += 1
+        started.set()
+        assert release.wait(timeout=10)
+        return readmes._ReadmeResponse(text="shared")
+
+    # Count callers which have joined the fetch
+    n_claims = 0
+    claim = readmes._IN_FLIGHT_FETCHES.claim
+
+    def _claim(keys: list[str]) -> Any:
+        nonlocal n_claims
+        result = claim(keys)
+        n_claims += 1
+        return result
+
+    monkeypatch.setattr(readmes, "_request_readme", _request_readme)
+    monkeypatch.setattr(readmes._IN_FLIGHT_FETCHES, "claim", _claim)
+    with ThreadPoolExecutor(max_workers=4) as exe:
+        first = exe.submit(fetch_readme, "a/one")
+        assert started.wait(timeout=10)
+        others = [exe.submit(fetch_readme, "A/one") for _ in range(3)]
+        deadline = time.monotonic() + 10
+        while n_claims < 4 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        results = [first.result(), *[other.result() for other in others]]
+
+    assert results == ["shared"] * 4
+    assert n_requests == 1
+
+
+def test_get_readmes_bulk_uses_cache(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    monkeypatch.setenv("GITHUB_TOKEN", "abc")
+    cache = ReadmeCache(cache_dir=tmp_path, ttl_seconds=60)
+    cache.put("a/cached", "cached")
+    cache.put("b/none", None)
+    requested = []
+
+    def _request_readmes_graphql(repo_names: list[str]) -> dict[str, str]:
+        requested.extend(repo_names)
+        return {"c/new": "new"}
+
+    monkeypatch.setattr(readmes, "_request_readmes_graphql", _request_readmes_graphql)
+    found = get_readmes_bulk(["a/cached", "b/none", "c/new"], readme_cache=cache)
+
+    assert found == {"a/cached": "cached", "c/new": "new"}
+    assert requested == ["c/new"]
+    cached = cache.get("c/new")
+    assert cached is not None
+    assert cached.text == "new"
+
+
+def test_get_readme_raises_other_errors(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(
+        readmes,
+        "get_session",
+        lambda: SimpleNamespace(get=lambda *args, **kwargs: FakeResponse(403)),
+    )
+    with pytest.raises(requests.HTTPError):
+        get_readme("a/one")
+
+
+def test_clean_readme_text() -> None:
+    cleaned = clean_readme_text(EXAMPLE_README)
+    assert cleaned == (
+        "# Fancy Model Official implementation of Fancy Model "
+        "for graph classification. ## Installation "
+        "## Usage We train with contrastive learning."
+    )
+
+
+@pytest.mark.parametrize(
+    "readme",
+    [
+        ".. image:: https://badge.svg\n   :target: https://ci\n\nProse here.",
+        "<!-- hidden -->Prose here.",
+        "Prose here.\n\n[docs]: https://docs.example.com",
+        "Prose here.\n\n```\nunterminated code",
+    ],
+)
+def test_clean_readme_text_other_markup(readme: str) -> None:
+    assert clean_readme_text(readme).startswith("Prose here.")
+
+
+def test_truncate_to_token_budget_with_fast_tokenizer() -> None:
+    tokenizer = WhitespaceFastTokenizer()
+    text = " ".join(f"word{i}" for i in range(10_000))
+
+    truncated = truncate_to_token_budget(text, tokenizer, max_tokens=5)
+    assert truncated == "word0 word1 word2 word3 word4"
+
+    # Only a prefix of the text was tokenized
+    assert tokenizer.n_chars_tokenized == 5 * MAX_CHARS_PER_TOKEN
+
+
+def test_truncate_to_token_budget_text_fits() -> None:
+    assert truncate_to_token_budget("a b c", WhitespaceFastTokenizer(), 5) == "a b c"
+
+
+def test_truncate_to_token_budget_without_tokenizer() -> None:
+    text = "x" * 100
+    assert truncate_to_token_budget(text, None, max_tokens=2) == "x" * (
+        2 * MAX_CHARS_PER_TOKEN
+    )
+
+
+def test_prepare_readme_for_encoding() -> None:
+    prepared = prepare_readme_for_encoding(
+        EXAMPLE_README,
+        WhitespaceFastTokenizer(),
+        max_tokens=7,
+    )
+
+    # Two tokens are left for the special tokens
+    assert prepared == "# Fancy Model Official implementation"
+
+
+def test_prepare_readme_for_encoding_keeps_code_only_readmes() -> None:
+    readme = "```\nimport fancy\n```"
+    assert prepare_readme_for_encoding(readme, None, 512) == readme.replace("\n", " ")
@@ -0,0 +1,411 @@
+#!/usr/bin/env python
+
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+
+from papers_without_code import search
+from papers_without_code.custom_types import MinimalPaperDetails
+from papers_without_code.search import (
+    AdaptiveSearchBudget,
+    RepoReadmeResponse,
+    SearchQueryDataTracker,
+    SearchQueryResponse,
+    _get_repo_readme_content,
+    _select_candidates,
+    _semantic_sim_repos,
+    _top_k_indices,
+    get_repos,
+)
+
+###############################################################################
+
+
+class StubModel:
+    def __init__(self, vectors: dict[str, list[float]]) -> None:
+        self.vectors = vectors
+        self.n_calls = 0
+        self.tokenizer = None
+        self.max_seq_length = 512
+
+    def encode(
+        self,
+        texts: str | list[str],
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+    ) -> np.ndarray:
+        self.n_calls += 1
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+
+        embeddings = np.array([self.vectors[text] for text in texts], dtype=np.float32)
+        if normalize_embeddings:
+            embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+        if single:
+            return embeddings[0]
+        return embeddings
+
+
+def _readme(name: str) -> RepoReadmeResponse:
+    return RepoReadmeResponse(
+        repo_name=name,
+        search_query="query",
+        readme_text=name,
+        stars=0,
+        forks=0,
+        watchers=0,
+        description="",
+    )
+
+
+###############################################################################
+
+
+@pytest.mark.parametrize(
+    "scores, top_k, expected",
+    [
+        ([0.1, 0.9, 0.5, 0.7, 0.3], None, [1, 3, 2, 4, 0]),
+        ([0.1, 0.9, 0.5, 0.7, 0.3], 2, [1, 3]),
+        ([0.1, 0.9, 0.5, 0.7, 0.3], 5, [1, 3, 2, 4, 0]),
+        ([0.1, 0.9, 0.5, 0.7, 0.3], 10, [1, 3, 2, 4, 0]),
+        ([0.1, 0.9, 0.5, 0.7, 0.3], 0, []),
+        ([0.1, 0.9, 0.5, 0.7, 0.3], -1, []),
+        # Ties keep their original order
+        ([0.5, 0.9, 0.5, 0.5], None, [1, 0, 2, 3]),
+        ([0.5, 0.9, 0.5, 0.1], 3, [1, 0, 2]),
+        ([], None, []),
+    ],
+)
+def test_top_k_indices(
+    scores: list[float],
+    top_k: int | None,
+    expected: list[int],
+) -> None:
+    assert _top_k_indices(np.array(scores), top_k=top_k).tolist() == expected
+
+
+def test_semantic_sim_repos_matches_pairwise_ranking() -> None:
+    vectors = {
+        "paper abstract": [1.0, 0.0, 0.0],
+        "close": [0.9, 0.1, 0.0],
+        "far": [0.0, 0.0, 1.0],
+        "middle": [0.5, 0.5, 0.2],
+        "scaled close": [9.0, 1.0, 0.0],
+    }
+    model = StubModel(vectors)
+    paper = MinimalPaperDetails(
+        title="paper title",
+        authors=[],
+        abstract="paper abstract",
+    )
+    readmes = [_readme(name) for name in ["far", "close", "middle", "scaled close"]]
+
+    repos = _semantic_sim_repos(readmes, paper, model=model)  # type: ignore
+
+    # Previous behavior, one cosine similarity per repo then a full sort
+    def _cos_sim(a: list[float], b: list[float]) -> float:
+        return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+    expected = sorted(
+        [
+            (
+                readme.repo_name,
+                _cos_sim(vectors[readme.readme_text], vectors["paper abstract"]),
+            )
+            for readme in readmes
+        ],
+        key=lambda x: x[1],
+        reverse=True,
+    )
+    assert [repo.name for repo in repos] == [name for name, _ in expected]
+    np.testing.assert_allclose(
+        [repo.similarity for repo in repos],
+        [score for _, score in expected],
+        rtol=1e-5,
+    )
+
+    # One call for the paper and one batched call for all readmes
+    assert model.n_calls == 2
+
+    # Top k returns the head of the same ranking
+    top_repos = _semantic_sim_repos(readmes, paper, model=model, top_k=2)  # type: ignore
+    assert [repo.name for repo in top_repos] == [name for name, _ in expected[:2]]
+
+
+def test_semantic_sim_repos_no_repos(monkeypatch: pytest.MonkeyPatch) -> None:
+    paper = MinimalPaperDetails(title="paper title", authors=[], abstract="abstract")
+    assert _semantic_sim_repos([], paper, model=StubModel({})) == []  # type: ignore
+
+    # Nothing to rank never waits on the model
+    def _fail(*args: object, **kwargs: object) -> None:
+        raise AssertionError("Model should not be requested")
+
+    monkeypatch.setattr("papers_without_code.search.get_model", _fail)
+    assert _semantic_sim_repos([], paper) == []
+
+
+@pytest.mark.parametrize(
+    "bulk_readme, fetched_readme, expected",
+    [
+        # Already fetched in bulk, no further requests
+        ("bulk", None, "bulk"),
+        # Fetched individually
+        (None, "fetched", "fetched"),
+        # No README at all
+        (None, None, None),
+        (None, "", None),
+    ],
+)
+def test_get_repo_readme_content(
+    monkeypatch: pytest.MonkeyPatch,
+    bulk_readme: str | None,
+    fetched_readme: str | None,
+    expected: str | None,
+) -> None:
+    def _fetch_readme(repo_name: str, readme_cache: object = None) -> str | None:
+        assert bulk_readme is None
+        return fetched_readme
+
+    monkeypatch.setattr(search, "fetch_readme", _fetch_readme)
+    repo_data = SearchQueryResponse(
+        query_str="query",
+        repo_name="a/one",
+        stars=1,
+        forks=2,
+        watchers=3,
+        description="desc",
+    )
+
+    result = _get_repo_readme_content(repo_data, bulk_readme)
+    if expected is None:
+        assert result is None
+    else:
+        assert result is not None
+        assert result.readme_text == expected
+        assert result.search_query == "query"
+
+
+def _search_response(query_str: str, repo_name: str) -> SearchQueryResponse:
+    return SearchQueryResponse(
+        query_str=query_str,
+        repo_name=repo_name,
+        stars=0,
+        forks=0,
+        watchers=0,
+        description="",
+    )
+
+
+def test_get_repos_streams_readmes(monkeypatch: pytest.MonkeyPatch) -> None:
+    second_query_readme_fetched = threading.Event()
+
+    def _search(query: SearchQueryDataTracker, **kwargs: object) -> list:
+        if query.query_str == "slow":
+            # Only finishes once the other queries README was fetched
+            assert second_query_readme_fetched.wait(timeout=10)
+            return [
+                _search_response("slow", "a/shared"),
+                _search_response("slow", "b/slow-only"),
+            ]
+
+        return [
+            _search_response("fast", "a/shared"),
+            _search_response("fast", "c/no-readme"),
+        ]
+
+    def _fetch_readme(repo_name: str, readme_cache: object = None) -> str | None:
+        if repo_name == "a/shared":
+            second_query_readme_fetched.set()
+        if repo_name == "c/no-readme":
+            return None
+        return repo_name
+
+    # Keep the searches separate rather than planned into one
+    monkeypatch.setattr(
+        search,
+        "_get_search_queries",
+        lambda paper, **kwargs: [
+            SearchQueryDataTracker(query_str=keyword, strict=True)
+            for keyword in paper.keywords
+        ],
+    )
+    monkeypatch.setattr(search, "_search_repos", _search)
+    monkeypatch.setattr(search, "get_readmes_bulk", lambda repo_names, cache: {})
+    monkeypatch.setattr(search, "fetch_readme", _fetch_readme)
+
+    model = StubModel(
+        {
+            "paper abstract": [1.0, 0.0],
+            "a/shared": [0.5, 0.5],
+            "b/slow-only": [1.0, 0.1],
+        }
+    )
+    paper = MinimalPaperDetails(
+        title="title",
+        authors=[],
+        abstract="paper abstract",
+        keywords=["slow", "fast"],
+    )
+    repos = get_repos(
+        paper,
+        loaded_sent_transformer=model,  # type: ignore
+        batch_size=1,
+        use_cache=False,
+    )
+
+    # Duplicates dropped, repos without a README filtered out
+    assert [repo.name for repo in repos] == ["b/slow-only", "a/shared"]
+    assert repos[1].search_query == "fast"
+
+
+def test_get_repos_no_results_skips_model(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Waiting on the model load would raise
+    failed_load: Future = Future()
+    failed_load.set_exception(AssertionError("Model should not be waited on"))
+
+    monkeypatch.setattr(search, "_search_repos", lambda query, **kwargs: [])
+    monkeypatch.setattr(
+        search, "preload_model_async", lambda *args, **kwargs: failed_load
+    )
+
+    paper = MinimalPaperDetails(
+        title="title",
+        authors=[],
+        abstract="abstract",
+        keywords=["nothing"],
+    )
+    assert (
+        get_repos(
+            paper,
+            loaded_sent_transformer=None,
+            use_cache=False,
+        )
+        == []
+    )
+
+
+@pytest.mark.parametrize(
+    "scores, max_candidates, expected",
+    [
+        ([0.1, 0.9, 0.5, 0.7], 2, ["b", "d"]),
+        # Ties with the last candidate are kept
+        ([0.5, 0.9, 0.5, 0.1], 2, ["b", "a", "c"]),
+        ([0.1, 0.9], 5, ["a", "b"]),
+        ([0.1, 0.9], 0, []),
+    ],
+)
+def test_select_candidates(
+    scores: list[float],
+    max_candidates: int,
+    expected: list[str],
+) -> None:
+    candidates = [_search_response("query", name) for name in "abcd"[: len(scores)]]
+    selected = _select_candidates(candidates, np.array(scores), max_candidates)
+    assert [candidate.repo_name for candidate in selected] == expected
+
+
+def test_get_repos_prefilters_on_descriptions(monkeypatch: pytest.MonkeyPatch) -> None:
+    def _search(query: SearchQueryDataTracker, **kwargs: object) -> list:
+        return [
+            SearchQueryResponse(
+                query_str="query",
+                repo_name=repo_name,
+                stars=0,
+                forks=0,
+                watchers=0,
+                description=description,
+            )
+            for repo_name, description in [
+                ("a/close", "close description"),
+                ("b/far", "far description"),
+                ("c/no-description", ""),
+            ]
+        ]
+
+    fetched = []
+
+    def _fetch_readme(repo_name: str, readme_cache: object = None) -> str:
+        fetched.append(repo_name)
+        return f"{repo_name} readme"
+
+    monkeypatch.setattr(search, "_search_repos", _search)
+    monkeypatch.setattr(search, "get_readmes_bulk", lambda repo_names, cache: {})
+    monkeypatch.setattr(search, "fetch_readme", _fetch_readme)
+
+    model = StubModel(
+        {
+            "paper abstract": [1.0, 0.0],
+            "close description": [1.0, 0.1],
+            "far description": [0.0, 1.0],
+            "c/no-description": [1.0, 0.2],
+            "a/close readme": [1.0, 0.0],
+            "c/no-description readme": [0.5, 0.5],
+        }
+    )
+    paper = MinimalPaperDetails(
+        title="title",
+        authors=[],
+        abstract="paper abstract",
+        keywords=["query"],
+    )
+    repos = get_repos(
+        paper,
+        loaded_sent_transformer=model,  # type: ignore
+        use_cache=False,
+        max_candidates=2,
+    )
+
+    # Only the two best descriptions had their README fetched
+    assert sorted(fetched) == ["a/close", "c/no-description"]
+    assert [repo.name for repo in repos] == ["a/close", "c/no-description"]
+
+
+@pytest.mark.parametrize(
+    "readme_vector, expected_searches",
+    [
+        # Confident match from the first search
+        ([1.0, 0.0], [("query", True, 1)]),
+        # Weak match, search deeper within the budget of three calls
+        ([0.0, 1.0], [("query", True, 1), ("query", True, 2), ("query", False, 1)]),
+    ],
+)
+def test_get_repos_adaptive_depth(
+    monkeypatch: pytest.MonkeyPatch,
+    readme_vector: list[float],
+    expected_searches: list[tuple[str, bool, int]],
+) -> None:
+    searches = []
+
+    def _search(query: SearchQueryDataTracker, **kwargs: object) -> list:
+        searches.append((query.query_str, query.strict, query.page))
+        return [_search_response(query.query_str, f"a/{len(searches)}")]
+
+    monkeypatch.setattr(search, "_search_repos", _search)
+    monkeypatch.setattr(search, "get_readmes_bulk", lambda repo_names, cache: {})
+    monkeypatch.setattr(
+        search, "fetch_readme", lambda repo_name, readme_cache=None: "readme"
+    )
+
+    model = StubModel({"paper abstract": [1.0, 0.0], "readme": readme_vector})
+    paper = MinimalPaperDetails(
+        title="title",
+        authors=[],
+        abstract="paper abstract",
+        keywords=["query"],
+    )
+    repos = get_repos(
+        paper,
+        loaded_sent_transformer=model,  # type: ignore
+        use_cache=False,
+        adaptive_budget=AdaptiveSearchBudget(
+            confidence_threshold=0.9,
+            max_search_calls=3,
+        ),
+    )
+
+    assert searches == expected_searches
+    assert len(repos) == len(expected_searches)
@@ -0,0 +1,30 @@
+#!/usr/bin/env python
+
+import argparse
+import logging
+
+from papers_without_code.paper_index import build_paper_index
+
+###############################################################################
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(
+        description=(
+            "Build an offline paper index from arXiv or Semantic Scholar "
+            "metadata snapshots. Set PWOC_PAPER_INDEX_DIR to the output "
+            "directory to resolve papers from it before Semantic Scholar."
+        ),
+    )
+    p.add_argument(
+        "snapshot_paths",
+        nargs="+",
+        help=(
+            "Paths to JSON lines snapshots, for example "
+            "'arxiv-metadata-oai-snapshot.json' or 'papers.jsonl.gz'."
+        ),
+    )
+    p.add_argument("index_dir", help="The directory to store the index in.")
+    args = p.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    build_paper_index(args.snapshot_paths, args.index_dir)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+
+import argparse
+import logging
+from pathlib import Path
+
+import torch
+from onnxruntime.quantization import QuantType, quantize_dynamic
+from sentence_transformers import SentenceTransformer
+
+from papers_without_code.encoders import (
+    ONNX_INT8_MODEL_FILENAME,
+    ONNX_MODEL_FILENAME,
+    ONNXEncoder,
+    check_ranking_parity,
+    get_default_onnx_model_dir,
+)
+from papers_without_code.models import DEFAULT_TRANSFORMER_MODEL, _resolve_model_path
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+# Parity check texts, an abstract and READMEs of varying relevance
+PARITY_QUERY = (
+    "Obtaining large-scale annotated data for NLP tasks in the scientific domain "
+    "is challenging and expensive. We release SciBERT, a pretrained language model "
+    "based on BERT to address the lack of high-quality, large-scale labeled "
+    "scientific data."
+)
+PARITY_DOCUMENTS = [
+    "SciBERT is a BERT model trained on scientific text. "
+    "This repository contains code and pretrained models for SciBERT.",
+    "A pretrained language model for biomedical text mining.",
+    "Transformers: state-of-the-art natural language processing for "
+    "PyTorch, TensorFlow, and JAX.",
+    "A curated list of awesome graph neural network papers.",
+    "Fast, scalable image segmentation with convolutional networks.",
+    "Dotfiles and shell configuration for my development machines.",
+]
+
+###############################################################################
+
+
+def _export(model_name: str, output_dir: Path) -> None:
+    model = SentenceTransformer(_resolve_model_path(model_name), device="cpu")
+    transformer = model[0].auto_model
+    tokenizer = model.tokenizer
+    transformer.eval()
+
+    # Export the transformer, pooling happens in numpy
+    output_dir.mkdir(parents=True, exist_ok=True)
+    tokenizer.save_pretrained(str(output_dir))
+    example = tokenizer(["An example input."], return_tensors="pt")
+    input_names = list(example.keys())
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            args=tuple(example[name] for name in input_names),
+            f=str(output_dir / ONNX_MODEL_FILENAME),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+        )
+    log.info(f"Exported ONNX model to: '{output_dir / ONNX_MODEL_FILENAME}'.")
+
+    # Dynamic int8 quantization of the weights
+    quantize_dynamic(
+        str(output_dir / ONNX_MODEL_FILENAME),
+        str(output_dir / ONNX_INT8_MODEL_FILENAME),
+        weight_type=QuantType.QInt8,
+    )
+    log.info(f"Quantized ONNX model to: '{output_dir / ONNX_INT8_MODEL_FILENAME}'.")
+
+    # Check both exports rank like the torch model
+    for quantized in (False, True):
+        results = check_ranking_parity(
+            model,
+            ONNXEncoder(output_dir, quantized=quantized),
+            query=PARITY_QUERY,
+            documents=PARITY_DOCUMENTS,
+        )
+        log.info(f"Parity (quantized: {quantized}): {results}")
+        if not results.passed:
+            raise ValueError(
+                f"Exported model (quantized: {quantized}) does not match "
+                f"the sentence-transformers ranking: {results}"
+            )
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(
+        description="Export a sentence transformer to ONNX (float32 and int8).",
+    )
+    p.add_argument("--model-name", default=DEFAULT_TRANSFORMER_MODEL)
+    p.add_argument(
+        "--output-dir",
+        type=Path,
+        default=None,
+        help="Default: PWOC_ONNX_MODEL_DIR or ./onnx_{model_name}",
+    )
+    args = p.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="[%(levelname)4s: %(module)s:%(lineno)4s %(asctime)s] %(message)s",
+    )
+    _export(
+        args.model_name,
+        args.output_dir or get_default_onnx_model_dir(args.model_name),
+    )